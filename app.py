@@ -1,13 +1,35 @@
-from flask import Flask, request, jsonify, session, redirect, url_for, render_template, flash
+from flask import Flask, request, jsonify, session, redirect, url_for, render_template, flash, g, abort, send_file
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_wtf.csrf import CSRFProtect
-from werkzeug.security import generate_password_hash, check_password_hash
-import pandas as pd
+from markupsafe import Markup
+from sqlalchemy import event, insert, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+import click
+import csv
+import gc
+import hmac
+import itertools
 import logging
-from functools import wraps
+import mimetypes
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from functools import lru_cache, wraps
 import os
 
+from assets import AssetBundle
+from cache import LRUCache
+from catalogue import Catalogue, delta_path, memory_usage
+from inference import MicroBatcher, SymptomModel
+from metrics import Metrics, SlowRequestProfiler
+from passwords import HasherBusy, PasswordHasher
+from shards import ShardPool
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -15,10 +37,31 @@ logger = logging.getLogger(__name__)
 # Initialize Flask app
 app = Flask(__name__)
 app.secret_key = os.environ.get('SECRET_KEY') or "7d02cda47055b0492da796d8dd9e67b66f3d83b43c2ef44b7f0a2c6e6e66f037"
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(app.instance_path, 'users.db')
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL') or 'sqlite:///' + os.path.join(app.instance_path, 'users.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['WTF_CSRF_SECRET_KEY'] = os.environ.get('CSRF_SECRET') or "super_secure_csrf_key"
 app.config['PERMANENT_SESSION_LIFETIME'] = 3600  # 1 hour session lifetime
+app.config['ADMIN_TOKEN'] = os.environ.get('ADMIN_TOKEN')  # admin endpoints are disabled without it
+# Connections kept open per process for a file database; the busy timeout is
+# how long a write waits for another process's write to finish
+DATABASE_POOL_SIZE = int(os.environ.get('DATABASE_POOL_SIZE', 10))
+DATABASE_BUSY_TIMEOUT = float(os.environ.get('DATABASE_BUSY_TIMEOUT', 30))
+if app.config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite:///') and ':memory:' not in app.config['SQLALCHEMY_DATABASE_URI']:
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+        'pool_size': DATABASE_POOL_SIZE,
+        'max_overflow': DATABASE_POOL_SIZE,
+        'connect_args': {'timeout': DATABASE_BUSY_TIMEOUT, 'check_same_thread': False}
+    }
+
+@event.listens_for(Engine, 'connect')
+def configure_sqlite(dbapi_connection, connection_record):
+    # WAL lets logins read while a registration or import writes, and with
+    # synchronous=NORMAL a commit no longer waits for an fsync
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute('PRAGMA synchronous=NORMAL')
+        cursor.close()
 
 # Ensure instance folder exists
 os.makedirs(app.instance_path, exist_ok=True)
@@ -29,9 +72,128 @@ migrate = Migrate(app, db)
 csrf = CSRFProtect(app)
 
 # Constants
-DISEASE_DATA_PATH = 'final_optimized_medical_dataset.csv'
+DISEASE_DATA_PATH = os.environ.get('DISEASE_DATA_PATH', 'final_optimized_medical_dataset.csv')
+# Built by `python catalogue.py`; used instead of parsing the CSV while it is up to date
+CATALOGUE_ARTIFACT_PATH = os.environ.get('CATALOGUE_ARTIFACT_PATH', os.path.join('model', 'catalogue.bin'))
+# Rebuild a missing/stale artifact at startup so all workers map one shared copy
+CATALOGUE_AUTOCOMPILE = os.environ.get('CATALOGUE_AUTOCOMPILE', '1') == '1'
+# Build every disease's response records at startup rather than on first hit;
+# turn off for very large mapped catalogues to keep per-worker memory small
+PREBUILD_RESULTS = os.environ.get('PREBUILD_RESULTS', '1') == '1'
+# 'background' loads the catalogue in a thread that the first request (or the
+# ASGI startup event) starts, so importing the app stays cheap and /healthz
+# answers while it loads; 'eager' loads it while the module is imported
+CATALOGUE_WARMUP = os.environ.get('CATALOGUE_WARMUP', 'background')
+# Seconds between checks of DISEASE_DATA_PATH for changes to hot-reload; 0 disables
+CATALOGUE_POLL_INTERVAL = float(os.environ.get('CATALOGUE_POLL_INTERVAL', 0))
 MIN_SYMPTOM_MATCH = 1
+TOP_K_RESULTS = 5
+MAX_BATCH_SIZE = 10000
+SUGGESTION_LIMIT = 10
+MAX_SUGGESTION_LIMIT = 50
+PREDICTOR_ENGINE = os.environ.get('PREDICTOR_ENGINE', 'index')
+PREDICTOR_SCORING = os.environ.get('PREDICTOR_SCORING', 'overlap')
+# Worker processes that each rank a slice of the catalogue's rows; 0 or 1
+# ranks in the request thread. Use up to one per spare core
+PREDICTOR_SHARDS = int(os.environ.get('PREDICTOR_SHARDS', 0))
+# The shipped classifier and its vectorizer, used by PREDICTOR_ENGINE='model'
+MODEL_PATH = os.environ.get('MODEL_PATH', os.path.join('model', 'enhanced_medical_model.pkl'))
+VECTORIZER_PATH = os.environ.get('VECTORIZER_PATH', os.path.join('model', 'tfidf_vectorizer.pkl'))
+# Concurrent model queries are scored together, in batches of at most this
+# many; a query waits at most MODEL_MAX_WAIT_MS for others to join it
+MODEL_MAX_BATCH_SIZE = int(os.environ.get('MODEL_MAX_BATCH_SIZE', 64))
+MODEL_MAX_WAIT_MS = float(os.environ.get('MODEL_MAX_WAIT_MS', 2))
+# 'normalized' also resolves case/underscore/plural variants, synonyms and
+# typos of catalogue symptoms; 'exact' only takes their exact names
+SYMPTOM_MATCHING = os.environ.get('SYMPTOM_MATCHING', 'normalized')
+RESULT_CACHE_SIZE = int(os.environ.get('RESULT_CACHE_SIZE', 10000))
 HIGH_SEVERITY_THRESHOLD = 7
+# Profiles are invalidated on write in this worker; the TTL bounds how long
+# other workers can serve a profile updated elsewhere
+PROFILE_CACHE_SIZE = int(os.environ.get('PROFILE_CACHE_SIZE', 10000))
+PROFILE_CACHE_TTL = int(os.environ.get('PROFILE_CACHE_TTL', 300))
+# werkzeug hash method with its cost parameters, e.g. 'scrypt:32768:8:1' or
+# 'pbkdf2:sha256:600000'; stored hashes made differently are upgraded at login
+PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+PASSWORD_SALT_LENGTH = int(os.environ.get('PASSWORD_SALT_LENGTH', 16))
+# Threads hashing passwords, and hashes queued or running before logins and
+# registrations get a 503
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))
+PASSWORD_HASH_MAX_PENDING = int(os.environ.get('PASSWORD_HASH_MAX_PENDING', 64))
+IMPORT_BATCH_SIZE = 5000
+# Request and per-stage latency histograms, served on /metrics to callers with
+# the ADMIN_TOKEN (as are /stats and the admin endpoints)
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') == '1'
+# Requests slower than this many milliseconds have their sampled stacks
+# written to PROFILE_DIRECTORY as folded stacks; 0 disables the profiler
+PROFILE_SLOW_REQUESTS_MS = float(os.environ.get('PROFILE_SLOW_REQUESTS_MS', 0))
+PROFILE_DIRECTORY = os.environ.get('PROFILE_DIRECTORY', os.path.join(app.instance_path, 'profiles'))
+PROFILE_INTERVAL_MS = float(os.environ.get('PROFILE_INTERVAL_MS', 5))
+# Build missing fingerprinted assets in the background when a page first
+# needs them (`python assets.py` does it ahead of time); until then pages
+# link the plain files under static/
+STATIC_ASSETS_AUTOBUILD = os.environ.get('STATIC_ASSETS_AUTOBUILD', '1') == '1'
+STATIC_ASSETS_DIRECTORY = os.path.join(app.static_folder, 'dist')
+STATIC_ASSET_MAX_AGE = 365 * 24 * 3600
+
+metrics = Metrics(enabled=METRICS_ENABLED)
+UNTIMED = nullcontext()
+metrics.describe('http_request_duration_seconds', 'Time from request start to response, by endpoint')
+metrics.describe('predict_stage_seconds', 'Time spent in each stage of a prediction request')
+profiler = SlowRequestProfiler(
+    PROFILE_SLOW_REQUESTS_MS / 1000, PROFILE_DIRECTORY, PROFILE_INTERVAL_MS / 1000
+) if PROFILE_SLOW_REQUESTS_MS > 0 else None
+
+assets = AssetBundle(app.static_folder, STATIC_ASSETS_DIRECTORY, autobuild=STATIC_ASSETS_AUTOBUILD)
+if not assets.ready and not STATIC_ASSETS_AUTOBUILD:
+    logger.warning("Static assets are not built; serving them unversioned. Run `python assets.py`")
+# Rendered once per process: page sections that are the same for every user
+fragments = {}
+
+@app.template_global()
+def asset(name):
+    built = assets.built_name(name)
+    if built is not None:
+        return url_for('static_asset', filename=built)
+    return url_for('static', filename=name)
+
+@app.template_global()
+def fragment(name):
+    html = fragments.get(name)
+    if html is None:
+        html = Markup(app.jinja_env.get_template(name).render())
+        if not app.jinja_env.auto_reload:
+            fragments[name] = html
+    return html
+
+@lru_cache(maxsize=1024)
+def match_probability(matched, total):
+    return min(100, round(matched / total * 100, 2))
+
+# Batches in flight holding off garbage collection, and whether it was on before the first
+_gc_pause = {'count': 0, 'enabled': True}
+_gc_pause_lock = threading.Lock()
+
+@contextmanager
+def gc_paused():
+    """
+    Holds off cyclic garbage collection, for building many short-lived,
+    acyclic objects at once: a batch allocates enough of them to trigger
+    several full collections of a heap the catalogue makes large. Overlapping
+    pauses end when the last one does.
+    """
+    with _gc_pause_lock:
+        if _gc_pause['count'] == 0:
+            _gc_pause['enabled'] = gc.isenabled()
+            gc.disable()
+        _gc_pause['count'] += 1
+    try:
+        yield
+    finally:
+        with _gc_pause_lock:
+            _gc_pause['count'] -= 1
+            if _gc_pause['count'] == 0 and _gc_pause['enabled']:
+                gc.enable()
 
 # User Model
 class User(db.Model):
@@ -46,190 +208,665 @@ class User(db.Model):
     weight = db.Column(db.Integer)
     gender = db.Column(db.String(50))
 
+_MISSING = object()
+CATALOGUE_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'catalogue.py')
+
+def _file_signature(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+def _source_signature():
+    return _file_signature(DISEASE_DATA_PATH), _file_signature(delta_path(DISEASE_DATA_PATH))
+
 class DiseasePredictor:
     _instance = None
+    _lock = threading.Lock()
+    # 'index' counts posting-list hits for the queried symptoms only;
+    # 'sparse' scores the whole catalogue with one sparse mat-vec;
+    # 'model' asks the shipped classifier, which only knows a few diseases
+    ENGINES = ('index', 'sparse', 'model')
+    # 'overlap' ranks by how many queried symptoms a disease lists; 'weighted'
+    # sums the age group's symptom probabilities for them instead
+    SCORINGS = ('overlap', 'weighted')
     
-    def __new__(cls):
-        if cls._instance is None:
-            cls._instance = super().__new__(cls)
-            cls._instance.initialize()
+    def __new__(cls, engine=PREDICTOR_ENGINE, scoring=PREDICTOR_SCORING):
+        with cls._lock:
+            if cls._instance is None:
+                if engine not in cls.ENGINES:
+                    raise ValueError(f"Unknown predictor engine: {engine}")
+                if scoring not in cls.SCORINGS:
+                    raise ValueError(f"Unknown predictor scoring: {scoring}")
+                instance = super().__new__(cls)
+                instance.engine = engine
+                instance.scoring = scoring
+                # Matches keyed on (catalogue generation, symptom set, child)
+                instance.result_cache = LRUCache(RESULT_CACHE_SIZE)
+                instance._reload_lock = threading.Lock()
+                # 'pending' until the warm-up starts, then 'loading', then
+                # 'ready' or 'failed'
+                instance.state = 'pending'
+                instance.load_error = None
+                instance.load_seconds = None
+                instance.loaded_at = None
+                instance.catalogue = Catalogue.empty()
+                instance.shard_pool = None
+                instance.model = None
+                instance.model_batcher = None
+                instance._warm_up_started = False
+                instance._warm_up_done = threading.Event()
+                if CATALOGUE_WARMUP == 'eager':
+                    instance._warm_up_started = True
+                    instance.initialize()
+                # Forked before the server starts threads. Workers forked
+                # before the catalogue is loaded load it themselves
+                instance.shard_pool = instance._start_shards(PREDICTOR_SHARDS)
+                if CATALOGUE_POLL_INTERVAL > 0:
+                    instance.watch(CATALOGUE_POLL_INTERVAL)
+                cls._instance = instance
         return cls._instance
     
     def initialize(self):
+        """
+        Loads the catalogue and swaps it in. Holds the reload lock, so admin
+        and watcher reloads wait for (or skip) the warm-up.
+        """
+        with self._reload_lock:
+            self.state = 'loading'
+            start = time.perf_counter()
+            try:
+                if self.engine == 'model' and self.model is None:
+                    self._load_model()
+                catalogue = self._load_catalogue()
+                if self.shard_pool is not None:
+                    self.shard_pool.warm(catalogue)
+            except Exception as e:
+                logger.error(f"Error initializing predictor: {str(e)}")
+                self.load_error = str(e)
+                self.state = 'failed'
+            else:
+                self.catalogue = catalogue
+                self.loaded_at = time.time()
+                self.result_cache.clear()
+                self.load_seconds = round(time.perf_counter() - start, 3)
+                self.state = 'ready'
+                logger.info(f"Dataset loaded and preprocessed in {self.load_seconds:.2f}s")
+            finally:
+                self._warm_up_done.set()
+
+    def start(self):
+        """
+        Starts initialize() in a background thread, the first time only.
+        Cheap enough to call on every request.
+        """
+        if self._warm_up_started:
+            return
+        with self._lock:
+            if self._warm_up_started:
+                return
+            self._warm_up_started = True
+        threading.Thread(target=self.initialize, name='catalogue-warm-up', daemon=True).start()
+
+    def wait_until_ready(self, timeout=None):
+        """
+        Starts the warm-up if needed and waits for it; True once a catalogue
+        is loaded. For scripts and tools that use the predictor directly.
+        """
+        self.start()
+        self._warm_up_done.wait(timeout)
+        return self.ready
+
+    @property
+    def ready(self):
+        return self.state == 'ready'
+
+    def _load_model(self):
+        self.model = SymptomModel(MODEL_PATH, VECTORIZER_PATH)
+        self.model_batcher = MicroBatcher(
+            lambda texts: self.model.rank(texts, TOP_K_RESULTS),
+            MODEL_MAX_BATCH_SIZE, MODEL_MAX_WAIT_MS / 1000, name='model-batcher'
+        )
+
+    def _start_shards(self, shards):
+        if shards < 2 or self.engine == 'model':
+            return None
         try:
-            self.data = pd.read_csv(DISEASE_DATA_PATH, on_bad_lines='skip')
-            self.data.fillna('', inplace=True)
-            self._preprocess_data()
-            logger.info("Dataset loaded and preprocessed successfully")
+            catalogue = None if self.catalogue.is_empty else self.catalogue
+            pool = ShardPool(catalogue, shards, DISEASE_DATA_PATH, CATALOGUE_ARTIFACT_PATH)
+            logger.info(f"Ranking across {shards} shard processes")
+            return pool
         except Exception as e:
-            logger.error(f"Error initializing predictor: {str(e)}")
-            self.data = pd.DataFrame()
-
-    def _preprocess_data(self):
-        symptom_cols = [col for col in self.data.columns if col.startswith('Symptom_')]
-        self.data['Symptoms'] = self.data[symptom_cols].astype(str).agg(','.join, axis=1)
-        self.data['Symptoms'] = self.data['Symptoms'].str.lower().str.split(',').apply(
-            lambda x: [s.strip() for s in x if s.strip() and s != 'nan']
+            logger.error(f"Could not start shard processes, ranking in process: {str(e)}")
+            return None
+
+    def _load_catalogue(self, compile_in_subprocess=False):
+        """
+        Loads a catalogue and builds everything requests use from it, so the
+        result can serve traffic as soon as it is assigned.
+        """
+        before = memory_usage()
+        if compile_in_subprocess and CATALOGUE_AUTOCOMPILE:
+            # Parsing the CSV is the heavy part; doing it in another process
+            # keeps it from competing with request threads for the GIL
+            subprocess.run(
+                [sys.executable, CATALOGUE_SCRIPT, DISEASE_DATA_PATH, '-o', CATALOGUE_ARTIFACT_PATH, '--if-stale'],
+                check=True, capture_output=True
+            )
+        catalogue = Catalogue.load(
+            DISEASE_DATA_PATH, CATALOGUE_ARTIFACT_PATH, compile_stale=CATALOGUE_AUTOCOMPILE
         )
-        
-        precaution_cols = [col for col in self.data.columns if col.startswith('Precaution_')]
-        self.data['Precautions'] = self.data[precaution_cols].astype(str).agg(', '.join, axis=1)
+        if PREBUILD_RESULTS:
+            catalogue.prebuild_results()
+        catalogue.medical_matcher
+        catalogue.suggester
+        if SYMPTOM_MATCHING == 'normalized':
+            catalogue.normalizer
+        after = memory_usage()
+        if after:
+            logger.info(
+                f"Worker {os.getpid()} memory: RSS {before['rss']} -> {after['rss']} KiB, "
+                f"PSS {before['pss']} -> {after['pss']} KiB, shared {after['shared']} KiB"
+            )
+        return catalogue
+
+    def reload(self):
+        """
+        Builds a new catalogue from DISEASE_DATA_PATH and swaps it in. Requests
+        already running keep the snapshot they started with; a failed reload
+        keeps the current catalogue. Returns False if a reload was already
+        running or failed.
+        """
+        if not self._reload_lock.acquire(blocking=False):
+            return False
+        try:
+            start = time.perf_counter()
+            catalogue = self._load_catalogue(compile_in_subprocess=True)
+            # Shard workers map the new snapshot before any request can ask for it
+            if self.shard_pool is not None:
+                self.shard_pool.warm(catalogue)
+            # A single reference assignment: readers see the old or new snapshot, never a mix
+            self.catalogue = catalogue
+            self.loaded_at = time.time()
+            self.result_cache.clear()
+            self.load_seconds = round(time.perf_counter() - start, 3)
+            # Also how a worker whose warm-up failed recovers
+            self.load_error = None
+            self.state = 'ready'
+            logger.info(f"Catalogue reloaded in {self.load_seconds:.2f}s")
+            return True
+        except Exception as e:
+            logger.error(f"Catalogue reload failed, keeping the current catalogue: {str(e)}")
+            return False
+        finally:
+            self._reload_lock.release()
+
+    @property
+    def reloading(self):
+        return self._reload_lock.locked()
+
+    def reload_in_background(self):
+        if self.reloading:
+            return False
+        threading.Thread(target=self.reload, name='catalogue-reload', daemon=True).start()
+        return True
+
+    def watch(self, interval, stop=None):
+        """
+        Polls DISEASE_DATA_PATH and its delta file every interval seconds and
+        reloads when either's size or modification time changes, until stop
+        (a threading.Event) is set.
+
+        A change is only loaded once the files have kept the same size and
+        modification time for a whole interval, so a CSV still being written
+        is not read half-way. Until a reload succeeds the change keeps being
+        retried.
+        """
+        stop = stop or threading.Event()
+
+        def poll(loaded):
+            changed = None
+            while not stop.wait(interval):
+                current = _source_signature()
+                if current[0] is None or current == loaded:
+                    changed = None
+                elif current != changed:
+                    changed = current
+                else:
+                    logger.info(f"{DISEASE_DATA_PATH} changed, reloading catalogue")
+                    if self.reload():
+                        loaded = current
+                    changed = None
+
+        thread = threading.Thread(
+            target=poll, args=(_source_signature(),), name='catalogue-watch', daemon=True
+        )
+        thread.start()
+        return thread
+
+    def status(self):
+        catalogue = self.catalogue
+        return {
+            "state": self.state,
+            "generation": catalogue.generation,
+            "diseases": catalogue.matrix.shape[0],
+            "symptoms": catalogue.matrix.shape[1],
+            "loaded_at": self.loaded_at,
+            "load_seconds": self.load_seconds,
+            "error": self.load_error,
+            "reloading": self.reloading,
+            "shards": self.shard_pool.shards if self.shard_pool is not None else 0,
+            "model": self.model_batcher.stats() if self.model_batcher is not None else None
+        }
     
     def predict(self, user_input, user_profile):
-        if self.data.empty:
+        # Read the snapshot once; it is never mutated, so no locking is needed
+        catalogue = self.catalogue
+        if catalogue.is_empty:
             logger.error("Medical dataset not loaded")
             return {"message": "System is initializing. Please try again shortly."}, False
         
         try:
-            symptoms = [s.strip().lower() for s in user_input.split(',') if s.strip()]
+            with metrics.stage('parse'):
+                symptoms = [s.strip().lower() for s in user_input.split(',') if s.strip()]
             if not symptoms:
                 return {"message": "Please enter at least one valid symptom"}, False
             
-            self.data['match_score'] = self.data['Symptoms'].apply(
-                lambda x: len(set(x) & set(symptoms))
-            )
-            
-            max_match = self.data['match_score'].max()
-            if max_match < MIN_SYMPTOM_MATCH:
+            child = user_profile['age'] < 18
+            with metrics.stage('score'):
+                if self.engine == 'model':
+                    symptom_ids = None
+                    query = frozenset(symptoms)
+                else:
+                    # Keyed on what is scored, so spellings of one symptom share
+                    # an entry; probabilities divide by the number of terms entered
+                    symptom_ids = self._symptom_ids(catalogue, symptoms)
+                    query = (frozenset(symptom_ids), len(set(symptoms)))
+                key = (catalogue.generation, query, child)
+                match = self.result_cache.get(key, _MISSING)
+                if match is _MISSING:
+                    match = self._match(catalogue, symptoms, child, symptom_ids)
+                    self.result_cache.set(key, match)
+            if match is None:
                 return {"message": "No strong matches found. Try more specific symptoms."}, False
-            
-            best_match = self.data.loc[self.data['match_score'].idxmax()]
-            return self._format_result(best_match, symptoms, user_profile), True
+
+            record, score, differential = match
+            with metrics.stage('medical_profile'):
+                medical_profile = self.compile_medical_profile(user_profile, catalogue)
+            with metrics.stage('format'):
+                # The model engine's score is already a probability
+                probability = score if self.engine == 'model' else None
+                result = self._format_result(record, score, symptoms, medical_profile, probability)
+            result['differential'] = [dict(entry) for entry in differential]
+            if self.engine != 'model':
+                result['matched_symptoms'] = self._matched_symptoms(catalogue, symptoms)
+            return result, True
         
         except Exception as e:
             logger.error(f"Prediction error: {str(e)}")
             return {"message": "System is processing your request. Please try again."}, False
     
-    def _format_result(self, disease_data, user_symptoms, user_profile):
-        age_group = "Child" if user_profile['age'] < 18 else "Adult"
-        med_key = 'Medicine_y' if age_group == "Child" else 'Medicine_x'
-        dosage_key = 'Dosage_y' if age_group == "Child" else 'Dosage_x'
-        
-        matched_symptoms = set(user_symptoms) & set(disease_data['Symptoms'])
-        probability = min(100, round(len(matched_symptoms) / len(set(user_symptoms)) * 100, 2))
+    def _match(self, catalogue, symptoms, child, symptom_ids=None):
+        """
+        The user-independent part of a prediction: (record, score,
+        differential) for the best match, or None when nothing matches.
+        symptom_ids are symptoms' resolved ids, when already known.
+        """
+        if self.engine == 'model':
+            return self._model_match(catalogue, self.model_batcher.submit(self.model.text(symptoms)), child)
+        if symptom_ids is None:
+            symptom_ids = self._symptom_ids(catalogue, symptoms)
+        if not symptom_ids:
+            return None
+
+        # Ranked best score first, earlier rows first on ties, so the top
+        # row is the same one idxmax over the full frame would pick
+        weights = self._weights(child)
+        rows, scores = self._rank(catalogue, symptom_ids, weights)
+        if weights:
+            # Weights only order the matches; probabilities stay overlap-based
+            scores = catalogue.overlap(rows, symptom_ids)
+        if not len(scores) or scores[0] < MIN_SYMPTOM_MATCH:
+            return None
+
+        differential = tuple(self._differential(catalogue, rows, scores, symptoms))
+        return catalogue.result(rows[0], child), int(scores[0]), differential
+
+    def compile_medical_profile(self, user_profile, catalogue=None):
+        """
+        The user's allergies and conditions compiled against the catalogue;
+        cached on the raw text, so repeat calls are dictionary lookups.
+        """
+        catalogue = catalogue or self.catalogue
+        return catalogue.medical_matcher.compile(
+            user_profile['allergies'], user_profile['medical_conditions']
+        )
+
+    def _format_result(self, record, score, user_symptoms, medical_profile, probability=None, timed=True):
+        if probability is None:
+            # The score counts distinct query symptoms the disease lists, i.e.
+            # the size of the matched symptom set
+            probability = match_probability(int(score), len(set(user_symptoms)))
         
         recommendations = []
-        medicine = disease_data.get(med_key, 'Consult doctor')
-        dosage = disease_data.get(dosage_key, 'Consult doctor')
+        medicine = record.medicine
+        dosage = record.dosage
         
-        if user_profile['allergies'] and self._check_allergy(medicine, user_profile['allergies']):
+        # Stages are timed per request; in a batch they would be per item
+        with metrics.stage('allergy_check') if timed else UNTIMED:
+            allergic = medical_profile.allergic_to(record.medication_pieces)
+        if allergic:
             recommendations.append(f"⚠️ Allergy warning for {medicine}")
-            alt_med = disease_data.get('Alternative_Therapies', 'Consult doctor for alternatives')
-            recommendations.append(f"💊 Alternative: {alt_med}")
+            recommendations.append(record.alternative)
             medicine = "Consult doctor (allergy risk)"
             dosage = "Consult doctor"
         
-        if int(disease_data.get('Severity_Score', 0)) >= HIGH_SEVERITY_THRESHOLD:
+        if record.severity_score >= HIGH_SEVERITY_THRESHOLD:
             recommendations.append("🚨 High severity - seek immediate care")
         
         if not recommendations:
             recommendations.append("✅ Follow standard treatment guidelines")
             recommendations.append("🩺 Monitor symptoms and consult doctor if they worsen")
+
+        with metrics.stage('history_check') if timed else UNTIMED:
+            medical_history_match = medical_profile.history_match(record.disease)
+        if medical_history_match:
+            recommendations.insert(0, "⚠️ History match - consult your doctor")
         
         return {
-            "disease": disease_data.get('Disease', 'Unknown condition'),
-            "description": disease_data.get('Description', 'Consult healthcare professional'),
+            "disease": record.disease,
+            "description": record.description,
             "probability": probability,
             "medicine": medicine,
             "dosage": dosage,
-            "precautions": disease_data.get('Precautions', 'General health precautions recommended'),
-            "workout": [w for w in disease_data.get('Workout', '').split(',') if w.strip()],
-            "severity": min(10, int(disease_data.get('Severity_Score', 5))),
-            "recommendations": recommendations
+            "precautions": record.precautions,
+            "workout": list(record.workout),
+            "severity": record.severity,
+            "recommendations": recommendations,
+            "medical_history_match": medical_history_match
         }
     
-    def _check_allergy(self, medication, allergies):
-        if not medication or not allergies:
-            return False
-        return any(
-            med.strip().lower() in allergies.lower() 
-            for med in medication.split(',')
+    def predict_batch(self, inputs, profiles):
+        """
+        Scores many symptom strings together; returns one (result, success)
+        pair per input, in order, with the same contents predict() would give.
+        """
+        catalogue = self.catalogue
+        if catalogue.is_empty:
+            logger.error("Medical dataset not loaded")
+            return [({"message": "System is initializing. Please try again shortly."}, False)] * len(inputs)
+
+        if self.engine == 'model':
+            return self._predict_batch_model(catalogue, inputs, profiles)
+
+        with gc_paused():
+            return self._predict_batch_catalogue(catalogue, inputs, profiles)
+
+    def _predict_batch_catalogue(self, catalogue, inputs, profiles):
+        results = [None] * len(inputs)
+        parsed = []
+        # Each distinct term of the batch is resolved and named once
+        resolve = catalogue.normalizer.resolve if SYMPTOM_MATCHING == 'normalized' else catalogue.symptom_ids.get
+        terms = {}
+        for i, user_input in enumerate(inputs):
+            symptoms = [s for s in map(str.strip, user_input.lower().split(',')) if s]
+            matched = []
+            symptom_ids = set()
+            for symptom in dict.fromkeys(symptoms):
+                term = terms.get(symptom)
+                if term is None:
+                    symptom_id = resolve(symptom)
+                    term = terms[symptom] = (symptom_id, None if symptom_id is None else catalogue.symptom_name(symptom_id))
+                if term[0] is not None:
+                    symptom_ids.add(term[0])
+                matched.append({"input": symptom, "symptom": term[1]})
+            if not symptoms:
+                results[i] = ({"message": "Please enter at least one valid symptom"}, False)
+            elif not symptom_ids:
+                results[i] = ({"message": "No strong matches found. Try more specific symptoms."}, False)
+            else:
+                parsed.append((i, symptoms, symptom_ids, matched))
+
+        try:
+            ranked = [None] * len(parsed)
+            # One product per weight set: everyone together, or per age group
+            groups = {}
+            for n, (i, _, _, _) in enumerate(parsed):
+                groups.setdefault(self._weights(profiles[i]['age'] < 18), []).append(n)
+            for weights, members in groups.items():
+                scored = self._rank_batch(catalogue, [parsed[n][2] for n in members], weights)
+                for n, (rows, scores) in zip(members, scored):
+                    if weights:
+                        scores = catalogue.overlap(rows, parsed[n][2])
+                    ranked[n] = (rows, scores)
+            differentials = self._differentials(catalogue, ranked, [len(matched) for _, _, _, matched in parsed])
+        except Exception as e:
+            logger.error(f"Batch prediction error: {str(e)}")
+            ranked = None
+
+        for n, (i, symptoms, _, matched) in enumerate(parsed):
+            try:
+                if ranked is None:
+                    raise RuntimeError("batch scoring failed")
+                rows, scores = ranked[n]
+                if not len(scores) or scores[0] < MIN_SYMPTOM_MATCH:
+                    results[i] = ({"message": "No strong matches found. Try more specific symptoms."}, False)
+                    continue
+                record = catalogue.result(rows[0], profiles[i]['age'] < 18)
+                medical_profile = self.compile_medical_profile(profiles[i], catalogue)
+                probability = match_probability(int(scores[0]), len(matched))
+                result = self._format_result(record, scores[0], symptoms, medical_profile, probability, timed=False)
+                result['differential'] = differentials[n]
+                result['matched_symptoms'] = matched
+                results[i] = (result, True)
+            except Exception as e:
+                logger.error(f"Prediction error: {str(e)}")
+                results[i] = ({"message": "System is processing your request. Please try again."}, False)
+        return results
+
+    def _predict_batch_model(self, catalogue, inputs, profiles):
+        # A batch is scored in one predict_proba call, without the batcher
+        results = [None] * len(inputs)
+        parsed = []
+        for i, user_input in enumerate(inputs):
+            symptoms = [s.strip().lower() for s in user_input.split(',') if s.strip()]
+            if symptoms:
+                parsed.append((i, symptoms))
+            else:
+                results[i] = ({"message": "Please enter at least one valid symptom"}, False)
+
+        try:
+            ranked = self.model.rank([self.model.text(symptoms) for _, symptoms in parsed], TOP_K_RESULTS)
+        except Exception as e:
+            logger.error(f"Batch prediction error: {str(e)}")
+            ranked = None
+
+        for n, (i, symptoms) in enumerate(parsed):
+            try:
+                if ranked is None:
+                    raise RuntimeError("batch scoring failed")
+                match = self._model_match(catalogue, ranked[n], profiles[i]['age'] < 18)
+                if match is None:
+                    results[i] = ({"message": "No strong matches found. Try more specific symptoms."}, False)
+                    continue
+                record, probability, differential = match
+                medical_profile = self.compile_medical_profile(profiles[i], catalogue)
+                result = self._format_result(record, probability, symptoms, medical_profile, probability, timed=False)
+                result['differential'] = [dict(entry) for entry in differential]
+                results[i] = (result, True)
+            except Exception as e:
+                logger.error(f"Prediction error: {str(e)}")
+                results[i] = ({"message": "System is processing your request. Please try again."}, False)
+        return results
+
+    def _model_match(self, catalogue, ranked, child):
+        """
+        (record, probability, differential) like _match for the model's
+        (class, probability) ranking, skipping classes the catalogue lacks.
+        """
+        if ranked is None:
+            return None
+        entries = [
+            (row, round(probability * 100, 2))
+            for row, probability in ((catalogue.find_disease(self.model.classes[i]), p) for i, p in ranked)
+            if row is not None and probability > 0
+        ]
+        if not entries:
+            return None
+        differential = tuple(
+            {"disease": catalogue.disease(row), "probability": probability} for row, probability in entries
         )
+        return catalogue.result(entries[0][0], child), entries[0][1], differential
+
+    def _rank(self, catalogue, symptom_ids, weights):
+        method = 'rank_sparse' if self.engine == 'sparse' else 'rank_index'
+        if self.shard_pool is not None:
+            try:
+                return self.shard_pool.rank(catalogue, method, symptom_ids, TOP_K_RESULTS, weights)
+            except Exception as e:
+                logger.warning(f"Sharded ranking failed, ranking in process: {str(e)}")
+        return getattr(catalogue, method)(symptom_ids, TOP_K_RESULTS, weights)
+
+    def _rank_batch(self, catalogue, symptom_id_sets, weights):
+        if self.shard_pool is not None:
+            try:
+                return self.shard_pool.rank_batch(catalogue, symptom_id_sets, TOP_K_RESULTS, weights)
+            except Exception as e:
+                logger.warning(f"Sharded ranking failed, ranking in process: {str(e)}")
+        return catalogue.rank_batch(symptom_id_sets, TOP_K_RESULTS, weights)
+
+    def _matched_symptoms(self, catalogue, symptoms):
+        """
+        The catalogue symptom each entered term was read as, or None, so a
+        resolved typo, plural or synonym is shown rather than silently used.
+        """
+        resolve = catalogue.normalizer.resolve if SYMPTOM_MATCHING == 'normalized' else catalogue.symptom_ids.get
+        matched = []
+        for symptom in dict.fromkeys(symptoms):
+            symptom_id = resolve(symptom)
+            matched.append({
+                "input": symptom,
+                "symptom": None if symptom_id is None else catalogue.symptom_name(symptom_id)
+            })
+        return matched
+
+    def _symptom_ids(self, catalogue, symptoms):
+        if SYMPTOM_MATCHING == 'normalized':
+            return catalogue.normalizer.lookup(symptoms)
+        return catalogue.lookup(symptoms)
+
+    def _weights(self, child):
+        if self.scoring == 'weighted':
+            return 'child' if child else 'adult'
+        return None
+
+    def _differential(self, catalogue, rows, scores, user_symptoms):
+        # The dataset lists some diseases on several rows; rows come best
+        # first, so each disease is shown once, at its best score
+        query_size = len(set(user_symptoms))
+        differential = []
+        seen = set()
+        for row, score in zip(rows.tolist(), scores.tolist()):
+            disease = catalogue.disease(row)
+            key = disease.strip().lower()
+            if score >= MIN_SYMPTOM_MATCH and key not in seen:
+                seen.add(key)
+                differential.append({"disease": disease, "probability": match_probability(score, query_size)})
+        return differential
+
+    def _differentials(self, catalogue, ranked, query_sizes):
+        """
+        _differential for each (rows, scores) in ranked, with the repeated
+        diseases of the whole batch found together.
+        """
+        names, scores, bounds = catalogue.best_per_disease(ranked, MIN_SYMPTOM_MATCH)
+        return [
+            [
+                {"disease": name, "probability": match_probability(score, query_size)}
+                for name, score in zip(names[start:end], scores[start:end])
+            ]
+            for start, end, query_size in zip(bounds[:-1], bounds[1:], query_sizes)
+        ]
 
-# Initialize predictor singleton
+hasher = PasswordHasher(PASSWORD_HASH_METHOD, PASSWORD_SALT_LENGTH, PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING)
+BUSY = {"status": "error", "message": "Our system is currently busy. Please try again shortly."}
+
+# Initialize predictor singleton; its catalogue loads on start() unless
+# CATALOGUE_WARMUP is 'eager'
 predictor = DiseasePredictor()
 
-# Decorators
-def login_required(f):
-    @wraps(f)
-    def decorated(*args, **kwargs):
-        if 'user_id' not in session:
-            flash('Please login to access this page', 'warning')
-            return redirect(url_for('index'))
-        return f(*args, **kwargs)
-    return decorated
+profile_cache = LRUCache(PROFILE_CACHE_SIZE, ttl=PROFILE_CACHE_TTL)
+# Profile writes per user in this worker. A read only caches what it loaded
+# if no write landed meanwhile: one that read the row just before an update
+# committed would otherwise keep the old profile for the whole TTL
+_profile_writes = {}
+_profile_lock = threading.Lock()
 
-# Routes
-@app.route('/')
-def index():
-    return render_template('index.html')
+def invalidate_profile(user_id):
+    """Drops a user's cached profile; call after the update has committed."""
+    with _profile_lock:
+        _profile_writes[user_id] = _profile_writes.get(user_id, 0) + 1
+        profile_cache.invalidate(user_id)
 
-@app.route('/login', methods=['POST'])
-@csrf.exempt
-def login():
-    username = request.form.get('username')
-    password = request.form.get('password')
-    
-    if not username or not password:
-        return jsonify({"status": "error", "message": "Username and password required"}), 400
-    
-    user = User.query.filter_by(username=username).first()
-    
-    if not user:
-        return jsonify({
-            "status": "error", 
-            "message": "Invalid credentials"
-        }), 401
-    
-    if not check_password_hash(user.password, password):
-        return jsonify({
-            "status": "error", 
-            "message": "Invalid credentials"
-        }), 401
-    
-    session['user_id'] = user.id
-    session.permanent = True
-    
-    return jsonify({
-        "status": "success",
-        "redirect": url_for('dashboard')
-    })
+def user_profile_of(user):
+    return {
+        'age': user.age,
+        'allergies': user.allergies or '',
+        'medical_conditions': user.medical_conditions or '',
+        'past_medications': user.past_medications or ''
+    }
 
-@app.route('/dashboard')
-@login_required
-def dashboard():
-    user = User.query.get(session['user_id'])
-    if not user:
-        flash('Session expired. Please login again.', 'warning')
-        return redirect(url_for('index'))
-    return render_template('dashboard.html', user=user)
+def load_user_profile(user_id):
+    """
+    The prediction profile for a user, from the cache when possible; None if
+    the user no longer exists. Callers must not modify the returned dict.
+    """
+    profile = profile_cache.get(user_id)
+    if profile is None:
+        with _profile_lock:
+            writes = _profile_writes.get(user_id, 0)
+        user = User.query.get(user_id)
+        if not user:
+            return None
+        profile = user_profile_of(user)
+        with _profile_lock:
+            if _profile_writes.get(user_id, 0) == writes:
+                profile_cache.set(user_id, profile)
+    return profile
 
-@app.route('/logout')
-def logout():
-    session.clear()
-    flash('You have been logged out successfully', 'success')
-    return redirect(url_for('index'))
+# Request handling shared by the Flask routes and the ASGI app (asgi.py):
+# each takes plain values and returns (JSON body, status)
+def authenticate(username, password):
+    """
+    The id of the user with these credentials, or None.
+    """
+    user = User.query.filter_by(username=username).first()
+    if not user or not hasher.verify(user.password, password):
+        return None
+    if hasher.needs_rehash(user.password):
+        # Made with other cost parameters; the plain password is only here now
+        try:
+            user.password = hasher.hash(password)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.warning(f"Could not rehash the password of user {user.id}: {str(e)}")
+    return user.id
 
-@app.route('/register', methods=['POST'])
-def register():
+def register_response(form):
     try:
         required_fields = ['username', 'password', 'age']
-        if any(field not in request.form for field in required_fields):
-            return jsonify({"status": "error", "message": "Missing required fields"}), 400
-            
-        if User.query.filter_by(username=request.form['username']).first():
-            return jsonify({
-                "status": "error", 
-                "message": "Username already exists"
-            }), 400
+        if any(field not in form for field in required_fields):
+            return {"status": "error", "message": "Missing required fields"}, 400
             
         user = User(
-            username=request.form['username'],
-            password=generate_password_hash(request.form['password']),
-            age=int(request.form.get('age', 0)),
-            height=int(request.form.get('height', 0)),
-            weight=int(request.form.get('weight', 0)),
-            gender=request.form.get('gender', 'other'),
+            username=form['username'],
+            password=hasher.hash(form['password']),
+            age=int(form.get('age', 0)),
+            height=int(form.get('height', 0)),
+            weight=int(form.get('weight', 0)),
+            gender=form.get('gender', 'other'),
             allergies='',
             medical_conditions='',
             past_medications=''
@@ -238,125 +875,453 @@ def register():
         db.session.add(user)
         db.session.commit()
         
-        return jsonify({
+        return {
             "status": "success",
             "message": "Registration successful. Please login."
-        })
+        }, 200
+    except IntegrityError:
+        # The unique index on username, rather than a lookup before every insert
+        db.session.rollback()
+        return {
+            "status": "error", 
+            "message": "Username already exists"
+        }, 400
+    except HasherBusy:
+        return BUSY, 503
     except Exception as e:
         db.session.rollback()
-        return jsonify({
+        return {
             "status": "error", 
             "message": f"Registration failed: {str(e)}"
-        }), 400
+        }, 400
 
-@app.route('/predict', methods=['POST'])
-@login_required
-@csrf.exempt
-def predict():
-    try:
-        user = User.query.get(session['user_id'])
-        if not user:
-            return jsonify({"status": "error", "message": "Session expired. Please login again."}), 401
+def read_users(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        yield from csv.DictReader(f)
 
-        symptoms = request.form.get('symptoms', '').strip()
-        if not symptoms:
-            return jsonify({"status": "error", "message": "Please enter symptoms"}), 400
+def import_users(rows, batch_size=IMPORT_BATCH_SIZE):
+    """
+    Creates users from dicts with the registration form's fields (username,
+    password and age required; allergies, medical_conditions and
+    past_medications optional), batch_size per transaction. Rows missing a
+    required field, with an age, height or weight that is not a whole number,
+    or repeating a username, in the database or earlier in rows, are skipped.
+    Returns (created, skipped).
+    """
+    created = skipped = 0
+    seen = set()
+    rows = iter(rows)
+    while True:
+        batch = list(itertools.islice(rows, batch_size))
+        if not batch:
+            return created, skipped
+        complete = []
+        for row in batch:
+            if row.get('username') and row.get('password') and row.get('age'):
+                user = _imported_user(row)
+                if user is not None:
+                    complete.append(user)
+        existing = set(db.session.scalars(
+            select(User.username).where(User.username.in_([user['username'] for user in complete]))
+        ))
+        fresh = []
+        for user in complete:
+            if user['username'] not in existing and user['username'] not in seen:
+                seen.add(user['username'])
+                fresh.append(user)
+        # Hashed last, so invalid and duplicate rows cost no hashing
+        for user, pwhash in zip(fresh, hasher.hash_many([user['password'] for user in fresh])):
+            user['password'] = pwhash
+        if fresh:
+            db.session.execute(insert(User), fresh)
+            db.session.commit()
+        created += len(fresh)
+        skipped += len(batch) - len(fresh)
 
-        user_profile = {
-            'age': user.age,
-            'allergies': user.allergies or '',
-            'medical_conditions': user.medical_conditions or '',
-            'past_medications': user.past_medications or ''
+def _imported_user(row):
+    # The User columns for one import row, or None if a number does not parse
+    try:
+        return {
+            'username': row['username'],
+            'password': row['password'],
+            'age': int(row['age']),
+            'height': int(row.get('height') or 0),
+            'weight': int(row.get('weight') or 0),
+            'gender': row.get('gender') or 'other',
+            'allergies': row.get('allergies') or '',
+            'medical_conditions': row.get('medical_conditions') or '',
+            'past_medications': row.get('past_medications') or ''
         }
+    except (TypeError, ValueError):
+        return None
+
+def unavailable_response():
+    """
+    The response to prediction requests until the catalogue is loaded.
+    """
+    if predictor.state == 'failed':
+        return {"status": "error", "message": "Predictions are unavailable right now. Please try again later."}, 503
+    return {"status": "error", "message": "System is initializing. Please try again shortly."}, 503
+
+def prediction_response(user_id, symptoms):
+    if not predictor.ready:
+        return unavailable_response()
+    try:
+        with metrics.stage('user_lookup'):
+            user_profile = load_user_profile(user_id)
+        if user_profile is None:
+            return {"status": "error", "message": "Session expired. Please login again."}, 401
+
+        symptoms = symptoms.strip()
+        if not symptoms:
+            return {"status": "error", "message": "Please enter symptoms"}, 400
         
         result, success = predictor.predict(symptoms, user_profile)
         
         if not success:
-            return jsonify({
+            return {
                 "status": "info",
                 "message": result.get("message", "No strong matches found"),
                 "data": None
-            })
-
-        medical_history_match = False
-        if user.medical_conditions and result.get('disease'):
-            user_conditions = [c.strip().lower() for c in user.medical_conditions.split(',')]
-            disease_lower = result['disease'].lower()
-            medical_history_match = any(
-                condition in disease_lower or disease_lower in condition
-                for condition in user_conditions
-                if condition
-            )
-            if medical_history_match and 'recommendations' in result:
-                result['recommendations'].insert(0, "⚠️ History match - consult your doctor")
+            }, 200
 
-        return jsonify({
+        return {
             "status": "success",
-            "data": {
-                **result,
-                "medical_history_match": medical_history_match
-            }
-        })
+            "data": result
+        }, 200
 
     except Exception as e:
         logger.error(f"Prediction error: {str(e)}", exc_info=True)
-        return jsonify({
+        return {
             "status": "error",
             "message": "Our system is currently busy. Please try again shortly."
-        }), 500
+        }, 500
 
-@app.route('/update_profile', methods=['POST'])
-@login_required
-def update_profile():
+def batch_prediction_response(user_id, payload):
+    if not predictor.ready:
+        return unavailable_response()
+    try:
+        default_profile = load_user_profile(user_id)
+        if default_profile is None:
+            return {"status": "error", "message": "Session expired. Please login again."}, 401
+
+        payload = payload if isinstance(payload, dict) else {}
+        inputs = payload.get('symptoms')
+        if not isinstance(inputs, list) or not inputs or not all(isinstance(s, str) for s in inputs):
+            return {"status": "error", "message": "Expected a non-empty list of symptom strings"}, 400
+        if len(inputs) > MAX_BATCH_SIZE:
+            return {"status": "error", "message": f"At most {MAX_BATCH_SIZE} submissions per batch"}, 400
+
+        # Submissions without their own profile are scored against the caller's
+        profiles = payload.get('profiles') or [None] * len(inputs)
+        if not isinstance(profiles, list) or len(profiles) != len(inputs):
+            return {"status": "error", "message": "profiles must match symptoms in length"}, 400
+        try:
+            profiles = [
+                default_profile if profile is None else {
+                    'age': int(profile.get('age', default_profile['age'])),
+                    'allergies': profile.get('allergies') or '',
+                    'medical_conditions': profile.get('medical_conditions') or '',
+                    'past_medications': profile.get('past_medications') or ''
+                }
+                for profile in profiles
+            ]
+        except (AttributeError, TypeError, ValueError):
+            return {"status": "error", "message": "Invalid profile"}, 400
+
+        results = []
+        for result, success in predictor.predict_batch(inputs, profiles):
+            if not success:
+                results.append({
+                    "status": "info",
+                    "message": result.get("message", "No strong matches found"),
+                    "data": None
+                })
+                continue
+            results.append({"status": "success", "data": result})
+
+        return {"status": "success", "results": results}, 200
+
+    except Exception as e:
+        logger.error(f"Batch prediction error: {str(e)}", exc_info=True)
+        return {
+            "status": "error",
+            "message": "Our system is currently busy. Please try again shortly."
+        }, 500
+
+def update_profile_response(user_id, form):
     try:
-        user = User.query.get(session['user_id'])
+        user = User.query.get(user_id)
         if not user:
-            return jsonify({"status": "error", "message": "Session expired"}), 401
+            return {"status": "error", "message": "Session expired"}, 401
             
-        user.age = int(request.form.get('age', user.age))
-        user.height = int(request.form.get('height', user.height))
-        user.weight = int(request.form.get('weight', user.weight))
-        user.gender = request.form.get('gender', user.gender)
+        user.age = int(form.get('age', user.age))
+        user.height = int(form.get('height', user.height))
+        user.weight = int(form.get('weight', user.weight))
+        user.gender = form.get('gender', user.gender)
         
         db.session.commit()
-        return jsonify({
+        invalidate_profile(user.id)
+        return {
             "status": "success", 
             "message": "Profile updated successfully"
-        })
+        }, 200
         
     except Exception as e:
         db.session.rollback()
-        return jsonify({
+        return {
             "status": "error", 
             "message": f"Update failed: {str(e)}"
-        }), 400
+        }, 400
 
-@app.route('/update_medical_info', methods=['POST'])
-@login_required
-def update_medical_info():
+def update_medical_info_response(user_id, form):
     try:
-        user = User.query.get(session['user_id'])
+        user = User.query.get(user_id)
         if not user:
-            return jsonify({"status": "error", "message": "Session expired"}), 401
+            return {"status": "error", "message": "Session expired"}, 401
             
-        user.allergies = request.form.get('allergies', '')
-        user.medical_conditions = request.form.get('medical_conditions', '')
-        user.past_medications = request.form.get('past_medications', '')
+        user.allergies = form.get('allergies', '')
+        user.medical_conditions = form.get('medical_conditions', '')
+        user.past_medications = form.get('past_medications', '')
         
         db.session.commit()
-        return jsonify({
+        invalidate_profile(user.id)
+        # Compile the new allergy/condition lists now rather than on the next prediction
+        predictor.compile_medical_profile(user_profile_of(user))
+        return {
             "status": "success", 
             "message": "Medical information updated successfully"
-        })
+        }, 200
         
     except Exception as e:
         db.session.rollback()
-        return jsonify({
+        return {
             "status": "error", 
             "message": f"Update failed: {str(e)}"
-        }), 400
+        }, 400
+
+# Decorators
+def login_required(f):
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        if 'user_id' not in session:
+            flash('Please login to access this page', 'warning')
+            return redirect(url_for('index'))
+        return f(*args, **kwargs)
+    return decorated
+
+def admin_token_required(f):
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        token = app.config.get('ADMIN_TOKEN')
+        supplied = request.headers.get('X-Admin-Token', '')
+        if not token or not hmac.compare_digest(supplied, token):
+            return jsonify({"status": "error", "message": "Forbidden"}), 403
+        return f(*args, **kwargs)
+    return decorated
+
+@app.before_request
+def start_warm_up():
+    predictor.start()
+
+# Request timing; the hooks are only installed when something uses them
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    if profiler is not None:
+        profiler.begin()
+
+def record_request_time(response):
+    metrics.observe(
+        'http_request_duration_seconds', time.perf_counter() - g.request_started,
+        endpoint=request.endpoint or 'none', method=request.method, status=response.status_code
+    )
+    return response
+
+def finish_request_profile(exc):
+    if 'request_started' in g:
+        path = profiler.end(request.endpoint or 'none', time.perf_counter() - g.request_started)
+        if path:
+            logger.warning(f"Slow request {request.method} {request.path}: stacks written to {path}")
+
+if METRICS_ENABLED or profiler is not None:
+    app.before_request(start_request_timer)
+if METRICS_ENABLED:
+    app.after_request(record_request_time)
+if profiler is not None:
+    app.teardown_request(finish_request_profile)
+
+# Routes
+@app.route('/')
+def index():
+    return render_template('index.html')
+
+@app.route('/assets/<path:filename>')
+def static_asset(filename):
+    found = assets.resolve(filename, request.accept_encodings)
+    if found is None:
+        abort(404)
+    path, encoding = found
+    response = send_file(path, mimetype=mimetypes.guess_type(filename)[0], max_age=STATIC_ASSET_MAX_AGE)
+    if encoding:
+        response.content_encoding = encoding
+    response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+@app.route('/login', methods=['POST'])
+@csrf.exempt
+def login():
+    username = request.form.get('username')
+    password = request.form.get('password')
+    
+    if not username or not password:
+        return jsonify({"status": "error", "message": "Username and password required"}), 400
+    
+    try:
+        user_id = authenticate(username, password)
+    except HasherBusy:
+        return jsonify(BUSY), 503
+    if user_id is None:
+        return jsonify({
+            "status": "error", 
+            "message": "Invalid credentials"
+        }), 401
+    
+    session['user_id'] = user_id
+    session.permanent = True
+    
+    return jsonify({
+        "status": "success",
+        "redirect": url_for('dashboard')
+    })
+
+@app.route('/dashboard')
+@login_required
+def dashboard():
+    user = User.query.get(session['user_id'])
+    if not user:
+        flash('Session expired. Please login again.', 'warning')
+        return redirect(url_for('index'))
+    return render_template('dashboard.html', user=user)
+
+@app.route('/logout')
+def logout():
+    session.clear()
+    flash('You have been logged out successfully', 'success')
+    return redirect(url_for('index'))
+
+@app.route('/register', methods=['POST'])
+def register():
+    body, status = register_response(request.form)
+    return jsonify(body), status
+
+@app.route('/predict', methods=['POST'])
+@login_required
+@csrf.exempt
+def predict():
+    body, status = prediction_response(session['user_id'], request.form.get('symptoms', ''))
+    with metrics.stage('serialize'):
+        response = jsonify(body)
+    return response, status
+
+@app.route('/predict/batch', methods=['POST'])
+@login_required
+@csrf.exempt
+def predict_batch():
+    body, status = batch_prediction_response(session['user_id'], request.get_json(silent=True))
+    return jsonify(body), status
+
+@app.route('/update_profile', methods=['POST'])
+@login_required
+def update_profile():
+    body, status = update_profile_response(session['user_id'], request.form)
+    return jsonify(body), status
+
+@app.route('/update_medical_info', methods=['POST'])
+@login_required
+def update_medical_info():
+    body, status = update_medical_info_response(session['user_id'], request.form)
+    return jsonify(body), status
+
+@app.route('/admin/reload_catalogue', methods=['POST'])
+@csrf.exempt
+@admin_token_required
+def reload_catalogue():
+    if not predictor.reload_in_background():
+        return jsonify({"status": "info", "message": "A reload is already running"}), 409
+    return jsonify({"status": "success", "message": "Catalogue reload started"}), 202
+
+@app.route('/symptoms/suggest')
+def suggest_symptoms():
+    catalogue = predictor.catalogue
+    limit = min(max(request.args.get('limit', SUGGESTION_LIMIT, type=int), 1), MAX_SUGGESTION_LIMIT)
+    response = jsonify({
+        "status": "success",
+        "suggestions": list(catalogue.suggester.suggest(request.args.get('q', ''), limit))
+    })
+    # Suggestions only change with the catalogue, so clients and proxies can
+    # keep them and revalidate with If-None-Match for a 304
+    response.set_etag(catalogue.version)
+    response.cache_control.public = True
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+@app.route('/healthz')
+def healthz():
+    # Liveness: the process serves requests, whatever the catalogue's state
+    return jsonify({"status": "ok", "catalogue": predictor.state})
+
+@app.route('/readyz')
+def readyz():
+    # Readiness: only workers with a loaded catalogue should get traffic
+    status = predictor.status()
+    return jsonify({
+        "status": "ready" if predictor.ready else "not ready",
+        **{key: status[key] for key in ('state', 'error', 'load_seconds', 'loaded_at', 'generation', 'diseases')}
+    }), 200 if predictor.ready else 503
+
+@app.route('/stats')
+@admin_token_required
+def stats():
+    return jsonify({
+        "catalogue": predictor.status(),
+        "profile_cache": profile_cache.stats(),
+        "result_cache": predictor.result_cache.stats()
+    })
+
+@app.route('/metrics')
+@admin_token_required
+def metrics_endpoint():
+    if not metrics.enabled:
+        abort(404)
+    catalogue = predictor.catalogue
+    extra = [('catalogue_generation', 'gauge', 'Catalogue snapshots loaded by this process', catalogue.generation)]
+    for name, cache in (('result_cache', predictor.result_cache), ('profile_cache', profile_cache)):
+        cache_stats = cache.stats()
+        extra += [
+            (f'{name}_hits_total', 'counter', f'Lookups answered from the {name.replace("_", " ")}', cache_stats['hits']),
+            (f'{name}_misses_total', 'counter', f'Lookups missing the {name.replace("_", " ")}', cache_stats['misses']),
+            (f'{name}_entries', 'gauge', f'Entries held in the {name.replace("_", " ")}', cache_stats['size']),
+        ]
+    if predictor.model_batcher is not None:
+        batcher_stats = predictor.model_batcher.stats()
+        extra += [
+            ('model_batches_total', 'counter', 'predict_proba calls made for request batches', batcher_stats['batches']),
+            ('model_batched_queries_total', 'counter', 'Queries scored in those batches', batcher_stats['items']),
+        ]
+    return app.response_class(metrics.render(extra), mimetype='text/plain; version=0.0.4')
+
+@app.cli.command('import-users')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--batch-size', default=IMPORT_BATCH_SIZE, show_default=True, help="Users inserted per transaction.")
+def import_users_command(path, batch_size):
+    """Create users from a CSV with the registration form's columns."""
+    start = time.perf_counter()
+    created, skipped = import_users(read_users(path), batch_size)
+    click.echo(f"{created} users created, {skipped} rows skipped in {time.perf_counter() - start:.1f}s")
 
 if __name__ == '__main__':
     with app.app_context():
         db.create_all()
-    app.run( debug=True ,host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
+    app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
@@ -0,0 +1,246 @@
+"""
+ASGI entry point for the prediction API.
+
+    uvicorn asgi:application --host 0.0.0.0 --port 8000
+
+Login, registration, profile updates and single/batch prediction are served
+on the event loop. Their work (database access, password hashing, scoring)
+runs in a bounded thread pool, inside a Flask app context, through the same
+handlers the Flask routes use. When that pool's queue is full, requests get
+a 503 straight away instead of piling up. Every other path (pages, static
+files, autocomplete, admin) is passed to the Flask app unchanged.
+
+The catalogue starts loading in the background at server startup; /readyz
+(served by the Flask app) answers 200 once it is loaded.
+
+Sessions use Flask's signed cookie and CSRF tokens use Flask-WTF's format,
+so a login or token from either app is valid in both.
+"""
+import asyncio
+import hmac
+import os
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import partial
+
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, RedirectResponse
+from starlette.routing import Mount, Route
+
+with warnings.catch_warnings():
+    # Deprecated in favour of a2wsgi, which is not a dependency; still works
+    warnings.simplefilter('ignore', DeprecationWarning)
+    from starlette.middleware.wsgi import WSGIMiddleware
+
+from app import (
+    BUSY, app as flask_app, authenticate, batch_prediction_response, logger, metrics, prediction_response,
+    predictor, profiler, register_response, update_medical_info_response, update_profile_response
+)
+from passwords import HasherBusy
+
+# Threads running handlers. Scoring mostly holds the GIL, so more threads
+# add queueing rather than throughput
+ASGI_THREADS = int(os.environ.get('ASGI_THREADS', 4))
+# Requests queued for or running on those threads before new ones get a 503
+ASGI_MAX_PENDING = int(os.environ.get('ASGI_MAX_PENDING', 256))
+
+executor = ThreadPoolExecutor(max_workers=ASGI_THREADS, thread_name_prefix='asgi-handler')
+session_serializer = flask_app.session_interface.get_signing_serializer(flask_app)
+csrf_serializer = URLSafeTimedSerializer(
+    flask_app.config.get('WTF_CSRF_SECRET_KEY') or flask_app.secret_key, salt='wtf-csrf-token'
+)
+SESSION_COOKIE = flask_app.config['SESSION_COOKIE_NAME']
+SESSION_LIFETIME = int(flask_app.permanent_session_lifetime.total_seconds())
+CSRF_TIME_LIMIT = flask_app.config.get('WTF_CSRF_TIME_LIMIT', 3600)
+urls = flask_app.url_map.bind('')
+INDEX_URL = urls.build('index')
+DASHBOARD_URL = urls.build('dashboard')
+
+
+class Busy(Exception):
+    pass
+
+
+class Pool:
+    """
+    Runs handlers on the executor, counting queued and running calls so
+    callers can be turned away once ASGI_MAX_PENDING are waiting.
+    Only used from the event loop thread.
+    """
+
+    def __init__(self, executor, max_pending):
+        self.executor = executor
+        self.max_pending = max_pending
+        self.pending = 0
+
+    async def run(self, handler, *args):
+        if self.pending >= self.max_pending:
+            raise Busy()
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                self.executor, partial(_in_app_context, handler, *args)
+            )
+        finally:
+            self.pending -= 1
+
+
+def _in_app_context(handler, *args):
+    with flask_app.app_context():
+        if profiler is None:
+            return handler(*args)
+        # Sampled on the handler thread; the event loop thread is shared
+        started = time.perf_counter()
+        profiler.begin()
+        try:
+            return handler(*args)
+        finally:
+            path = profiler.end(handler.__name__, time.perf_counter() - started)
+            if path:
+                logger.warning(f"Slow {handler.__name__} call: stacks written to {path}")
+
+
+pool = Pool(executor, ASGI_MAX_PENDING)
+
+
+def load_session(request):
+    value = request.cookies.get(SESSION_COOKIE)
+    if not value:
+        return {}
+    try:
+        return dict(session_serializer.loads(value, max_age=SESSION_LIFETIME))
+    except BadSignature:
+        return {}
+
+
+def save_session(response, session):
+    # Like Flask, permanent sessions are re-issued on every response so they
+    # expire SESSION_LIFETIME after the last request rather than the login
+    config = flask_app.config
+    response.set_cookie(
+        SESSION_COOKIE, session_serializer.dumps(session),
+        max_age=SESSION_LIFETIME if session.get('_permanent') else None,
+        path=config['SESSION_COOKIE_PATH'] or config['APPLICATION_ROOT'],
+        domain=config['SESSION_COOKIE_DOMAIN'] or None,
+        secure=config['SESSION_COOKIE_SECURE'],
+        httponly=config['SESSION_COOKIE_HTTPONLY'],
+        samesite=config['SESSION_COOKIE_SAMESITE'],
+    )
+
+
+def csrf_valid(request, session, form):
+    token = request.headers.get('X-CSRFToken') or form.get('csrf_token')
+    if not token or 'csrf_token' not in session:
+        return False
+    try:
+        expected = csrf_serializer.loads(token, max_age=CSRF_TIME_LIMIT)
+    except BadSignature:
+        return False
+    return hmac.compare_digest(expected, session['csrf_token'])
+
+
+def endpoint(login=True, csrf=False):
+    """
+    Wraps an async handler(request, session, form) with the checks the Flask
+    route has: Flask-WTF's CSRF check, then login_required's redirect.
+    """
+    def decorate(handler):
+        async def wrapped(request):
+            started = time.perf_counter()
+            session = load_session(request)
+            is_form = request.headers.get('content-type', '').startswith(
+                ('application/x-www-form-urlencoded', 'multipart/form-data')
+            )
+            form = await request.form() if is_form else {}
+            if csrf and not csrf_valid(request, session, form):
+                return JSONResponse({"status": "error", "message": "The CSRF token is missing or invalid."}, 400)
+            if login and 'user_id' not in session:
+                session.setdefault('_flashes', []).append(('warning', 'Please login to access this page'))
+                response = RedirectResponse(INDEX_URL, 302)
+            else:
+                try:
+                    response = await handler(request, session, form)
+                except Busy:
+                    logger.warning("ASGI handler pool is full; rejecting request")
+                    response = JSONResponse(BUSY, 503)
+                except HasherBusy:
+                    logger.warning("Password hashing pool is full; rejecting request")
+                    response = JSONResponse(BUSY, 503)
+            if session:
+                save_session(response, session)
+            metrics.observe(
+                'http_request_duration_seconds', time.perf_counter() - started,
+                endpoint=handler.__name__, method=request.method, status=response.status_code
+            )
+            return response
+        wrapped.__name__ = handler.__name__
+        return wrapped
+    return decorate
+
+
+@endpoint(login=False)
+async def login(request, session, form):
+    username = form.get('username')
+    password = form.get('password')
+    if not username or not password:
+        return JSONResponse({"status": "error", "message": "Username and password required"}, 400)
+
+    user_id = await pool.run(authenticate, username, password)
+    if user_id is None:
+        return JSONResponse({"status": "error", "message": "Invalid credentials"}, 401)
+
+    session['user_id'] = user_id
+    session['_permanent'] = True
+    return JSONResponse({"status": "success", "redirect": DASHBOARD_URL})
+
+
+@endpoint(login=False, csrf=True)
+async def register(request, session, form):
+    return JSONResponse(*await pool.run(register_response, form))
+
+
+@endpoint()
+async def predict(request, session, form):
+    body, status = await pool.run(prediction_response, session['user_id'], form.get('symptoms', ''))
+    with metrics.stage('serialize'):
+        return JSONResponse(body, status)
+
+
+@endpoint()
+async def predict_batch(request, session, form):
+    try:
+        payload = await request.json()
+    except ValueError:
+        payload = None
+    return JSONResponse(*await pool.run(batch_prediction_response, session['user_id'], payload))
+
+
+@endpoint(csrf=True)
+async def update_profile(request, session, form):
+    return JSONResponse(*await pool.run(update_profile_response, session['user_id'], form))
+
+
+@endpoint(csrf=True)
+async def update_medical_info(request, session, form):
+    return JSONResponse(*await pool.run(update_medical_info_response, session['user_id'], form))
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # Load the catalogue once the server is up rather than on the first request
+    predictor.start()
+    yield
+
+
+application = Starlette(lifespan=lifespan, routes=[
+    Route('/login', login, methods=['POST']),
+    Route('/register', register, methods=['POST']),
+    Route('/predict', predict, methods=['POST']),
+    Route('/predict/batch', predict_batch, methods=['POST']),
+    Route('/update_profile', update_profile, methods=['POST']),
+    Route('/update_medical_info', update_medical_info, methods=['POST']),
+    Mount('/', WSGIMiddleware(flask_app)),
+])
@@ -0,0 +1,154 @@
+"""
+Fingerprinted, precompressed static assets.
+
+The stylesheets and scripts the pages use live under static/ and are built
+into static/dist/ with a hash of their contents in the file name
+(css/dashboard.css -> css/dashboard.1c0f5e2a9b3d.css), each next to a .gz
+copy and, when the brotli package is installed, a .br copy:
+
+    python assets.py
+
+A changed file gets a new name, so browsers can cache every built file for
+a year without ever seeing a stale one; the templates link them through the
+app's asset() helper. The app builds missing files on a background thread
+when a page first asks for one, linking the plain files until they are
+ready; each is written atomically so workers building together do not trip
+over each other.
+"""
+import argparse
+import gzip
+import hashlib
+import logging
+import os
+import threading
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+ASSETS = ('css/index.css', 'js/index.js', 'css/dashboard.css', 'js/dashboard.js')
+# Content-Encoding values, best first, with the suffix of their precompressed copies
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+class AssetBundle:
+    """
+    The built names of assets under source_directory, hashed from their
+    current contents, and the files in output_directory serving them. With
+    autobuild, built_name() builds missing files in the background.
+    """
+
+    def __init__(self, source_directory, output_directory, names=ASSETS, autobuild=False):
+        self.source_directory = source_directory
+        self.output_directory = output_directory
+        self.names = {}
+        for name in names:
+            with open(os.path.join(source_directory, name), 'rb') as f:
+                digest = hashlib.sha256(f.read()).hexdigest()[:12]
+            stem, extension = os.path.splitext(name)
+            self.names[name] = f"{stem}.{digest}{extension}"
+        self._built = set(self.names.values())
+        self.autobuild = autobuild
+        self.ready = not self.missing()
+        # The process that started the background build: a fork of it has to
+        # start its own, as the thread does not survive the fork
+        self._building_in = None
+        self._lock = threading.Lock()
+
+    def missing(self):
+        return [
+            name for name, built in self.names.items()
+            if not all(os.path.exists(path) for path in self._outputs(built))
+        ]
+
+    def build(self):
+        """Writes the hashed, gzipped and brotli copies of missing assets."""
+        missing = self.missing()
+        for name in missing:
+            with open(os.path.join(self.source_directory, name), 'rb') as f:
+                content = f.read()
+            path = os.path.join(self.output_directory, self.names[name])
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            _write(path, content)
+            # mtime=0 keeps the gzip bytes, and so their ETag, the same across builds
+            _write(path + '.gz', gzip.compress(content, 9, mtime=0))
+            if brotli is not None:
+                _write(path + '.br', brotli.compress(content, quality=11))
+        if missing:
+            logger.info(f"Built {len(missing)} static assets into {self.output_directory}")
+        self.ready = True
+        return missing
+
+    def built_name(self, name):
+        """
+        The built file name of asset name, or None while the built files are
+        missing, in which case the first call starts building them.
+        """
+        if not self.ready:
+            if self.autobuild:
+                self._start_build()
+            return None
+        return self.names.get(name)
+
+    def _start_build(self):
+        with self._lock:
+            if self._building_in == os.getpid():
+                return
+            self._building_in = os.getpid()
+        threading.Thread(target=self._build_logged, name='asset-build', daemon=True).start()
+
+    def _build_logged(self):
+        try:
+            self.build()
+        except OSError as e:
+            logger.warning(f"Could not build static assets, serving them unversioned: {str(e)}")
+
+    def resolve(self, filename, accept_encodings):
+        """
+        The (path, content encoding) of the copy of built file filename to
+        send to a client accepting accept_encodings (a werkzeug Accept), or
+        None when filename is not a current build. The encoding is None for
+        the uncompressed file.
+        """
+        if filename not in self._built:
+            return None
+        path = os.path.join(self.output_directory, filename)
+        for encoding, suffix in ENCODINGS:
+            if accept_encodings.quality(encoding) > 0 and os.path.exists(path + suffix):
+                return path + suffix, encoding
+        return path, None
+
+    def _outputs(self, built):
+        path = os.path.join(self.output_directory, built)
+        yield path
+        yield path + '.gz'
+        if brotli is not None:
+            yield path + '.br'
+
+
+def _write(path, content):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the fingerprinted, precompressed static assets")
+    parser.add_argument('--static', default='static')
+    parser.add_argument('-o', '--output', default=os.path.join('static', 'dist'))
+    args = parser.parse_args()
+
+    bundle = AssetBundle(args.static, args.output)
+    built = bundle.build()
+    for name in ASSETS:
+        print(f"{name} -> {bundle.names[name]}{'' if name in built else ' (up to date)'}")
+    if brotli is None:
+        print("brotli is not installed; only gzip copies were written")
+
+
+if __name__ == '__main__':
+    main()
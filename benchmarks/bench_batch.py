@@ -0,0 +1,146 @@
+"""
+Compares batch prediction with a loop over single predictions, at two levels:
+
+  method    DiseasePredictor.predict_batch against a loop over predict
+  endpoint  one POST /predict/batch against a POST /predict per submission,
+            each with its own session and profile lookup, through the
+            Flask test client (no network, so the loop's cost is understated)
+
+Loads the predictor on a synthetic catalogue of --diseases rows (the shipped
+dataset with --diseases 0). Both paths must return identical results; the
+per-item cost of each is reported along with the speedup. The run fails when
+the endpoint speedup is below --min-speedup, the order of magnitude the batch
+endpoint is for, or the method speedup below --min-method-speedup. Each path
+is timed --repeat times and its fastest pass counts. Result records and
+lazily built indexes are warmed by one untimed batch first, and the result
+cache is cleared before each timed pass, so neither path is answered from it.
+
+    python benchmarks/bench_batch.py --diseases 100000 --size 5000
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+from synthetic import write_synthetic_catalogue  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--diseases', type=int, default=100000)
+    parser.add_argument('--size', type=int, default=5000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3, help="timed passes per path; the fastest counts")
+    parser.add_argument('--min-speedup', type=float, default=10.0, help="endpoint speedup required")
+    parser.add_argument('--min-method-speedup', type=float, default=3.0, help="predict_batch speedup required")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bench-batch-')
+    # The endpoint pass logs in a throwaway user
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(workdir, 'users.db')
+    try:
+        if args.diseases:
+            source = os.path.join(workdir, 'catalogue.csv')
+            write_synthetic_catalogue(source, args.diseases, max(50, args.diseases // 10), seed=1)
+            os.environ['DISEASE_DATA_PATH'] = source
+            os.environ['CATALOGUE_ARTIFACT_PATH'] = os.path.join(workdir, 'catalogue.bin')
+            os.environ['PREBUILD_RESULTS'] = '0'
+        sys.exit(run(args))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def run(args):
+    from app import predictor
+
+    if not predictor.wait_until_ready():
+        return "Medical dataset not loaded"
+
+    rng = random.Random(args.seed)
+    vocabulary = list(predictor.catalogue.symptom_ids)
+    inputs = [
+        ', '.join(rng.sample(vocabulary, rng.randint(1, min(6, len(vocabulary)))))
+        for _ in range(args.size)
+    ]
+    profiles = [
+        {'age': rng.choice([6, 40]), 'allergies': rng.choice(['', 'penicillin']),
+         'medical_conditions': '', 'past_medications': ''}
+        for _ in range(args.size)
+    ]
+    predictor.predict_batch(inputs, profiles)
+
+    print(f"diseases:       {predictor.catalogue.matrix.shape[0]}")
+    print(f"items:          {args.size}")
+    failed = False
+    for level, compare, minimum in (
+        ('method', lambda: compare_methods(predictor, inputs, profiles), args.min_method_speedup),
+        ('endpoint', lambda: compare_endpoints(inputs), args.min_speedup),
+    ):
+        runs = [compare() for _ in range(args.repeat)]
+        loop_time, batch_time = min(run[0] for run in runs), min(run[1] for run in runs)
+        mismatches = max(run[2] for run in runs)
+        speedup = loop_time / batch_time
+        print(f"{level}:")
+        print(f"  loop:         {loop_time / args.size * 1e6:10.1f} us/item")
+        print(f"  batch:        {batch_time / args.size * 1e6:10.1f} us/item")
+        print(f"  speedup:      {speedup:10.1f}x")
+        print(f"  mismatches:   {mismatches}")
+        if speedup < minimum:
+            print(f"  speedup below {minimum:.1f}x")
+        failed = failed or mismatches or speedup < minimum
+    return 1 if failed else 0
+
+
+def compare_methods(predictor, inputs, profiles):
+    predictor.result_cache.clear()
+    start = time.perf_counter()
+    looped = [predictor.predict(user_input, profile) for user_input, profile in zip(inputs, profiles)]
+    loop_time = time.perf_counter() - start
+
+    predictor.result_cache.clear()
+    start = time.perf_counter()
+    batched = predictor.predict_batch(inputs, profiles)
+    batch_time = time.perf_counter() - start
+    return loop_time, batch_time, sum(a != b for a, b in zip(looped, batched))
+
+
+def compare_endpoints(inputs):
+    from app import User, app, db, predictor
+
+    app.config['WTF_CSRF_ENABLED'] = False
+    with app.app_context():
+        db.create_all()
+        user = User.query.filter_by(username='bench').first()
+        if user is None:
+            user = User(username='bench', password='-', age=40, allergies='penicillin',
+                        medical_conditions='', past_medications='')
+            db.session.add(user)
+            db.session.commit()
+        user_id = user.id
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = user_id
+
+    # Responses are decoded after timing: that is the client's work
+    predictor.result_cache.clear()
+    start = time.perf_counter()
+    looped = [client.post('/predict', data={'symptoms': user_input}) for user_input in inputs]
+    loop_time = time.perf_counter() - start
+
+    predictor.result_cache.clear()
+    start = time.perf_counter()
+    batched = client.post('/predict/batch', json={'symptoms': inputs})
+    batch_time = time.perf_counter() - start
+    looped = [response.get_json() for response in looped]
+    return loop_time, batch_time, sum(a != b for a, b in zip(looped, batched.get_json()['results']))
+
+
+if __name__ == '__main__':
+    main()
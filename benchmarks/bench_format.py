@@ -0,0 +1,128 @@
+"""
+Per-request result formatting cost: the old pandas-Series path against the
+prebuilt ResultRecords.
+
+The "before" column reproduces the original _format_result, which read every
+field off a DataFrame row per call; "after" is DiseasePredictor._format_result
+on a prebuilt record and compiled medical profile. Both must produce
+identical responses.
+
+    python benchmarks/bench_format.py --repeat 20000
+"""
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+from app import DISEASE_DATA_PATH, HIGH_SEVERITY_THRESHOLD, match_probability, predictor  # noqa: E402
+from catalogue import preprocess  # noqa: E402
+
+
+def legacy_check_allergy(medication, allergies):
+    if not medication or not allergies:
+        return False
+    return any(
+        med.strip().lower() in allergies.lower()
+        for med in medication.split(',')
+    )
+
+
+def legacy_format_result(disease_data, user_symptoms, user_profile):
+    age_group = "Child" if user_profile['age'] < 18 else "Adult"
+    med_key = 'Medicine_y' if age_group == "Child" else 'Medicine_x'
+    dosage_key = 'Dosage_y' if age_group == "Child" else 'Dosage_x'
+
+    matched_symptoms = set(user_symptoms) & set(disease_data['Symptoms'])
+    probability = match_probability(len(matched_symptoms), len(set(user_symptoms)))
+
+    recommendations = []
+    medicine = disease_data.get(med_key, 'Consult doctor')
+    dosage = disease_data.get(dosage_key, 'Consult doctor')
+
+    if user_profile['allergies'] and legacy_check_allergy(medicine, user_profile['allergies']):
+        recommendations.append(f"⚠️ Allergy warning for {medicine}")
+        alt_med = disease_data.get('Alternative_Therapies', 'Consult doctor for alternatives')
+        recommendations.append(f"💊 Alternative: {alt_med}")
+        medicine = "Consult doctor (allergy risk)"
+        dosage = "Consult doctor"
+
+    if int(disease_data.get('Severity_Score', 0)) >= HIGH_SEVERITY_THRESHOLD:
+        recommendations.append("🚨 High severity - seek immediate care")
+
+    if not recommendations:
+        recommendations.append("✅ Follow standard treatment guidelines")
+        recommendations.append("🩺 Monitor symptoms and consult doctor if they worsen")
+
+    return {
+        "disease": disease_data.get('Disease', 'Unknown condition'),
+        "description": disease_data.get('Description', 'Consult healthcare professional'),
+        "probability": probability,
+        "medicine": medicine,
+        "dosage": dosage,
+        "precautions": disease_data.get('Precautions', 'General health precautions recommended'),
+        "workout": [w for w in disease_data.get('Workout', '').split(',') if w.strip()],
+        "severity": min(10, int(disease_data.get('Severity_Score', 5))),
+        "recommendations": recommendations
+    }
+
+
+def without_history(result):
+    # The profiles here have no conditions; the legacy path never set the flag
+    result.pop('medical_history_match')
+    return result
+
+
+def timed(fn, cases, repeat):
+    start = time.perf_counter()
+    for i in range(repeat):
+        fn(*cases[i % len(cases)])
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--repeat', type=int, default=20000)
+    args = parser.parse_args()
+
+    data = pd.read_csv(DISEASE_DATA_PATH, on_bad_lines='skip').astype(object).fillna('')
+    preprocess(data)
+    predictor.wait_until_ready()
+    catalogue = predictor.catalogue
+
+    profiles = [
+        {'age': 8, 'allergies': '', 'medical_conditions': '', 'past_medications': ''},
+        {'age': 40, 'allergies': 'penicillin, oseltamivir', 'medical_conditions': '', 'past_medications': ''},
+    ]
+    legacy_cases, record_cases = [], []
+    for pos in range(len(data)):
+        symptoms = data['Symptoms'].iat[pos][:2] + ['unknown symptom']
+        for profile in profiles:
+            try:
+                record = catalogue.result(pos, profile['age'] < 18)
+            except ValueError:
+                continue
+            score = len(set(symptoms) & set(data['Symptoms'].iat[pos]))
+            legacy_cases.append((data.iloc[pos], symptoms, profile))
+            record_cases.append((record, score, symptoms, predictor.compile_medical_profile(profile)))
+
+    mismatches = sum(
+        legacy_format_result(*legacy) != without_history(predictor._format_result(*current))
+        for legacy, current in zip(legacy_cases, record_cases)
+    )
+    before = timed(legacy_format_result, legacy_cases, args.repeat)
+    after = timed(predictor._format_result, record_cases, args.repeat)
+    print(f"before (Series):  {before:8.2f} us/request")
+    print(f"after (records):  {after:8.2f} us/request")
+    print(f"speedup:          {before / after:8.1f}x")
+    print(f"mismatches:       {mismatches}")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == '__main__':
+    main()
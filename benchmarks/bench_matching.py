@@ -0,0 +1,103 @@
+"""
+Timing of the compiled allergy/history matcher.
+
+Fuzzes user allergy and condition text built from the catalogue's own
+medications and disease names (fragments, case changes, separators) and
+times MedicalProfile against the original substring checks per prediction.
+tests/test_matching.py checks that the two agree.
+
+    python benchmarks/bench_matching.py --profiles 2000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+from app import predictor  # noqa: E402
+
+
+def legacy_allergy(medication, allergies):
+    if not medication or not allergies:
+        return False
+    return any(
+        med.strip().lower() in allergies.lower()
+        for med in medication.split(',')
+    )
+
+
+def legacy_history(disease, medical_conditions):
+    if not medical_conditions or not disease:
+        return False
+    user_conditions = [c.strip().lower() for c in medical_conditions.split(',')]
+    disease_lower = disease.lower()
+    return any(
+        condition in disease_lower or disease_lower in condition
+        for condition in user_conditions
+        if condition
+    )
+
+
+def fragment(rng, text):
+    if not text:
+        return text
+    start = rng.randrange(len(text))
+    piece = text[start:start + rng.randint(1, 12)]
+    return rng.choice([piece, piece.upper(), f" {piece} ", text, text.title()])
+
+
+def random_text(rng, words):
+    parts = [fragment(rng, rng.choice(words)) for _ in range(rng.randint(0, 4))]
+    return rng.choice([', ', ',', ' and ', '\n']).join(parts + rng.choice([[], [''], ['  ']]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--profiles', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    predictor.wait_until_ready()
+    catalogue = predictor.catalogue
+    records = []
+    for pos in range(catalogue.matrix.shape[0]):
+        for child in (False, True):
+            try:
+                records.append(catalogue.result(pos, child))
+            except ValueError:
+                pass
+    medicines = sorted({record.medicine for record in records})
+    diseases = sorted({record.disease for record in records})
+
+    rng = random.Random(args.seed)
+    profiles = [
+        {'allergies': random_text(rng, medicines), 'medical_conditions': random_text(rng, diseases)}
+        for _ in range(args.profiles)
+    ]
+
+    start = time.perf_counter()
+    for profile in profiles:
+        for record in records:
+            legacy_allergy(record.medicine, profile['allergies'])
+            legacy_history(record.disease, profile['medical_conditions'])
+    legacy = (time.perf_counter() - start) / (len(profiles) * len(records)) * 1e6
+
+    compiled_profiles = [predictor.compile_medical_profile(profile) for profile in profiles]
+    start = time.perf_counter()
+    for compiled in compiled_profiles:
+        for record in records:
+            compiled.allergic_to(record.medication_pieces)
+            compiled.history_match(record.disease)
+    compiled_time = (time.perf_counter() - start) / (len(profiles) * len(records)) * 1e6
+
+    print(f"checks:           {len(profiles) * len(records) * 2}")
+    print(f"legacy scan:      {legacy:8.3f} us/prediction")
+    print(f"compiled lookup:  {compiled_time:8.3f} us/prediction")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,267 @@
+"""
+Dataset merge time, the original row-by-row merge_update.py against the
+chunked pipeline.
+
+Generates a synthetic medical dataset and symptom table (mixed case and
+whitespace in disease names, duplicate diseases, diseases missing from the
+dataset, empty cells), runs both merges and checks their outputs are
+byte-identical. The original is quadratic, so keep --diseases modest or pass
+--skip-legacy for large runs.
+
+With --changes N, N diseases are then edited (plus one removed and one
+added) and an incremental run is timed against a full one. That the output
+with its delta loads into the same catalogue as the full output is checked
+in tests/test_catalogue.py.
+
+    python benchmarks/bench_merge.py --diseases 2000 --symptom-rows 10000
+    python benchmarks/bench_merge.py --diseases 200000 --symptom-rows 400000 --skip-legacy --changes 100
+"""
+import argparse
+import filecmp
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from merge_update import COMMON_ALLERGIES, NEW_ROW_COLUMNS, disease_keys, merge, merge_incremental  # noqa: E402
+
+
+def legacy_merge(dataset_path, symptoms_path, output_path):
+    """
+    The original merge_update.py script, unchanged apart from taking paths.
+    """
+    df1 = pd.read_csv(dataset_path, on_bad_lines='skip')
+    df2 = pd.read_csv(symptoms_path, on_bad_lines='skip')
+    df2 = df2.drop(columns=['Unnamed: 0'], errors='ignore')
+
+    def add_symptom(row, symptom, adult_prob, child_prob):
+        symptom = symptom.strip().lower()
+        if pd.isna(row['Symptoms']) or not row['Symptoms']:
+            row['Symptoms'] = symptom
+            row['Symptom_Keywords'] = symptom.replace('_', ' ')
+        else:
+            symptoms = [s.strip().lower() for s in str(row['Symptoms']).split(',')]
+            if symptom not in symptoms:
+                row['Symptoms'] += f", {symptom}"
+                row['Symptom_Keywords'] += f"; {symptom.replace('_', ' ')}"
+
+        def update_probability(prob_str, symptom, probability):
+            if pd.isna(prob_str) or not prob_str:
+                return f"{symptom}:{probability}"
+            existing_probs = dict(item.split(":") for item in prob_str.split(";") if item)
+            if symptom not in existing_probs:
+                return f"{prob_str};{symptom}:{probability}"
+            return prob_str
+
+        row['Adult_Symptom_Probability'] = update_probability(row['Adult_Symptom_Probability'], symptom, adult_prob)
+        row['Child_Symptom_Probability'] = update_probability(row['Child_Symptom_Probability'], symptom, child_prob)
+        return row
+
+    new_rows = []
+    for index, row in df2.iterrows():
+        disease = row['Disease'].strip()
+        match = df1[df1['Disease'].str.strip().str.lower() == disease.lower()]
+        if not match.empty:
+            df1_index = match.index[0]
+            df1_row = df1.loc[df1_index]
+            for i in range(1, 5):
+                symptom_col = f'Symptom_{i}'
+                symptom = row[symptom_col] if pd.notna(row[symptom_col]) else None
+                if symptom:
+                    df1.loc[df1_index] = add_symptom(df1_row.copy(), symptom, 4, 3)
+                    df1_row = df1.loc[df1_index]
+        else:
+            new_row = {'Disease': disease}
+            symptoms, keywords, adult_probs, child_probs = [], [], [], []
+            for i in range(1, 5):
+                symptom_col = f'Symptom_{i}'
+                symptom = row[symptom_col] if pd.notna(row[symptom_col]) else None
+                if symptom:
+                    symptom = symptom.strip().lower()
+                    symptoms.append(symptom)
+                    keywords.append(symptom.replace('_', ' '))
+                    adult_probs.append(f"{symptom}:4")
+                    child_probs.append(f"{symptom}:3")
+            new_row['Symptoms'] = ', '.join(symptoms)
+            new_row['Symptom_Keywords'] = '; '.join(keywords)
+            new_row['Adult_Symptom_Probability'] = '; '.join(adult_probs)
+            new_row['Child_Symptom_Probability'] = '; '.join(child_probs)
+            for column in NEW_ROW_COLUMNS[5:]:
+                new_row[column] = ""
+            new_row['Severity'] = "Unknown"
+            new_row['Age_Group'] = "All"
+            new_rows.append(new_row)
+
+    df1 = pd.concat([df1, pd.DataFrame(new_rows)], ignore_index=True)
+
+    def add_allergy_info(row):
+        contraindications = str(row['Contraindications']) if pd.notna(row['Contraindications']) else ""
+        precautions = str(row['Precautions']) if pd.notna(row['Precautions']) else ""
+        for allergy in COMMON_ALLERGIES:
+            if allergy in contraindications.lower() or allergy in precautions.lower():
+                continue
+            contraindications += f", Allergy to {allergy}" if contraindications else f"Allergy to {allergy}"
+            precautions += f", Avoid products containing {allergy}" if precautions else f"Avoid products containing {allergy}"
+        row['Contraindications'] = contraindications.strip(', ')
+        row['Precautions'] = precautions.strip(', ')
+        return row
+
+    df1 = df1.apply(add_allergy_info, axis=1)
+
+    def adjust_dosage_and_alternatives(row):
+        age_group = row['Age_Group']
+        if pd.isna(age_group) or not isinstance(age_group, str) or age_group.lower() == "all":
+            is_adult = False
+        else:
+            is_adult = age_group.lower() == "adult+"
+        if not is_adult:
+            medicine = str(row['Medicine']) if pd.notna(row['Medicine']) else ""
+            dosage = str(row['Dosage']) if pd.notna(row['Dosage']) else ""
+            if medicine and "Adults:" in dosage:
+                dosage = dosage.replace("Adults:", "Children: Consult a doctor for appropriate dosage. Adults:")
+            elif medicine and not dosage:
+                dosage = "Consult a doctor for appropriate dosage for children."
+            row['Dosage'] = dosage
+        alt_therapies = str(row['Alternative_Therapies']) if pd.notna(row['Alternative_Therapies']) else ""
+        if not alt_therapies:
+            alt_therapies = "Consult a healthcare professional for alternative therapies."
+        row['Alternative_Therapies'] = alt_therapies
+        return row
+
+    df1 = df1.apply(adjust_dosage_and_alternatives, axis=1)
+    df1.to_csv(output_path, index=False)
+
+
+def synthetic_inputs(workdir, n_diseases, n_symptom_rows, seed=0):
+    rng = np.random.default_rng(seed)
+    vocabulary = np.array([f"symptom_{i}" for i in range(max(20, n_diseases // 5))], dtype=object)
+
+    def pick(options, size, p=None):
+        return np.array(options, dtype=object)[rng.choice(len(options), size=size, p=p)]
+
+    names = np.array([f"Disease {i}" for i in range(n_diseases)], dtype=object)
+    # A few diseases appear twice; symptoms go to the first
+    names[rng.choice(n_diseases, size=n_diseases // 50)] = names[0]
+    symptom_lists = [', '.join(rng.choice(vocabulary, size=rng.integers(0, 5), replace=False)) for _ in names]
+    dataset = pd.DataFrame({
+        'Disease': names,
+        'Symptoms': symptom_lists,
+        'Symptom_Keywords': [s.replace('_', ' ').replace(',', ';') for s in symptom_lists],
+        'Adult_Symptom_Probability': ['; '.join(f"{s}:5" for s in symptoms.split(', ') if s) for symptoms in symptom_lists],
+        'Child_Symptom_Probability': ['; '.join(f"{s}:2" for s in symptoms.split(', ') if s) for symptoms in symptom_lists],
+        'Medicine': pick(['', 'Ibuprofen', 'Amoxicillin', 'Sumatriptan'], n_diseases),
+        'Dosage': pick(['', '200mg', 'Adults: 500mg', 'Adults: 1 tablet; Adults: max 4'], n_diseases),
+        'Severity': pick(['Mild', 'Moderate', 'Severe'], n_diseases),
+        'Contraindications': pick(['', 'Penicillin allergy', 'Kidney disease', 'aspirin sensitivity'], n_diseases),
+        'Diet': 'Balanced diet',
+        'Precautions': pick(['', 'Rest', 'Avoid sulfa drugs, Rest', 'Avoid NSAIDs'], n_diseases),
+        'References': '',
+        'Age_Group': pick(['', 'All', 'Adult+', 'Child', 'adult+'], n_diseases),
+        'Alternative_Therapies': pick(['', 'Yoga'], n_diseases)
+    })
+
+    # Symptom rows name dataset diseases with varied case and spacing, or new ones
+    known = rng.random(n_symptom_rows) < 0.8
+    diseases = np.where(
+        known,
+        names[rng.integers(0, n_diseases, n_symptom_rows)],
+        np.array([f"New disease {i}" for i in rng.integers(0, max(1, n_symptom_rows // 20), n_symptom_rows)], dtype=object)
+    )
+    diseases = [
+        f"{' ' * int(pad)}{name.upper() if upper else name}{' ' * int(pad)}"
+        for name, upper, pad in zip(diseases, rng.random(n_symptom_rows) < 0.2, rng.integers(0, 2, n_symptom_rows))
+    ]
+    symptoms = {'Disease': diseases}
+    for i in range(1, 5):
+        column = pick(list(vocabulary[:50]), n_symptom_rows)
+        column = np.where(rng.random(n_symptom_rows) < 0.3, ' ' + column.astype(str), column)
+        column = np.where(rng.random(n_symptom_rows) < 0.15 * i, '', column)
+        symptoms[f'Symptom_{i}'] = column
+    symptom_table = pd.DataFrame(symptoms)
+
+    dataset_path = os.path.join(workdir, 'medical_data.csv')
+    symptoms_path = os.path.join(workdir, 'symptoms.csv')
+    dataset.to_csv(dataset_path, index=False)
+    symptom_table.to_csv(symptoms_path)
+    return dataset_path, symptoms_path
+
+
+def edit_inputs(dataset_path, symptoms_path, n_changes, seed=1):
+    """
+    Edits n_changes dataset diseases in place, removes one and adds a new
+    one to the symptom table.
+    """
+    rng = np.random.default_rng(seed)
+    dataset = pd.read_csv(dataset_path, dtype=str)
+    symptoms = pd.read_csv(symptoms_path, dtype=str, index_col=0)
+    keys = disease_keys(dataset['Disease'])
+    names = keys.unique()
+    edited = set(rng.choice(names, size=min(n_changes, len(names)), replace=False))
+    dataset.loc[keys.isin(edited), 'Diet'] = 'Low-salt diet'
+    removed = next(name for name in names if name not in edited)
+    dataset = dataset[keys != removed]
+    symptoms = symptoms[disease_keys(symptoms['Disease']) != removed]
+    symptoms.loc[len(symptoms) + 1] = ['Brand new disease', 'fever', 'cough', None, None]
+    dataset.to_csv(dataset_path, index=False)
+    symptoms.to_csv(symptoms_path)
+
+
+def time_incremental(workdir, dataset_path, symptoms_path, n_changes, chunksize):
+    incremental_path = os.path.join(workdir, 'incremental.csv')
+    full_path = os.path.join(workdir, 'full.csv')
+    start = time.perf_counter()
+    merge_incremental(dataset_path, symptoms_path, incremental_path, chunksize)
+    print(f"incremental merge, first (full) run: {time.perf_counter() - start:8.3f}s")
+
+    edit_inputs(dataset_path, symptoms_path, n_changes)
+    start = time.perf_counter()
+    changed, removed = merge_incremental(dataset_path, symptoms_path, incremental_path, chunksize)
+    incremental = time.perf_counter() - start
+    start = time.perf_counter()
+    merge(dataset_path, symptoms_path, full_path, chunksize)
+    full = time.perf_counter() - start
+    print(f"incremental merge: {incremental:8.3f}s  ({changed} diseases merged, {removed} removed)")
+    print(f"full merge:        {full:8.3f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--diseases', type=int, default=2000)
+    parser.add_argument('--symptom-rows', type=int, default=10000)
+    parser.add_argument('--chunksize', type=int, default=100000)
+    parser.add_argument('--skip-legacy', action='store_true')
+    parser.add_argument('--changes', type=int, default=0, help="diseases to edit for the incremental run")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    dataset_path, symptoms_path = synthetic_inputs(workdir, args.diseases, args.symptom_rows)
+    chunked_path = os.path.join(workdir, 'chunked.csv')
+
+    start = time.perf_counter()
+    updated, added = merge(dataset_path, symptoms_path, chunked_path, args.chunksize)
+    chunked = time.perf_counter() - start
+    print(f"chunked merge: {chunked:8.3f}s  ({updated} diseases updated, {added} rows added)")
+
+    if not args.skip_legacy:
+        legacy_path = os.path.join(workdir, 'legacy.csv')
+        start = time.perf_counter()
+        legacy_merge(dataset_path, symptoms_path, legacy_path)
+        legacy = time.perf_counter() - start
+        print(f"legacy merge:  {legacy:8.3f}s  ({legacy / chunked:.1f}x slower)")
+        identical = filecmp.cmp(chunked_path, legacy_path, shallow=False)
+        print(f"outputs identical: {identical}")
+        if not identical:
+            sys.exit(1)
+
+    if args.changes:
+        time_incremental(workdir, dataset_path, symptoms_path, args.changes, args.chunksize)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""
+Instrumentation overhead: /predict with metrics off, on, and on with the
+slow-request profiler sampling every request.
+
+Each mode runs in its own process, since METRICS_ENABLED and the profiler
+are read at import. Reports the cost of prediction_response alone (the
+handler with its stage timers) and of a whole POST /predict through the
+Flask test client (adding the request hooks and serialization), on cached
+results so the scoring itself does not hide the difference.
+
+    python benchmarks/bench_metrics.py --repeat 20000
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODES = {
+    'off': {'METRICS_ENABLED': '0', 'PROFILE_SLOW_REQUESTS_MS': '0'},
+    'on': {'METRICS_ENABLED': '1', 'PROFILE_SLOW_REQUESTS_MS': '0'},
+    # A threshold no request reaches: every request is sampled, none written
+    'on+profiler': {'METRICS_ENABLED': '1', 'PROFILE_SLOW_REQUESTS_MS': '60000'},
+}
+
+
+def measure(repeat):
+    sys.path.insert(0, ROOT)
+    os.chdir(ROOT)
+    from app import User, app, db, prediction_response, predictor
+    from werkzeug.security import generate_password_hash
+
+    app.config['WTF_CSRF_ENABLED'] = False
+    predictor.wait_until_ready()
+    with app.app_context():
+        db.create_all()
+        user = User(username='bench', password=generate_password_hash('bench'), age=30,
+                    allergies='penicillin', medical_conditions='asthma', past_medications='')
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+
+    queries = ['fever, cough', 'headache, nausea', 'itching, skin_rash', 'fatigue', 'chest pain, cough']
+    with app.app_context():
+        for query in queries:
+            prediction_response(user_id, query)
+        start = time.perf_counter()
+        for i in range(repeat):
+            prediction_response(user_id, queries[i % len(queries)])
+        handler = (time.perf_counter() - start) / repeat * 1e6
+
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = user_id
+    start = time.perf_counter()
+    for i in range(repeat):
+        client.post('/predict', data={'symptoms': queries[i % len(queries)]})
+    request = (time.perf_counter() - start) / repeat * 1e6
+    print(f"{handler:.3f} {request:.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--repeat', type=int, default=20000)
+    parser.add_argument('--measure', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.measure:
+        measure(args.repeat)
+        return
+
+    workdir = tempfile.mkdtemp()
+    results = {}
+    for mode, settings in MODES.items():
+        env = dict(os.environ, **settings,
+                   DATABASE_URL='sqlite:///' + os.path.join(workdir, f'{mode}.db'),
+                   PROFILE_DIRECTORY=os.path.join(workdir, 'profiles'))
+        output = subprocess.run([sys.executable, __file__, '--measure', '--repeat', str(args.repeat)],
+                                env=env, capture_output=True, text=True, check=True).stdout
+        results[mode] = [float(value) for value in output.split()[-2:]]
+
+    base_handler, base_request = results['off']
+    print(f"{'mode':>12}  {'handler us':>10}  {'overhead':>8}  {'request us':>10}  {'overhead':>8}")
+    for mode, (handler, request) in results.items():
+        print(f"{mode:>12}  {handler:10.2f}  {handler - base_handler:+8.2f}  "
+              f"{request:10.2f}  {request - base_request:+8.2f}")
+
+
+if __name__ == '__main__':
+    main()
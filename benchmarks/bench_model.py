@@ -0,0 +1,97 @@
+"""
+Model engine: per-request predict_proba calls against micro-batched ones.
+
+Loads the shipped classifier and vectorizer and has --clients threads send
+--requests symptom queries, either each calling SymptomModel.rank on its own
+query or submitting it to a MicroBatcher. Reports throughput, latency
+percentiles and the mean batch size, and checks both give the same rankings.
+
+    python benchmarks/bench_model.py --clients 1 8 32 64 --max-wait-ms 2
+"""
+import argparse
+import os
+import sys
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+from inference import MicroBatcher, SymptomModel  # noqa: E402
+
+K = 5
+SYMPTOMS = [
+    'fever', 'cough', 'fatigue', 'body aches', 'headache', 'nausea', 'photophobia', 'dizziness',
+    'visual changes', 'thirst', 'frequent urination', 'chest pain', 'itching',
+]
+
+
+def make_queries(n, seed):
+    rng = np.random.default_rng(seed)
+    return [
+        SymptomModel.text(rng.choice(SYMPTOMS, rng.integers(1, 5), replace=False).tolist())
+        for _ in range(n)
+    ]
+
+
+def run(call, queries, clients):
+    latencies = [None] * len(queries)
+    results = [None] * len(queries)
+
+    def timed(i):
+        start = time.perf_counter()
+        results[i] = call(queries[i])
+        latencies[i] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(clients) as executor:
+        list(executor.map(timed, range(len(queries))))
+    return results, np.array(latencies) * 1000, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--clients', type=int, nargs='+', default=[1, 8, 32, 64])
+    parser.add_argument('--requests', type=int, default=3000)
+    parser.add_argument('--max-batch-size', type=int, default=64)
+    parser.add_argument('--max-wait-ms', type=float, default=2)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    with warnings.catch_warnings():
+        # The pickles predate the installed scikit-learn
+        warnings.simplefilter('ignore')
+        model = SymptomModel(os.path.join('model', 'enhanced_medical_model.pkl'),
+                             os.path.join('model', 'tfidf_vectorizer.pkl'))
+    queries = make_queries(args.requests, args.seed)
+    print(f"{len(queries)} queries, batches of at most {args.max_batch_size}, max wait {args.max_wait_ms} ms")
+
+    for clients in args.clients:
+        expected, latencies, elapsed = run(lambda text: model.rank([text], K)[0], queries, clients)
+        print(f"{clients:>3} clients  unbatched: {len(queries) / elapsed:8.1f} q/s  "
+              f"p50 {np.percentile(latencies, 50):7.2f} ms  p99 {np.percentile(latencies, 99):7.2f} ms")
+
+        batcher = MicroBatcher(lambda texts: model.rank(texts, K), args.max_batch_size, args.max_wait_ms / 1000)
+        results, latencies, elapsed = run(batcher.submit, queries, clients)
+        print(f"{clients:>3} clients    batched: {len(queries) / elapsed:8.1f} q/s  "
+              f"p50 {np.percentile(latencies, 50):7.2f} ms  p99 {np.percentile(latencies, 99):7.2f} ms  "
+              f"mean batch {batcher.stats()['mean_batch_size']:5.1f}  "
+              f"{'match' if same(expected, results) else 'MISMATCH'}")
+
+
+def same(expected, actual):
+    for a, b in zip(expected, actual):
+        if (a is None) != (b is None):
+            return False
+        if a is not None and ([i for i, _ in a] != [i for i, _ in b]
+                              or not np.allclose([p for _, p in a], [p for _, p in b])):
+            return False
+    return True
+
+
+if __name__ == '__main__':
+    main()
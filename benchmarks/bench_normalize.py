@@ -0,0 +1,114 @@
+"""
+Symptom normalization: lookup latency and how many inputs resolve.
+
+Builds a SymptomNormalizer over a large vocabulary of made-up multi-word
+symptom names and times uncached lookups of exact names, case/underscore/
+plural variants, one- and two-edit typos and unknown terms. Then resolves
+the symptom tokens of symtoms_df.csv against the real catalogue, exact
+matching versus normalized.
+
+    python benchmarks/bench_normalize.py --terms 100000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from catalogue import Catalogue  # noqa: E402
+from symptoms import SymptomNormalizer  # noqa: E402
+
+SYLLABLES = ['ab', 'dom', 'in', 'al', 'car', 'di', 'ac', 'pul', 'mo', 'nar', 'neu', 'ro', 'gas', 'tric',
+             'ten', 'sion', 'hy', 'per', 'der', 'ma', 'ti', 'tis', 'os', 'te', 'cra', 'nal', 'ul', 'cer']
+LETTERS = 'abcdefghijklmnopqrstuvwxyz'
+
+
+def vocabulary(n_terms, rng):
+    syllables = rng.choice(SYLLABLES, (n_terms, 4)).tolist()
+    sizes = rng.integers(2, 5, n_terms).tolist()
+    words = sorted({''.join(parts[:size]) for parts, size in zip(syllables, sizes)})
+    terms = set()
+    while len(terms) < n_terms:
+        picks = rng.choice(words, (n_terms, 3)).tolist()
+        sizes = rng.integers(1, 4, n_terms).tolist()
+        terms.update(' '.join(parts[:size]) for parts, size in zip(picks, sizes))
+    return sorted(terms)[:n_terms]
+
+
+def variant(term, rng):
+    words = term.split(' ')
+    i = rng.integers(len(words))
+    words[i] = words[i] + 's'
+    text = '_'.join(words) if rng.random() < 0.5 else ' '.join(words)
+    return text.upper() if rng.random() < 0.3 else text.capitalize()
+
+
+def typo(term, rng, edits=1):
+    for _ in range(edits):
+        i = int(rng.integers(1, len(term) - 1))
+        kind = rng.integers(3)
+        if kind == 0:
+            term = term[:i] + rng.choice(list(LETTERS)) + term[i + 1:]
+        elif kind == 1:
+            term = term[:i] + term[i + 1:]
+        else:
+            term = term[:i - 1] + term[i] + term[i - 1] + term[i + 1:]
+    return term
+
+
+def timed(normalizer, queries):
+    latencies = []
+    resolved = []
+    for query in queries:
+        start = time.perf_counter()
+        resolved.append(normalizer._resolve(query))
+        latencies.append(time.perf_counter() - start)
+    return np.array(latencies) * 1000, resolved
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--terms', type=int, default=100000)
+    parser.add_argument('--queries', type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    terms = vocabulary(args.terms, rng)
+    symptom_ids = {term: i for i, term in enumerate(terms)}
+    frequencies = rng.zipf(1.5, len(terms))
+    start = time.perf_counter()
+    normalizer = SymptomNormalizer(symptom_ids, frequencies)
+    print(f"{len(terms)} terms, {len(normalizer.postings)} trigrams, "
+          f"built in {time.perf_counter() - start:.2f}s")
+
+    targets = [terms[i] for i in rng.choice(len(terms), args.queries)]
+    kinds = {
+        'exact': targets,
+        'variant': [variant(term, rng) for term in targets],
+        'typo (1)': [typo(term, rng) for term in targets],
+        'typo (2)': [typo(term, rng, 2) if len(term) > 8 else typo(term, rng) for term in targets],
+        'unknown': [''.join(rng.choice(list(LETTERS), 10)) for _ in targets],
+    }
+    for label, queries in kinds.items():
+        latencies, resolved = timed(normalizer, queries)
+        hits = sum(r is not None for r in resolved)
+        correct = sum(r == symptom_ids[t] for r, t in zip(resolved, targets))
+        print(f"{label:>9}: p50 {np.percentile(latencies, 50):6.3f} ms  p99 {np.percentile(latencies, 99):6.3f} ms  "
+              f"resolved {hits / len(queries):6.1%}  intended {correct / len(queries):6.1%}")
+
+    catalogue = Catalogue.from_csv(os.path.join(ROOT, 'final_optimized_medical_dataset.csv'))
+    tokens = pd.read_csv(os.path.join(ROOT, 'symtoms_df.csv'), dtype=str).filter(like='Symptom_').fillna('')
+    tokens = sorted({t.strip().lower() for t in tokens.stack() if t.strip()})
+    exact = [t for t in tokens if t in catalogue.symptom_ids]
+    normalized = {t: catalogue.normalizer.resolve(t) for t in tokens}
+    print(f"symtoms_df.csv: {len(tokens)} distinct tokens, exact {len(exact)}, "
+          f"normalized {sum(i is not None for i in normalized.values())}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""
+Page views: bytes transferred and render time for / and /dashboard.
+
+Logs a scratch user in (never instance/users.db) and requests each page
+--repeat times through the Flask test client, timing the whole request and,
+separately, rendering its template alone.
+Stylesheets and scripts the page links from this server are then fetched
+the way a browser would, with Accept-Encoding: br, gzip. A first view pays
+for the page and every asset; a repeat view pays for the page and the
+assets without a max-age, which the browser has to fetch again.
+
+    python benchmarks/bench_pages.py --repeat 500
+"""
+import argparse
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+ASSET_PATTERN = re.compile(r'<(?:link[^>]+href|script[^>]+src)="(/[^"]+)"')
+HEADERS = {'Accept-Encoding': 'br, gzip'}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--repeat', type=int, default=500)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='bench-pages-')
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(directory, 'users.db')
+    os.environ['PASSWORD_HASH_METHOD'] = 'pbkdf2:sha256:1000'
+    try:
+        run(args)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def run(args):
+    from flask import render_template
+    from app import User, app, db, register_response
+
+    with app.app_context():
+        db.create_all()
+        register_response({'username': 'pages', 'password': 'pages', 'age': '30', 'allergies': 'penicillin'})
+    client = app.test_client()
+    client.post('/login', data={'username': 'pages', 'password': 'pages'})
+    logged_out = app.test_client()
+    with app.app_context():
+        user = User.query.filter_by(username='pages').first()
+
+    pages = (('/', 'index.html', logged_out), ('/dashboard', 'dashboard.html', client))
+    for path, template, page_client in pages:
+        page_client.get(path)
+        times = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            response = page_client.get(path, headers=HEADERS)
+            times.append(time.perf_counter() - start)
+            assert response.status_code == 200, response.status_code
+        html = response.get_data()
+        times = np.array(times) * 1000
+
+        with app.test_request_context(path):
+            render_template(template, user=user)
+            render_times = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                render_template(template, user=user)
+                render_times.append(time.perf_counter() - start)
+        render_times = np.array(render_times) * 1000
+
+        first = repeat = len(html)
+        assets = []
+        for url in ASSET_PATTERN.findall(html.decode()):
+            asset = page_client.get(url, headers=HEADERS)
+            size = len(asset.get_data())
+            first += size
+            if not asset.cache_control.max_age:
+                repeat += size
+            assets.append(f"{url} {size} B {asset.content_encoding or 'identity'} "
+                          f"max-age={asset.cache_control.max_age}")
+
+        print(f"{path}: html {len(html)} B, first view {first} B, repeat view {repeat} B, "
+              f"request p50 {np.percentile(times, 50):.3f} ms p99 {np.percentile(times, 99):.3f} ms, "
+              f"template p50 {np.percentile(render_times, 50):.3f} ms")
+        for line in assets:
+            print(f"    {line}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""
+Prediction latency while the catalogue is hot-reloaded.
+
+Loads the predictor on a synthetic catalogue, measures predict() latency in
+steady state, then rewrites the source CSV and measures again while a reload
+compiles and swaps in the new catalogue. Checks that every request during the
+reload was answered from either the old or the new catalogue. With
+--shards, ranking goes through that many shard processes, which the reload
+warms on the new catalogue before swapping it in.
+
+    python benchmarks/bench_reload.py --diseases 100000
+    python benchmarks/bench_reload.py --diseases 100000 --shards 4
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from synthetic import symptom_vocabulary, write_synthetic_catalogue  # noqa: E402
+
+
+def run(predictor, queries, profile, stop=None, limit=None):
+    latencies = []
+    failures = 0
+    i = 0
+    while (stop is None or not stop.is_set()) and (limit is None or i < limit):
+        start = time.perf_counter()
+        _, ok = predictor.predict(queries[i % len(queries)], profile)
+        latencies.append(time.perf_counter() - start)
+        if not ok:
+            failures += 1
+        i += 1
+    return np.array(latencies) * 1000, failures
+
+
+def report(label, latencies, failures):
+    print(f"{label:>10}: {len(latencies):7d} requests  "
+          f"p50 {np.percentile(latencies, 50):7.3f} ms  p99 {np.percentile(latencies, 99):7.3f} ms  "
+          f"max {latencies.max():8.3f} ms  failed {failures}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--diseases', type=int, default=100000)
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--shards', type=int, default=0)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    source = os.path.join(workdir, 'catalogue.csv')
+    n_symptoms = max(50, args.diseases // 10)
+    write_synthetic_catalogue(source, args.diseases, n_symptoms, seed=1)
+    os.environ['DISEASE_DATA_PATH'] = source
+    os.environ['CATALOGUE_ARTIFACT_PATH'] = os.path.join(workdir, 'catalogue.bin')
+    os.environ['PREBUILD_RESULTS'] = '0'
+    os.environ['PREDICTOR_SHARDS'] = str(args.shards)
+    os.chdir(ROOT)
+    from app import predictor  # noqa: E402
+    predictor.wait_until_ready()
+
+    vocabulary = symptom_vocabulary(n_symptoms)
+    rng = np.random.default_rng(0)
+    queries = [', '.join(rng.choice(vocabulary, 3, replace=False)) for _ in range(20000)]
+    profile = {'age': 30, 'allergies': '', 'medical_conditions': ''}
+
+    report('steady', *run(predictor, queries, profile, limit=args.requests))
+
+    write_synthetic_catalogue(source, args.diseases, n_symptoms, seed=2)
+    generation = predictor.catalogue.generation
+    stop = threading.Event()
+    outcome = {}
+
+    def reload():
+        start = time.perf_counter()
+        outcome['ok'] = predictor.reload()
+        outcome['seconds'] = time.perf_counter() - start
+        stop.set()
+
+    thread = threading.Thread(target=reload)
+    thread.start()
+    latencies, failures = run(predictor, queries, profile, stop=stop)
+    thread.join()
+    report('reloading', latencies, failures)
+    print(f"reload {'succeeded' if outcome['ok'] else 'FAILED'} in {outcome['seconds']:.2f}s, "
+          f"generation {generation} -> {predictor.catalogue.generation}")
+    report('after', *run(predictor, queries, profile, limit=args.requests))
+
+
+if __name__ == '__main__':
+    main()
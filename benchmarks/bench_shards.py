@@ -0,0 +1,102 @@
+"""
+Sharded ranking: latency and throughput against the number of shard processes.
+
+Compiles a synthetic catalogue to an artifact, maps it, and ranks the same
+queries in process and through ShardPools of increasing size. For each it
+reports single-client latency and throughput with --clients concurrent
+threads, and checks every sharded ranking against the in-process one.
+Gains are bounded by the cores this process may use, printed first.
+
+    python benchmarks/bench_shards.py --diseases 1000000 --shards 1 2 4 8
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from catalogue import Catalogue  # noqa: E402
+from shards import ShardPool  # noqa: E402
+from synthetic import synthetic_queries, write_synthetic_catalogue  # noqa: E402
+
+K = 5
+
+
+def rank_all(rank, queries, clients):
+    latencies = [None] * len(queries)
+
+    def timed(i):
+        start = time.perf_counter()
+        result = rank(queries[i])
+        latencies[i] = time.perf_counter() - start
+        return result
+
+    start = time.perf_counter()
+    if clients == 1:
+        results = [timed(i) for i in range(len(queries))]
+    else:
+        with ThreadPoolExecutor(clients) as executor:
+            results = list(executor.map(timed, range(len(queries))))
+    return results, np.array(latencies) * 1000, time.perf_counter() - start
+
+
+def same(expected, actual):
+    return all(
+        np.array_equal(rows_a, rows_b) and np.array_equal(scores_a, scores_b)
+        for (rows_a, scores_a), (rows_b, scores_b) in zip(expected, actual)
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--diseases', type=int, nargs='+', default=[1000000])
+    parser.add_argument('--shards', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--engine', choices=('index', 'sparse'), default='index')
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--clients', type=int, default=8)
+    args = parser.parse_args()
+    method = 'rank_sparse' if args.engine == 'sparse' else 'rank_index'
+    print(f"usable cores: {len(os.sched_getaffinity(0))}, engine: {args.engine}")
+
+    for n_diseases in args.diseases:
+        workdir = tempfile.mkdtemp()
+        source = os.path.join(workdir, 'catalogue.csv')
+        artifact = os.path.join(workdir, 'catalogue.bin')
+        n_symptoms = max(50, n_diseases // 10)
+        write_synthetic_catalogue(source, n_diseases, n_symptoms, seed=1)
+        catalogue = Catalogue.load(source, artifact, compile_stale=True)
+        queries = [
+            catalogue.lookup([symptom.strip() for symptom in query.split(',')])
+            for query in synthetic_queries(args.queries, n_symptoms, seed=2)
+        ]
+        queries = [ids for ids in queries if ids]
+        print(f"\n{n_diseases} diseases, {n_symptoms} symptoms, {len(queries)} queries")
+
+        local = getattr(catalogue, method)
+        expected, latencies, _ = rank_all(lambda ids: local(ids, K), queries, 1)
+        _, _, elapsed = rank_all(lambda ids: local(ids, K), queries, args.clients)
+        print(f"{'in process':>11}: p50 {np.percentile(latencies, 50):7.2f} ms  "
+              f"p99 {np.percentile(latencies, 99):7.2f} ms  {len(queries) / elapsed:8.1f} q/s")
+
+        for shards in args.shards:
+            pool = ShardPool(catalogue, shards, source, artifact)
+            try:
+                rank = lambda ids: pool.rank(catalogue, method, ids, K)  # noqa: E731
+                rank(queries[0])
+                results, latencies, _ = rank_all(rank, queries, 1)
+                _, _, elapsed = rank_all(rank, queries, args.clients)
+            finally:
+                pool.shutdown()
+            print(f"{shards:>4} shards: p50 {np.percentile(latencies, 50):7.2f} ms  "
+                  f"p99 {np.percentile(latencies, 99):7.2f} ms  {len(queries) / elapsed:8.1f} q/s  "
+                  f"{len(pool.ranges(catalogue))} ranges  {'match' if same(expected, results) else 'MISMATCH'}")
+
+
+if __name__ == '__main__':
+    main()
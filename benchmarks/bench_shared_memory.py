@@ -0,0 +1,82 @@
+"""
+Per-worker memory of a pre-forked deployment, CSV-loaded vs artifact-mapped.
+
+Forks N workers that each load the catalogue and run a few queries, then
+reports every worker's RSS and PSS before and after loading. PSS charges
+shared pages fractionally, so its sum is what the workers really cost.
+
+    python benchmarks/bench_shared_memory.py --diseases 200000 --workers 4
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from catalogue import Catalogue, memory_usage  # noqa: E402
+from synthetic import symptom_vocabulary, write_synthetic_catalogue  # noqa: E402
+
+
+def worker(mode, source, artifact, n_symptoms, barrier, results):
+    before = memory_usage()
+    if mode == 'csv':
+        catalogue = Catalogue.from_csv(source)
+    else:
+        catalogue = Catalogue.load(source, artifact)
+    vocabulary = symptom_vocabulary(n_symptoms)
+    for i in range(200):
+        catalogue.rank_index(catalogue.lookup(vocabulary[[i, i * 7 % n_symptoms]]), 5)
+    # Everyone holds their catalogue while memory is sampled
+    barrier.wait()
+    results.put((os.getpid(), before, memory_usage()))
+    barrier.wait()
+
+
+def measure(mode, source, artifact, n_symptoms, workers):
+    context = multiprocessing.get_context('fork')
+    barrier = context.Barrier(workers)
+    results = context.Queue()
+    processes = [
+        context.Process(target=worker, args=(mode, source, artifact, n_symptoms, barrier, results))
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    samples = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--diseases', type=int, default=200000)
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+
+    if not memory_usage():
+        sys.exit("/proc/self/smaps_rollup is not available on this platform")
+
+    n_symptoms = max(50, args.diseases // 10)
+    with tempfile.TemporaryDirectory() as tmp:
+        source = write_synthetic_catalogue(os.path.join(tmp, 'catalogue.csv'), args.diseases, n_symptoms)
+        artifact = os.path.join(tmp, 'catalogue.bin')
+        Catalogue.from_csv(source).save(artifact)
+
+        for mode in ('csv', 'artifact'):
+            samples = measure(mode, source, artifact, n_symptoms, args.workers)
+            print(f"{mode}:")
+            for pid, before, after in samples:
+                print(
+                    f"  worker {pid}: RSS {before['rss']:>8} -> {after['rss']:>8} KiB"
+                    f"   PSS {before['pss']:>8} -> {after['pss']:>8} KiB"
+                )
+            growth = sum(after['pss'] - before['pss'] for _, before, after in samples)
+            print(f"  total PSS growth across {args.workers} workers: {growth} KiB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""
+Symptom autocomplete latency.
+
+Loads the app on a synthetic catalogue and times /symptoms/suggest for random
+prefixes of the vocabulary: the prefix index alone (uncached), full requests
+through the Flask test client, and revalidations answered with 304 from the
+ETag.
+
+    python benchmarks/bench_suggest.py --diseases 100000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from synthetic import symptom_vocabulary, write_synthetic_catalogue  # noqa: E402
+
+
+def report(label, latencies):
+    latencies = np.array(latencies) * 1000
+    print(f"{label:>12}: p50 {np.percentile(latencies, 50):6.3f} ms  p99 {np.percentile(latencies, 99):6.3f} ms  "
+          f"max {latencies.max():6.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--diseases', type=int, default=100000)
+    parser.add_argument('--requests', type=int, default=5000)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    source = os.path.join(workdir, 'catalogue.csv')
+    n_symptoms = max(50, args.diseases // 10)
+    write_synthetic_catalogue(source, args.diseases, n_symptoms, seed=1)
+    os.environ['DISEASE_DATA_PATH'] = source
+    os.environ['CATALOGUE_ARTIFACT_PATH'] = os.path.join(workdir, 'catalogue.bin')
+    os.environ['PREBUILD_RESULTS'] = '0'
+    os.chdir(ROOT)
+    from app import app, predictor  # noqa: E402
+    predictor.wait_until_ready()
+
+    rng = np.random.default_rng(0)
+    vocabulary = symptom_vocabulary(n_symptoms)
+    names = rng.choice(vocabulary, args.requests)
+    prefixes = [name[:rng.integers(1, len(name) + 1)] for name in names]
+    suggester = predictor.catalogue.suggester
+
+    latencies = []
+    for prefix in prefixes:
+        start = time.perf_counter()
+        suggester._suggest(prefix, 10)
+        latencies.append(time.perf_counter() - start)
+    report('index', latencies)
+
+    client = app.test_client()
+    etag = None
+    for label, headers in (('request', {}), ('cached', {}), ('revalidate', None)):
+        latencies = []
+        statuses = set()
+        for prefix in prefixes:
+            start = time.perf_counter()
+            response = client.get('/symptoms/suggest', query_string={'q': prefix},
+                                  headers=headers if headers is not None else {'If-None-Match': etag})
+            latencies.append(time.perf_counter() - start)
+            statuses.add(response.status_code)
+            etag = response.headers['ETag']
+        report(label, latencies)
+        print(f"{'':>12}  statuses {sorted(statuses)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""
+Account throughput: logins per second and user provisioning rate.
+
+Runs against a scratch SQLite database (never instance/users.db) with the
+hash method from --method. Logins go through authenticate(), so they take
+the bounded hashing pool and report how many were turned away as busy.
+Provisioning compares registering users one request at a time
+(register_response, a hash and a commit each) with import_users, which
+hashes on all workers and inserts a batch per transaction.
+
+    python benchmarks/bench_users.py --method scrypt:32768:8:1 --clients 1 4 16 64
+    python benchmarks/bench_users.py --method pbkdf2:sha256:10000 --import-users 20000
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+
+def user_row(i):
+    return {'username': f'bench-user-{i}', 'password': f'password-{i}', 'age': str(20 + i % 60),
+            'allergies': 'penicillin' if i % 7 == 0 else ''}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--method', default='scrypt:32768:8:1')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--max-pending', type=int, default=64)
+    parser.add_argument('--clients', type=int, nargs='+', default=[1, 4, 16, 64])
+    parser.add_argument('--logins', type=int, default=400)
+    parser.add_argument('--register-users', type=int, default=200)
+    parser.add_argument('--import-users', type=int, default=5000)
+    parser.add_argument('--batch-size', type=int, default=5000)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='bench-users-')
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(directory, 'users.db')
+    os.environ['PASSWORD_HASH_METHOD'] = args.method
+    os.environ['PASSWORD_HASH_WORKERS'] = str(args.workers)
+    os.environ['PASSWORD_HASH_MAX_PENDING'] = str(args.max_pending)
+    try:
+        run(args)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def run(args):
+    from app import HasherBusy, app, authenticate, db, import_users, register_response
+
+    with app.app_context():
+        db.create_all()
+        journal = db.session.execute(db.text('PRAGMA journal_mode')).scalar()
+    print(f"method {args.method}, {args.workers} hash workers, journal_mode {journal}")
+
+    with app.app_context():
+        start = time.perf_counter()
+        for i in range(args.register_users):
+            body, status = register_response(user_row(i))
+            assert status == 200, body
+        elapsed = time.perf_counter() - start
+    print(f"register_response: {args.register_users / elapsed:9.1f} users/s")
+
+    with app.app_context():
+        start = time.perf_counter()
+        created, skipped = import_users(
+            (user_row(i) for i in range(args.import_users)), args.batch_size
+        )
+        elapsed = time.perf_counter() - start
+    print(f"import_users:      {created / elapsed:9.1f} users/s  "
+          f"({created} created, {skipped} already present, batches of {args.batch_size})")
+
+    def login(i):
+        row = user_row(i % args.register_users)
+        started = time.perf_counter()
+        with app.app_context():
+            try:
+                user_id = authenticate(row['username'], row['password'])
+            except HasherBusy:
+                return None, time.perf_counter() - started
+        assert user_id is not None
+        return True, time.perf_counter() - started
+
+    for clients in args.clients:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(clients) as executor:
+            results = list(executor.map(login, range(args.logins)))
+        elapsed = time.perf_counter() - start
+        ok = np.array([seconds for success, seconds in results if success]) * 1000
+        busy = sum(1 for success, _ in results if success is None)
+        print(f"{clients:>3} clients: {len(ok) / elapsed:8.1f} logins/s  "
+              f"p50 {np.percentile(ok, 50):7.1f} ms  p99 {np.percentile(ok, 99):7.1f} ms  busy {busy}")
+
+
+if __name__ == '__main__':
+    main()
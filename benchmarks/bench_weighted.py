@@ -0,0 +1,85 @@
+"""
+Overlap against weighted scoring, per ranking path.
+
+Builds a synthetic catalogue with per-symptom weights and times rank_index,
+rank_sparse and rank_batch with plain overlap counts and with the adult
+weight matrix. Index and sparse rankings must agree in both modes, and a
+catalogue whose weights are all equal must rank exactly like overlap.
+
+    python benchmarks/bench_weighted.py --diseases 100000 --queries 2000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from catalogue import Catalogue, preprocess  # noqa: E402
+from synthetic import synthetic_catalogue, synthetic_queries  # noqa: E402
+
+K = 5
+
+
+def timed(label, run, n):
+    start = time.perf_counter()
+    result = run()
+    elapsed = time.perf_counter() - start
+    print(f"{label:>26}: {elapsed / n * 1e6:9.1f} us/query")
+    return result
+
+
+def same(a, b, scores=True):
+    # rank_sparse also returns zero-score rows when fewer than k match
+    for (rows_a, scores_a), (rows_b, scores_b) in zip(a, b):
+        rows_a, scores_a = rows_a[scores_a > 0], scores_a[scores_a > 0]
+        rows_b, scores_b = rows_b[scores_b > 0], scores_b[scores_b > 0]
+        if not np.array_equal(rows_a, rows_b) or (scores and not np.allclose(scores_a, scores_b)):
+            return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--diseases', type=int, default=100000)
+    parser.add_argument('--queries', type=int, default=2000)
+    args = parser.parse_args()
+
+    data = synthetic_catalogue(args.diseases, seed=0).astype(object).fillna('')
+    preprocess(data)
+    catalogue = Catalogue.from_frame(data)
+    n_symptoms = catalogue.matrix.shape[1]
+    queries = [
+        catalogue.lookup([s.strip() for s in query.split(',')])
+        for query in synthetic_queries(args.queries, n_symptoms, seed=1)
+    ]
+    queries = [ids for ids in queries if ids]
+    n = len(queries)
+    print(f"{args.diseases} diseases, {n_symptoms} symptoms, {n} queries")
+
+    ok = True
+    for weights in (None, 'adult'):
+        mode = weights or 'overlap'
+        index = timed(f"rank_index ({mode})", lambda: [catalogue.rank_index(ids, K, weights) for ids in queries], n)
+        sparse = timed(f"rank_sparse ({mode})", lambda: [catalogue.rank_sparse(ids, K, weights) for ids in queries], n)
+        batch = timed(f"rank_batch ({mode})", lambda: catalogue.rank_batch(queries, K, weights), n)
+        agree = same(index, sparse) and same(index, batch)
+        print(f"{'paths agree':>26}: {agree}")
+        ok &= agree
+
+    for column in ('Adult_Symptom_Probability_x', 'Child_Symptom_Probability_x'):
+        data[column] = '7'
+    uniform = Catalogue.from_frame(data)
+    matches = same(
+        [uniform.rank_index(ids, K, 'adult') for ids in queries], [uniform.rank_index(ids, K) for ids in queries],
+        scores=False
+    )
+    print(f"{'uniform weights = overlap':>26}: {matches}")
+    sys.exit(0 if ok and matches else 1)
+
+
+if __name__ == '__main__':
+    main()
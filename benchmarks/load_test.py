@@ -0,0 +1,131 @@
+"""
+Load test: the Flask server against the ASGI app under Uvicorn.
+
+Starts each server in turn on a synthetic catalogue and a scratch user
+database, logs in, and keeps --concurrency clients posting /predict. The
+first --warmup seconds fill the per-query caches and are not counted; the
+next --seconds are. Reports throughput, latency percentiles and non-200
+responses. The clients (httpx) run in this process, so on a small machine
+they compete with the server for CPU.
+
+    python benchmarks/load_test.py --diseases 20000 --concurrency 64
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from synthetic import symptom_vocabulary, write_synthetic_catalogue  # noqa: E402
+
+USERNAME = 'loadtest'
+PASSWORD = 'loadtest'
+SERVERS = {
+    'flask': lambda port: [sys.executable, '-c',
+                           f"from app import app; app.run(host='127.0.0.1', port={port}, threaded=True)"],
+    'asgi': lambda port: [sys.executable, '-m', 'uvicorn', 'asgi:application',
+                          '--host', '127.0.0.1', '--port', str(port), '--log-level', 'warning'],
+}
+
+
+def create_user():
+    from app import app, db, User
+    from werkzeug.security import generate_password_hash
+    with app.app_context():
+        db.create_all()
+        db.session.add(User(username=USERNAME, password=generate_password_hash(PASSWORD), age=30,
+                            allergies='', medical_conditions='', past_medications=''))
+        db.session.commit()
+
+
+def wait_until_up(url, process, timeout=300):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"server exited with {process.returncode}")
+        try:
+            if httpx.get(url, timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError("server did not start")
+
+
+async def load(url, queries, concurrency, warmup, seconds):
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=30) as client:
+        response = await client.post('/login', data={'username': USERNAME, 'password': PASSWORD})
+        response.raise_for_status()
+        latencies = []
+        statuses = {}
+        measure_from = time.perf_counter() + warmup
+        deadline = measure_from + seconds
+
+        async def worker(offset):
+            i = offset
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                try:
+                    response = await client.post('/predict', data={'symptoms': queries[i % len(queries)]})
+                    status = response.status_code
+                except httpx.HTTPError as e:
+                    status = type(e).__name__
+                if start >= measure_from:
+                    latencies.append(time.perf_counter() - start)
+                    statuses[status] = statuses.get(status, 0) + 1
+                i += concurrency
+
+        await asyncio.gather(*(worker(i) for i in range(concurrency)))
+        return np.array(latencies) * 1000, statuses, time.perf_counter() - measure_from
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--diseases', type=int, default=20000)
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--warmup', type=float, default=10)
+    parser.add_argument('--seconds', type=float, default=15)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--servers', nargs='+', choices=sorted(SERVERS), default=['flask', 'asgi'])
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    source = os.path.join(workdir, 'catalogue.csv')
+    n_symptoms = max(50, args.diseases // 10)
+    write_synthetic_catalogue(source, args.diseases, n_symptoms, seed=1)
+    os.environ['DISEASE_DATA_PATH'] = source
+    os.environ['CATALOGUE_ARTIFACT_PATH'] = os.path.join(workdir, 'catalogue.bin')
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(workdir, 'users.db')
+    os.chdir(ROOT)
+    create_user()
+
+    rng = np.random.default_rng(0)
+    vocabulary = symptom_vocabulary(n_symptoms)
+    queries = [', '.join(rng.choice(vocabulary, rng.integers(1, 4), replace=False)) for _ in range(50000)]
+
+    for name in args.servers:
+        url = f"http://127.0.0.1:{args.port}"
+        process = subprocess.Popen(SERVERS[name](args.port), cwd=ROOT, env=os.environ,
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            wait_until_up(url + '/readyz', process)
+            latencies, statuses, elapsed = asyncio.run(load(url, queries, args.concurrency, args.warmup, args.seconds))
+        finally:
+            process.terminate()
+            process.wait()
+        print(f"{name:>6}: {len(latencies) / elapsed:8.1f} req/s  "
+              f"p50 {np.percentile(latencies, 50):7.2f} ms  p99 {np.percentile(latencies, 99):7.2f} ms  "
+              f"statuses {statuses}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""
+Multithreaded stress test for DiseasePredictor.predict.
+
+Computes reference answers single-threaded, then replays the same queries from
+a growing number of threads against the shared singleton, checking every
+result against the reference and reporting throughput per thread count.
+
+    python benchmarks/stress_predict.py --threads 1 2 4 8 16 --requests 20000
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+from app import predictor  # noqa: E402
+
+PROFILES = [
+    {'age': 8, 'allergies': '', 'medical_conditions': '', 'past_medications': ''},
+    {'age': 35, 'allergies': 'penicillin, aspirin', 'medical_conditions': 'asthma', 'past_medications': ''},
+]
+
+
+def make_queries(count, seed):
+    rng = random.Random(seed)
+    vocabulary = list(predictor.catalogue.symptom_ids) + ['not a symptom']
+    queries = []
+    for _ in range(count):
+        symptoms = rng.sample(vocabulary, rng.randint(1, min(6, len(vocabulary))))
+        queries.append((', '.join(symptoms), rng.choice(PROFILES)))
+    return queries
+
+
+def run(queries, expected, threads, total):
+    errors = []
+    per_thread = total // threads
+
+    def worker(offset):
+        for i in range(per_thread):
+            index = (offset + i) % len(queries)
+            result = predictor.predict(*queries[index])
+            if result != expected[index]:
+                errors.append((queries[index][0], result, expected[index]))
+
+    workers = [threading.Thread(target=worker, args=(n * 7919,)) for n in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return per_thread * threads / elapsed, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 2, 4, 8, 16])
+    parser.add_argument('--requests', type=int, default=20000)
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    if not predictor.wait_until_ready():
+        sys.exit("Medical dataset not loaded")
+
+    queries = make_queries(args.queries, args.seed)
+    expected = [predictor.predict(*query) for query in queries]
+
+    print(f"{'threads':>8} {'req/s':>12} {'errors':>8}")
+    failed = False
+    for threads in args.threads:
+        throughput, errors = run(queries, expected, threads, args.requests)
+        print(f"{threads:>8} {throughput:>12.0f} {len(errors):>8}")
+        if errors:
+            failed = True
+            print(f"  first mismatch: {errors[0]}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,298 @@
+"""
+Benchmark suite: startup, query latency, batch throughput, memory and merge
+time on synthetic catalogues, written as JSON and compared to a baseline.
+
+For each size, a catalogue in the final_optimized_medical_dataset.csv schema
+is generated from a fixed seed (see synthetic.py) and the app is started on
+it in fresh processes: once with no compiled artifact (cold start, which
+compiles it) and once with it (warm start). The warm process then replays
+Zipf-distributed symptom queries, with case and spacing variants and some
+unknown symptoms, through DiseasePredictor.predict with the result cache
+emptied before each query, again with it warm, and through predict_batch.
+merge_update.merge is timed on generated inputs of the same size.
+
+Times are seconds unless a key says otherwise, memory is KiB. Every run
+records the interpreter, library versions, core count and git revision.
+Compare runs on the same machine only:
+
+    python benchmarks/suite.py --output baseline.json
+    python benchmarks/suite.py --baseline baseline.json --output current.json
+
+With --baseline, metrics more than --tolerance worse than the baseline are
+listed and the exit status is 1.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from synthetic import synthetic_queries, write_synthetic_catalogue  # noqa: E402
+
+DEFAULT_SIZES = [1000, 100000, 1000000]
+# Metrics where a larger value is better; lower is better for the rest
+HIGHER_IS_BETTER = ('queries_per_second',)
+PROFILES = [
+    {'age': 35, 'allergies': '', 'medical_conditions': '', 'past_medications': ''},
+    {'age': 8, 'allergies': 'medicine 1, medicine 2', 'medical_conditions': 'disease 10', 'past_medications': ''},
+    {'age': 62, 'allergies': 'penicillin', 'medical_conditions': 'asthma', 'past_medications': ''},
+]
+
+
+def replay_queries(n_queries, n_symptoms, seed):
+    """
+    synthetic_queries with what users type on top: a few are upper-cased or
+    use underscores, and some carry a symptom the catalogue lacks.
+    """
+    rng = np.random.default_rng(seed)
+    queries = []
+    for query in synthetic_queries(n_queries, n_symptoms, seed=seed):
+        roll = rng.random()
+        if roll < 0.1:
+            query = query.upper()
+        elif roll < 0.2:
+            query = query.replace(' ', '_').replace(',_', ', ')
+        elif roll < 0.25:
+            query += ', not a listed symptom'
+        queries.append(query)
+    return queries
+
+
+def percentiles(seconds):
+    ms = np.asarray(seconds) * 1000
+    return {
+        'p50': float(np.percentile(ms, 50)),
+        'p95': float(np.percentile(ms, 95)),
+        'p99': float(np.percentile(ms, 99)),
+        'mean': float(ms.mean()),
+    }
+
+
+def measure_start():
+    """
+    Runs in a child process: imports the app and loads the catalogue, and
+    reports how long that took and the memory it left in use.
+    """
+    start = time.perf_counter()
+    from app import predictor
+    from catalogue import memory_usage
+    imported = time.perf_counter() - start
+    if not predictor.wait_until_ready():
+        raise SystemExit("catalogue failed to load")
+    return {'seconds': time.perf_counter() - start, 'import_seconds': imported, 'memory_kib': memory_usage()}
+
+
+def measure_queries(n_symptoms, n_queries, batch_size, seed):
+    """
+    Runs in the warm-start child process, after measure_start.
+    """
+    from app import predictor
+    from catalogue import memory_usage
+    queries = replay_queries(n_queries, n_symptoms, seed)
+    profiles = [PROFILES[i % len(PROFILES)] for i in range(len(queries))]
+
+    uncached = []
+    for query, profile in zip(queries, profiles):
+        predictor.result_cache.clear()
+        start = time.perf_counter()
+        predictor.predict(query, profile)
+        uncached.append(time.perf_counter() - start)
+    cached = []
+    for query, profile in zip(queries, profiles):
+        start = time.perf_counter()
+        predictor.predict(query, profile)
+        cached.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    matched = 0
+    for offset in range(0, len(queries), batch_size):
+        results = predictor.predict_batch(queries[offset:offset + batch_size], profiles[offset:offset + batch_size])
+        matched += sum(success for _, success in results)
+    batch_elapsed = time.perf_counter() - start
+
+    return {
+        'latency_ms': percentiles(uncached),
+        'cached_latency_ms': percentiles(cached),
+        'batch': {'queries_per_second': len(queries) / batch_elapsed, 'batch_size': batch_size},
+        'matched_fraction': matched / len(queries),
+        'memory_kib': dict(memory_usage(), peak_rss=resource.getrusage(resource.RUSAGE_SELF).ru_maxrss),
+    }
+
+
+def measure_merge(workdir, n_diseases):
+    from bench_merge import synthetic_inputs
+    from merge_update import merge
+    dataset_path, symptoms_path = synthetic_inputs(workdir, n_diseases, n_diseases, seed=0)
+    start = time.perf_counter()
+    updated, added = merge(dataset_path, symptoms_path, os.path.join(workdir, 'merged.csv'))
+    return {'seconds': time.perf_counter() - start, 'rows_updated': updated, 'rows_added': added}
+
+
+def child(args):
+    os.chdir(ROOT)
+    if args.step == 'start':
+        result = measure_start()
+        if args.queries:
+            result['queries'] = measure_queries(args.symptoms, args.queries, args.batch_size, args.seed)
+    else:
+        result = measure_merge(args.workdir, args.diseases)
+    print(json.dumps(result))
+
+
+def run_child(step, env, *options):
+    command = [sys.executable, os.path.abspath(__file__), '--step', step, *map(str, options)]
+    completed = subprocess.run(command, env=env, cwd=ROOT, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(f"{step} step failed:\n{completed.stderr[-2000:]}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def run_size(n_diseases, args):
+    workdir = tempfile.mkdtemp(prefix=f'suite-{n_diseases}-')
+    n_symptoms = max(50, n_diseases // 10)
+    source = os.path.join(workdir, 'catalogue.csv')
+    write_synthetic_catalogue(source, n_diseases, n_symptoms, seed=args.seed)
+    env = dict(
+        os.environ,
+        DISEASE_DATA_PATH=source,
+        CATALOGUE_ARTIFACT_PATH=os.path.join(workdir, 'catalogue.bin'),
+        DATABASE_URL='sqlite:///' + os.path.join(workdir, 'users.db'),
+        CATALOGUE_POLL_INTERVAL='0',
+    )
+
+    try:
+        cold = run_child('start', env, '--queries', 0)
+        warm = run_child('start', env, '--symptoms', n_symptoms, '--queries', args.queries,
+                         '--batch-size', args.batch_size, '--seed', args.seed)
+        queries = warm.pop('queries')
+        result = {
+            'symptoms': n_symptoms,
+            'source_bytes': os.path.getsize(source),
+            'cold_start': cold,
+            'warm_start': warm,
+            **queries,
+        }
+        if not args.skip_merge:
+            result['merge'] = run_child('merge', env, '--workdir', workdir, '--diseases', n_diseases)
+        return result
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def environment():
+    try:
+        revision = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                  capture_output=True, text=True).stdout.strip()
+    except OSError:
+        revision = ''
+    import pandas
+    import scipy
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pandas.__version__,
+        'scipy': scipy.__version__,
+        'platform': platform.platform(),
+        'cores': len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count(),
+        'revision': revision,
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+    }
+
+
+def flatten(results, prefix=''):
+    flat = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+
+def compare(current, baseline, tolerance):
+    """
+    (metric, baseline, current, change) for every timing, throughput and
+    memory metric that got worse by more than tolerance, as a fraction.
+    """
+    regressions = []
+    base = flatten(baseline['sizes'])
+    for metric, value in flatten(current['sizes']).items():
+        if metric not in base or not base[metric]:
+            continue
+        if not metric.split('.')[1].startswith(('cold_start', 'warm_start', 'latency', 'cached_latency', 'batch',
+                                                'memory', 'merge')):
+            continue
+        if metric.endswith(('batch_size', 'rows_updated', 'rows_added')):
+            continue
+        change = value / base[metric] - 1
+        worse = -change if metric.endswith(HIGHER_IS_BETTER) else change
+        if worse > tolerance:
+            regressions.append((metric, base[metric], value, change))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="catalogue sizes in diseases")
+    parser.add_argument('--queries', type=int, default=2000, help="queries replayed per size")
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--skip-merge', action='store_true')
+    parser.add_argument('--output', help="write the results here as JSON")
+    parser.add_argument('--baseline', help="results JSON of an earlier run to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="fraction a metric may worsen by before it counts as a regression")
+    # Internal: the measurements run in child processes
+    parser.add_argument('--step', choices=('start', 'merge'), help=argparse.SUPPRESS)
+    parser.add_argument('--symptoms', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--diseases', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--workdir', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.step:
+        child(args)
+        return
+
+    run = {
+        'environment': environment(),
+        'settings': {'queries': args.queries, 'batch_size': args.batch_size, 'seed': args.seed},
+        'sizes': {},
+    }
+    for n_diseases in args.sizes:
+        print(f"{n_diseases} diseases...", file=sys.stderr)
+        result = run['sizes'][str(n_diseases)] = run_size(n_diseases, args)
+        print(f"  cold start {result['cold_start']['seconds']:.2f}s, warm start {result['warm_start']['seconds']:.2f}s, "
+              f"p50 {result['latency_ms']['p50']:.2f} ms, p99 {result['latency_ms']['p99']:.2f} ms, "
+              f"batch {result['batch']['queries_per_second']:.0f} q/s, "
+              f"rss {result['memory_kib'].get('rss', 0) / 1024:.0f} MiB"
+              + (f", merge {result['merge']['seconds']:.2f}s" if 'merge' in result else ''), file=sys.stderr)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(run, f, indent=2, sort_keys=True)
+    else:
+        print(json.dumps(run, indent=2, sort_keys=True))
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline['environment'].get('platform') != run['environment']['platform']:
+            print("warning: the baseline was recorded on a different platform", file=sys.stderr)
+        regressions = compare(run, baseline, args.tolerance)
+        for metric, before, after, change in regressions:
+            print(f"regression: {metric}: {before:.4g} -> {after:.4g} ({change:+.0%})", file=sys.stderr)
+        print(f"{len(regressions)} regressions beyond {args.tolerance:.0%} against {args.baseline}", file=sys.stderr)
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
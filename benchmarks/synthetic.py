@@ -0,0 +1,72 @@
+"""
+Synthetic disease catalogues in the final_optimized_medical_dataset.csv schema.
+
+Symptom frequencies follow a Zipf-like curve so posting lists have the same
+skew as real data: a few very common symptoms and a long tail of rare ones.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCHEMA_PATH = os.path.join(ROOT, 'final_optimized_medical_dataset.csv')
+
+
+def schema_columns():
+    with open(SCHEMA_PATH, encoding='utf-8') as f:
+        return f.readline().strip().split(',')
+
+
+def symptom_vocabulary(n_symptoms):
+    return np.array([f"symptom {i}" for i in range(n_symptoms)], dtype=object)
+
+
+def synthetic_catalogue(n_diseases, n_symptoms=None, seed=0):
+    rng = np.random.default_rng(seed)
+    n_symptoms = n_symptoms or max(50, n_diseases // 10)
+    vocabulary = symptom_vocabulary(n_symptoms)
+    weights = 1.0 / np.arange(1, n_symptoms + 1)
+    weights /= weights.sum()
+
+    columns = schema_columns()
+    ids = np.arange(n_diseases).astype(str).astype(object)
+    data = {column: np.full(n_diseases, '', dtype=object) for column in columns}
+    data['Disease'] = 'Disease ' + ids
+    data['Description'] = 'Synthetic condition number ' + ids
+    for i in range(1, 5):
+        data[f'Symptom_{i}'] = vocabulary[rng.choice(n_symptoms, size=n_diseases, p=weights)]
+    for i in range(1, 5):
+        data[f'Precaution_{i}'] = f'Precaution {i}'
+    data['Workout'] = 'Rest, Light walking'
+    data['Severity_Score'] = rng.integers(1, 11, size=n_diseases).astype(str)
+    data['Medicine_x'] = 'Medicine ' + (ids if n_diseases < 1000 else (rng.integers(0, 1000, n_diseases)).astype(str).astype(object))
+    data['Dosage_x'] = '10mg daily'
+    data['Medicine_y'] = data['Medicine_x']
+    data['Dosage_y'] = '5mg daily'
+    data['Alternative_Therapies'] = 'Rest, Hydration'
+    # Per-symptom weights as 'symptom:weight' pairs, as merge_update.py writes them
+    for group in ('Adult', 'Child'):
+        pairs = [
+            data[f'Symptom_{i}'] + ':' + rng.integers(1, 101, size=n_diseases).astype(str).astype(object)
+            for i in range(1, 5)
+        ]
+        data[f'{group}_Symptom_Probability_x'] = pairs[0] + ';' + pairs[1] + ';' + pairs[2] + ';' + pairs[3]
+    return pd.DataFrame(data, columns=columns)
+
+
+def write_synthetic_catalogue(path, n_diseases, n_symptoms=None, seed=0):
+    synthetic_catalogue(n_diseases, n_symptoms, seed).to_csv(path, index=False)
+    return path
+
+
+def synthetic_queries(n_queries, n_symptoms, seed=0, max_symptoms=6):
+    """
+    Symptom strings drawn with the catalogue's own frequency skew.
+    """
+    rng = np.random.default_rng(seed + 1)
+    vocabulary = symptom_vocabulary(n_symptoms)
+    weights = 1.0 / np.arange(1, n_symptoms + 1)
+    weights /= weights.sum()
+    sizes = rng.integers(1, max_symptoms + 1, size=n_queries)
+    return [', '.join(vocabulary[rng.choice(n_symptoms, size=size, p=weights)]) for size in sizes]
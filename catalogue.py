@@ -0,0 +1,1102 @@
+"""
+Disease catalogue: the medical dataset compiled into flat, read-only arrays.
+
+A Catalogue is built either by parsing the CSV (Catalogue.from_csv) or by
+memory-mapping a compiled artifact written with
+
+    python catalogue.py final_optimized_medical_dataset.csv -o model/catalogue.bin
+
+which skips pandas entirely at startup. The artifact records the size, mtime
+and checksum of the CSV it was built from; Catalogue.load() only uses it when
+it still matches the CSV, and falls back to parsing the CSV otherwise.
+
+Mapped arrays live in the page cache, so every worker process on a host that
+maps the same artifact shares one physical copy of the catalogue.
+
+Small dataset changes can ship as a delta file next to the CSV
+(<csv>.delta.csv): rows in the CSV's own columns that replace every row of
+the same disease, with a non-empty _deleted column marking diseases to drop.
+Catalogue.load() applies it on top of the artifact, so an update does not
+need a full recompile; folding it into the CSV (and recompiling) brings back
+the fully shared mapping.
+"""
+import argparse
+import hashlib
+import itertools
+import json
+import logging
+import mmap
+import os
+import re
+import struct
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import cached_property
+
+import numpy as np
+from scipy import sparse
+
+from matching import MedicalMatcher, medication_pieces
+from symptoms import SymptomNormalizer, SymptomSuggester
+
+try:
+    import fcntl
+except ImportError:  # Windows: compile without the cross-process lock
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+ARTIFACT_MAGIC = b'MRSCATLG'
+ARTIFACT_VERSION = 2
+_HEADER_LENGTH = struct.Struct('<Q')
+_ALIGNMENT = 64
+_generations = itertools.count(1)
+DELTA_SUFFIX = '.delta.csv'
+DELETED_COLUMN = '_deleted'
+# Numbered dataset columns; Symptom_Keywords and the like are not among them
+SYMPTOM_COLUMN = re.compile(r'Symptom_\d+')
+PRECAUTION_COLUMN = re.compile(r'Precaution_\d+')
+
+# Per-symptom weights for weighted scoring, from the first of these columns
+# present: one number for all of a disease's symptoms, or 'symptom:weight'
+# pairs separated by ';'
+WEIGHT_FIELDS = {
+    'adult': ('Adult_Symptom_Probability', 'Adult_Symptom_Probability_x', 'Adult_Symptom_Probability_y'),
+    'child': ('Child_Symptom_Probability', 'Child_Symptom_Probability_x', 'Child_Symptom_Probability_y'),
+}
+
+# The columns _format_result reads; the rest of the CSV is not kept
+RESULT_FIELDS = (
+    'Disease', 'Description', 'Precautions', 'Workout', 'Severity_Score',
+    'Medicine_x', 'Dosage_x', 'Medicine_y', 'Dosage_y', 'Alternative_Therapies'
+)
+
+
+class StringTable:
+    """
+    Interned strings stored as one utf-8 blob plus an offsets array.
+    """
+
+    def __init__(self, blob, offsets):
+        self.blob = blob
+        self.offsets = offsets
+
+    @classmethod
+    def build(cls, strings):
+        encoded = [s.encode('utf-8') for s in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(e) for e in encoded], out=offsets[1:])
+        blob = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+        return cls(blob, offsets)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return self.blob[self.offsets[i]:self.offsets[i + 1]].tobytes().decode('utf-8')
+
+    def many(self, ids):
+        """The strings with the given ids, decoded in one pass."""
+        blob = memoryview(self.blob)
+        return [
+            str(blob[start:end], 'utf-8')
+            for start, end in zip(self.offsets[ids].tolist(), self.offsets[ids + 1].tolist())
+        ]
+
+
+class ResultRecord:
+    """
+    The user-independent part of one disease's /predict response for one age
+    group. Only probability, allergy and history checks are left per request.
+    """
+    __slots__ = (
+        'disease', 'description', 'medicine', 'medication_pieces', 'dosage',
+        'alternative', 'precautions', 'workout', 'severity_score', 'severity'
+    )
+
+    def __init__(self, row, child):
+        self.disease = row.get('Disease', 'Unknown condition')
+        self.description = row.get('Description', 'Consult healthcare professional')
+        self.medicine = row.get('Medicine_y' if child else 'Medicine_x', 'Consult doctor')
+        self.medication_pieces = medication_pieces(self.medicine) if self.medicine else ()
+        self.dosage = row.get('Dosage_y' if child else 'Dosage_x', 'Consult doctor')
+        self.alternative = f"💊 Alternative: {row.get('Alternative_Therapies', 'Consult doctor for alternatives')}"
+        self.precautions = row.get('Precautions', 'General health precautions recommended')
+        self.workout = tuple(w for w in row.get('Workout', '').split(',') if w.strip())
+        # Raises ValueError on a malformed score, as formatting always has
+        self.severity_score = int(row.get('Severity_Score', 0))
+        self.severity = min(10, int(row.get('Severity_Score', 5)))
+
+
+class Catalogue:
+    """
+    Read-only snapshot of the disease dataset and its symptom index.
+
+    All state lives in flat numpy arrays (from the CSV or mapped from a
+    compiled artifact) which are never written after construction, so any
+    number of request threads can score against one snapshot.
+    """
+
+    def __init__(self, arrays, fields, source=None):
+        # Unique per snapshot, so caches can key on the catalogue they came from
+        self.generation = next(_generations)
+        self.arrays = {name: _frozen(array) for name, array in arrays.items()}
+        self.fields = tuple(fields)
+        self.source = source
+        self.strings = StringTable(self.arrays['string_blob'], self.arrays['string_offsets'])
+        self.symptom_names = self.arrays['symptom_strings']
+        self.symptom_ids = {
+            self.strings[string_id]: i for i, string_id in enumerate(self.symptom_names.tolist())
+        }
+        self.records = self.arrays['records']
+        self.posting_indptr = self.arrays['posting_indptr']
+        self.posting_indices = self.arrays['posting_indices']
+        self.matrix = sparse.csr_matrix(
+            (self.arrays['row_data'], self.arrays['row_indices'], self.arrays['row_indptr']),
+            shape=(len(self.arrays['row_indptr']) - 1, len(self.symptom_names))
+        )
+        # Weighted twins of matrix and the posting lists, per age group
+        self.weight_matrices = {
+            group: sparse.csr_matrix(
+                (self.arrays[f'{group}_weights'], self.arrays['row_indices'], self.arrays['row_indptr']),
+                shape=self.matrix.shape
+            )
+            for group in WEIGHT_FIELDS
+        }
+        self._disease_field = self.fields.index('Disease') if 'Disease' in self.fields else None
+        # (adult, child) ResultRecords per disease, filled by prebuild_results()
+        # or on first use; every writer stores an identical value
+        self._results = [None] * (2 * self.matrix.shape[0])
+
+    @classmethod
+    def load(cls, source_path, artifact_path=None, compile_stale=False):
+        """
+        Maps the compiled artifact when it is up to date with source_path,
+        otherwise parses the CSV. With compile_stale, a missing or stale
+        artifact is rebuilt first (once per host, under a file lock) so that
+        every worker ends up mapping the same file.
+        """
+        catalogue = None
+        if artifact_path:
+            catalogue = cls._map_if_fresh(artifact_path, source_path)
+            if catalogue is None and compile_stale:
+                try:
+                    catalogue = cls._compile_shared(source_path, artifact_path)
+                except OSError as e:
+                    logger.warning(f"Could not compile {artifact_path}: {str(e)}")
+        if catalogue is None:
+            catalogue = cls.from_csv(source_path)
+        delta = delta_path(source_path)
+        if os.path.exists(delta):
+            catalogue = catalogue.with_delta(delta)
+            logger.info(f"Applied {delta}")
+        return catalogue
+
+    @classmethod
+    def _map_if_fresh(cls, artifact_path, source_path):
+        if not os.path.exists(artifact_path):
+            return None
+        try:
+            catalogue = cls.from_artifact(artifact_path, source_path)
+            if catalogue is not None:
+                logger.info(f"Loaded compiled catalogue {artifact_path}")
+                return catalogue
+            logger.warning(f"Compiled catalogue {artifact_path} is stale, loading {source_path}")
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Unreadable compiled catalogue {artifact_path}: {str(e)}")
+        return None
+
+    @classmethod
+    def _compile_shared(cls, source_path, artifact_path):
+        with _exclusive(f"{artifact_path}.lock"):
+            # Another worker may have compiled it while we waited for the lock
+            catalogue = cls._map_if_fresh(artifact_path, source_path)
+            if catalogue is None:
+                cls.from_csv(source_path).save(artifact_path)
+                logger.info(f"Compiled {source_path} into {artifact_path}")
+                catalogue = cls.from_artifact(artifact_path, source_path)
+        return catalogue
+
+    @classmethod
+    def from_csv(cls, path):
+        return cls.from_frame(read_dataset(path), source=source_fingerprint(path))
+
+    @classmethod
+    def from_frame(cls, data, source=None):
+        symptom_ids, matrix = build_index(data['Symptoms'])
+        postings = matrix.tocsc()
+        order = _posting_order(matrix)
+        fields = [field for field in RESULT_FIELDS if field in data.columns]
+        weights = {group: build_weights(data, columns, symptom_ids, matrix) for group, columns in WEIGHT_FIELDS.items()}
+
+        interned = {}
+        symptom_strings = [interned.setdefault(name, len(interned)) for name in symptom_ids]
+        records = [
+            [interned.setdefault(_as_text(value), len(interned)) for value in row]
+            for row in data[fields].itertuples(index=False, name=None)
+        ]
+        strings = StringTable.build(interned)
+
+        arrays = {
+            'symptom_strings': np.array(symptom_strings, dtype=np.int32),
+            'posting_indptr': postings.indptr.astype(np.int32),
+            'posting_indices': postings.indices.astype(np.int32),
+            'row_indptr': matrix.indptr.astype(np.int32),
+            'row_indices': matrix.indices.astype(np.int32),
+            'row_data': matrix.data.astype(np.int32),
+            **{f'{group}_weights': weights[group] for group in WEIGHT_FIELDS},
+            **{f'{group}_posting_weights': weights[group][order] for group in WEIGHT_FIELDS},
+            'records': np.array(records, dtype=np.int32).reshape(len(data), len(fields)),
+            'string_blob': strings.blob,
+            'string_offsets': strings.offsets,
+        }
+        return cls(arrays, fields, source)
+
+    @classmethod
+    def from_artifact(cls, path, source_path=None):
+        """
+        Maps a compiled artifact. Returns None when it was built by another
+        format version or from a different CSV than source_path.
+        """
+        header, arrays = read_artifact(path)
+        if header.get('version') != ARTIFACT_VERSION:
+            return None
+        if source_path and os.path.exists(source_path) and not is_fresh(header['source'], source_path):
+            return None
+        return cls(arrays, header['fields'], header['source'])
+
+    @classmethod
+    def empty(cls):
+        # Built directly rather than from an empty frame, so it needs no pandas
+        strings = StringTable.build([])
+        none = np.zeros(0, dtype=np.int32)
+        arrays = {
+            'symptom_strings': none,
+            'posting_indptr': np.zeros(1, dtype=np.int32),
+            'posting_indices': none,
+            'row_indptr': np.zeros(1, dtype=np.int32),
+            'row_indices': none,
+            'row_data': none,
+            **{f'{group}_weights': np.zeros(0, dtype=np.float32) for group in WEIGHT_FIELDS},
+            **{f'{group}_posting_weights': np.zeros(0, dtype=np.float32) for group in WEIGHT_FIELDS},
+            'records': np.zeros((0, 0), dtype=np.int32),
+            'string_blob': strings.blob,
+            'string_offsets': strings.offsets,
+        }
+        return cls(arrays, (), None)
+
+    def save(self, path):
+        write_artifact(path, self.arrays, {'fields': list(self.fields), 'source': self.source})
+
+    def with_delta(self, path):
+        """
+        A new catalogue with the delta file at path applied: rows of every
+        disease the delta names are dropped and its non-deleted rows are
+        appended. Only the delta is parsed; this catalogue's rows are carried
+        over as arrays.
+        """
+        import pandas as pd
+        data = read_dataset(path)
+        deleted = pd.Series(False, index=data.index)
+        if DELETED_COLUMN in data:
+            deleted = data.pop(DELETED_COLUMN).astype(str) != ''
+        for field in self.fields:
+            if field not in data:
+                data[field] = ''
+        changed = set(disease_key(data['Disease'])) if 'Disease' in data else set()
+        # from_frame parses the delta's own weights from these, as a full load would
+        weight_columns = [c for columns in WEIGHT_FIELDS.values() for c in columns if c in data]
+        delta = Catalogue.from_frame(
+            data[~deleted][list(self.fields) + ['Symptoms'] + weight_columns].reset_index(drop=True)
+        )
+
+        keep = np.ones(self.matrix.shape[0], dtype=bool)
+        if self._disease_field is not None:
+            column = self.records[:, self._disease_field]
+            ids = np.unique(column)
+            names = pd.Series([self.strings[string_id] for string_id in ids.tolist()], dtype=object)
+            keep = ~np.isin(column, ids[disease_key(names).isin(changed).to_numpy()])
+
+        # The delta's strings go after ours; its symptoms take our ids where
+        # we already know them and new ids otherwise
+        string_base = len(self.strings)
+        strings = StringTable(
+            np.concatenate([self.strings.blob, delta.strings.blob]),
+            np.concatenate([self.strings.offsets, delta.strings.offsets[1:] + self.strings.offsets[-1]])
+        )
+        symptom_strings = self.symptom_names.tolist()
+        symptom_map = np.empty(len(delta.symptom_names), dtype=np.int32)
+        for name, i in delta.symptom_ids.items():
+            known = self.symptom_ids.get(name)
+            if known is None:
+                known = len(symptom_strings)
+                symptom_strings.append(int(delta.symptom_names[i]) + string_base)
+            symptom_map[i] = known
+
+        width = len(symptom_strings)
+        combined = {}
+        for name, ours, theirs in [('row_data', self.matrix, delta.matrix)] + [
+            (f'{group}_weights', self.weight_matrices[group], delta.weight_matrices[group]) for group in WEIGHT_FIELDS
+        ]:
+            kept = ours[keep]
+            added = sparse.csr_matrix(
+                (theirs.data.copy(), symptom_map[theirs.indices], theirs.indptr.copy()),
+                shape=(theirs.shape[0], width)
+            )
+            added.sort_indices()
+            combined[name] = sparse.vstack([
+                sparse.csr_matrix((kept.data, kept.indices, kept.indptr), shape=(kept.shape[0], width)), added
+            ], format='csr')
+        matrix = combined['row_data']
+        postings = matrix.tocsc()
+        order = _posting_order(matrix)
+
+        arrays = {
+            'symptom_strings': np.array(symptom_strings, dtype=np.int32),
+            'posting_indptr': postings.indptr.astype(np.int32),
+            'posting_indices': postings.indices.astype(np.int32),
+            'row_indptr': matrix.indptr.astype(np.int32),
+            'row_indices': matrix.indices.astype(np.int32),
+            'row_data': matrix.data.astype(np.int32),
+            **{f'{group}_weights': combined[f'{group}_weights'].data for group in WEIGHT_FIELDS},
+            **{f'{group}_posting_weights': combined[f'{group}_weights'].data[order] for group in WEIGHT_FIELDS},
+            'records': np.vstack([self.records[keep], delta.records + string_base]).astype(np.int32),
+            'string_blob': strings.blob,
+            'string_offsets': strings.offsets,
+        }
+        return Catalogue(arrays, self.fields, dict(self.source or {}, delta=source_fingerprint(path)))
+
+    @property
+    def is_empty(self):
+        return self.matrix.shape[0] == 0
+
+    def lookup(self, symptoms):
+        """
+        Maps normalized symptom strings to their ids, dropping unknown ones.
+        """
+        return {self.symptom_ids[s] for s in symptoms if s in self.symptom_ids}
+
+    def postings(self, symptom_id):
+        return self.posting_indices[self.posting_indptr[symptom_id]:self.posting_indptr[symptom_id + 1]]
+
+    def match_counts(self, symptom_ids, weights=None, rows=None):
+        """
+        Returns (rows, scores): every disease row sharing at least one of the
+        given symptoms, in row order, with its overlap count, or the sum of
+        the matched symptoms' weights for an age group given as weights.
+        rows=(start, stop) only considers that range of rows.
+        """
+        # The hit buffer is allocated per call, so concurrent callers never share state
+        spans = [(self.posting_indptr[i], self.posting_indptr[i + 1]) for i in symptom_ids]
+        if rows is not None:
+            # Posting lists are sorted by row, so the range is a slice of each
+            postings = self.posting_indices
+            spans = [
+                (start + np.searchsorted(postings[start:end], rows[0]), start + np.searchsorted(postings[start:end], rows[1]))
+                for start, end in spans
+            ]
+        hits = np.concatenate([self.posting_indices[start:end] for start, end in spans])
+        if weights is None:
+            return np.unique(hits, return_counts=True)
+        posting_weights = self.arrays[f'{weights}_posting_weights']
+        rows, inverse = np.unique(hits, return_inverse=True)
+        scores = np.bincount(
+            inverse, weights=np.concatenate([posting_weights[start:end] for start, end in spans]), minlength=len(rows)
+        )
+        return rows, scores
+
+    def rank_index(self, symptom_ids, k, weights=None, rows=None):
+        """
+        Top-k (rows, scores) from the posting lists, best score first and
+        earlier rows first among equal scores.
+        """
+        rows, scores = self.match_counts(symptom_ids, weights, rows)
+        return _top_k(rows, scores, k)
+
+    def rank_sparse(self, symptom_ids, k, weights=None, rows=None):
+        """
+        Same ranking as rank_index, computed as one sparse mat-vec of the
+        disease x symptom matrix (or an age group's weight matrix) with the
+        query vector.
+        """
+        matrix, first = self._block(weights, rows)
+        ids = np.fromiter(symptom_ids, dtype=np.int32, count=len(symptom_ids))
+        query = sparse.csc_matrix(
+            (np.ones(len(ids), dtype=matrix.dtype), (ids, np.zeros(len(ids), dtype=np.int32))),
+            shape=(matrix.shape[1], 1)
+        )
+        scores = (matrix @ query).toarray().ravel()
+        return _top_k(np.arange(first, first + len(scores)), scores, k)
+
+    def _block(self, weights, rows):
+        """
+        The disease x symptom matrix (or an age group's weight matrix) cut to
+        rows=(start, stop) without copying its entries, and its first row.
+        """
+        matrix = self.matrix if weights is None else self.weight_matrices[weights]
+        if rows is None:
+            return matrix, 0
+        start, stop = rows
+        first, last = matrix.indptr[start], matrix.indptr[stop]
+        # Assigned rather than passed in: the constructor copies sliced arrays
+        block = sparse.csr_matrix((stop - start, matrix.shape[1]), dtype=matrix.dtype)
+        block.data, block.indices = matrix.data[first:last], matrix.indices[first:last]
+        block.indptr = matrix.indptr[start:stop + 1] - first
+        return block, start
+
+    def overlap(self, rows, symptom_ids):
+        """
+        How many of the given symptoms each of rows lists.
+        """
+        ids = set(symptom_ids)
+        indptr, indices = self.matrix.indptr, self.matrix.indices
+        return np.array([
+            sum(1 for i in indices[indptr[row]:indptr[row + 1]].tolist() if i in ids) for row in rows.tolist()
+        ], dtype=np.int64)
+
+    def rank_batch(self, symptom_id_sets, k, weights=None, rows=None):
+        """
+        Ranks many queries at once, returning one (rows, scores) pair per
+        query, ordered like rank_index. Each query keeps only its own top k
+        (_overlap_top_k, _top_k_hits), so a single sort over the batch
+        orders a few rows per query rather than every hit.
+        """
+        matrix, first = self._block(weights, rows)
+        lengths = np.fromiter(map(len, symptom_id_sets), dtype=np.int64, count=len(symptom_id_sets))
+        indptr = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=indptr[1:])
+        indices = np.fromiter(
+            itertools.chain.from_iterable(symptom_id_sets), dtype=np.int32, count=int(indptr[-1])
+        )
+        if weights is None:
+            query_of, hits, scores = self._overlap_top_k(matrix, first, indices, indptr, k)
+        else:
+            query_of, hits, scores = _top_k_hits(_score(matrix, indices, indptr), k)
+            hits = hits + first
+        order = _rank_order(query_of, scores, hits, len(lengths), self.matrix.shape[0])
+        hits, scores = hits[order], scores[order]
+        starts = np.searchsorted(query_of[order], np.arange(len(lengths) + 1))
+        ends = np.minimum(starts[1:], starts[:-1] + k)
+        return [
+            (hits[start:end], scores[start:end]) for start, end in zip(starts[:-1].tolist(), ends.tolist())
+        ]
+
+    def _overlap_top_k(self, matrix, first, indices, indptr, k, max_hits=2048):
+        """
+        (query, row, count) for up to 2k of each query's best overlap counts
+        in the block matrix starting at row first, unordered; the top-k are
+        among them.
+
+        A common symptom's posting list can cover a large share of the
+        catalogue, so each query's longest list is left out of the product:
+        a row matching only that symptom scores 1, and of those only the
+        earliest k rows can make the top-k. The product covers the rest, and
+        each of its hits is checked against the longest list directly. A
+        query whose other lists hold more than max_hits rows costs the
+        product about as much as counting its hits one query at a time, so
+        it goes through rank_index instead.
+        """
+        n_queries = len(indptr) - 1
+        sizes = np.diff(indptr)
+        query_of = np.repeat(np.arange(n_queries), sizes)
+        lo, hi = self._posting_spans(indices, first, first + matrix.shape[0])
+        # Position of each query's longest list: the first in its run once
+        # sorted by length
+        asked = sizes > 0
+        longest_at = np.lexsort((lo - hi, query_of))[indptr[:-1][asked]]
+        rest = np.ones(len(indices), dtype=bool)
+        rest[longest_at] = False
+        heavy = np.bincount(query_of[rest], weights=(hi - lo)[rest], minlength=n_queries) > max_hits
+        rest &= ~heavy[query_of]
+        light = asked & ~heavy
+        longest = np.zeros(n_queries, dtype=np.int64)
+        longest_lo, longest_hi = np.zeros(n_queries, dtype=np.int64), np.zeros(n_queries, dtype=np.int64)
+        longest[asked], longest_lo[asked], longest_hi[asked] = indices[longest_at], lo[longest_at], hi[longest_at]
+
+        # The rest of each query's symptoms against the catalogue; columns are
+        # queries, each with its hits in row order
+        counts = _score(matrix, indices[rest], np.concatenate([[0], np.cumsum(rest)])[indptr])
+        hit_query = np.repeat(np.arange(n_queries), np.diff(counts.indptr))
+        hit_rows = counts.indices.astype(np.int64)
+        hit_counts = counts.data.astype(np.int64) + self._lists(longest[hit_query], hit_rows + first)
+        keep = _top_k_mask(hit_query, hit_counts, counts.indptr, k)
+
+        # The earliest rows of each longest list that the product missed: of
+        # its first k + (hits on it), at least k are not hits
+        in_longest = np.bincount(hit_query, weights=hit_counts - counts.data, minlength=n_queries).astype(np.int64)
+        wanted = np.where(light, np.minimum(k + in_longest, longest_hi - longest_lo), 0)
+        prefix_query = np.repeat(np.arange(n_queries), wanted)
+        offsets = np.arange(len(prefix_query)) - np.repeat(np.cumsum(wanted) - wanted, wanted)
+        prefix_rows = self.posting_indices[np.repeat(longest_lo, wanted) + offsets].astype(np.int64) - first
+        # Hits are sorted by (query, row), so membership is a binary search
+        hit_keys = hit_query * matrix.shape[0] + hit_rows
+        prefix_keys = prefix_query * matrix.shape[0] + prefix_rows
+        found = np.minimum(np.searchsorted(hit_keys, prefix_keys), max(len(hit_keys) - 1, 0))
+        missed = hit_keys[found] != prefix_keys if len(hit_keys) else np.ones(len(prefix_keys), dtype=bool)
+        prefix_query, prefix_rows = prefix_query[missed], prefix_rows[missed]
+        bounds = np.searchsorted(prefix_query, np.arange(n_queries + 1))
+        prefix_keep = np.arange(len(prefix_query)) - bounds[prefix_query] < k
+
+        parts = [
+            (hit_query[keep], hit_rows[keep] + first, hit_counts[keep]),
+            (prefix_query[prefix_keep], prefix_rows[prefix_keep] + first, np.ones(int(prefix_keep.sum()), dtype=np.int64))
+        ]
+        block = None if matrix is self.matrix else (first, first + matrix.shape[0])
+        for query in np.flatnonzero(heavy).tolist():
+            rows, scores = self.rank_index(indices[indptr[query]:indptr[query + 1]].tolist(), k, rows=block)
+            parts.append((np.full(len(rows), query), rows, scores))
+        return tuple(np.concatenate(part) for part in zip(*parts))
+
+    @cached_property
+    def _posting_keys(self):
+        # symptom * rows + row for every posting, ascending: the posting lists
+        # are in symptom order and each list is in row order
+        n_rows = self.matrix.shape[0]
+        symptoms = np.repeat(np.arange(len(self.symptom_names), dtype=np.int64), np.diff(self.posting_indptr))
+        return symptoms * n_rows + self.posting_indices
+
+    def _lists(self, symptom_ids, rows):
+        """
+        1 where row rows[i] lists symptom symptom_ids[i], else 0, by binary
+        search over all postings at once.
+        """
+        keys = symptom_ids * self.matrix.shape[0] + rows
+        found = np.searchsorted(self._posting_keys, keys)
+        listed = np.zeros(len(keys), dtype=np.int64)
+        inside = found < len(self._posting_keys)
+        listed[inside] = self._posting_keys[found[inside]] == keys[inside]
+        return listed
+
+    def _posting_spans(self, symptom_ids, start, stop):
+        """
+        Bounds in posting_indices of each symptom's postings within rows
+        [start, stop).
+        """
+        lo = self.posting_indptr[symptom_ids].astype(np.int64)
+        hi = self.posting_indptr[symptom_ids + 1].astype(np.int64)
+        if start > 0 or stop < self.matrix.shape[0]:
+            for i in range(len(symptom_ids)):
+                postings = self.posting_indices[lo[i]:hi[i]]
+                lo[i], hi[i] = lo[i] + np.searchsorted(postings, start), lo[i] + np.searchsorted(postings, stop)
+        return lo, hi
+
+    def row(self, pos):
+        """
+        The result fields of one disease as a dict, plus its 'Symptoms' list.
+        """
+        strings = self.strings
+        record = {
+            field: strings[string_id]
+            for field, string_id in zip(self.fields, self.records[pos].tolist())
+        }
+        start, end = self.matrix.indptr[pos], self.matrix.indptr[pos + 1]
+        record['Symptoms'] = [
+            strings[self.symptom_names[i]] for i in self.matrix.indices[start:end].tolist()
+        ]
+        return record
+
+    def result(self, pos, child):
+        slot = 2 * pos + bool(child)
+        record = self._results[slot]
+        if record is None:
+            record = self._results[slot] = ResultRecord(self.row(pos), child)
+        return record
+
+    def prebuild_results(self):
+        """
+        Builds every ResultRecord up front. Rows with malformed fields are
+        left to fail (and be reported) when they are requested.
+        """
+        failed = 0
+        for pos in range(self.matrix.shape[0]):
+            for child in (False, True):
+                try:
+                    self.result(pos, child)
+                except ValueError:
+                    failed += 1
+        if failed:
+            logger.warning(f"{failed} result records could not be built")
+
+    @cached_property
+    def version(self):
+        """
+        Identifies the data behind this catalogue, the same in every worker
+        that loaded it; changes when the source or its delta does.
+        """
+        return hashlib.sha256(json.dumps(self.source, sort_keys=True).encode()).hexdigest()[:16]
+
+    @cached_property
+    def suggester(self):
+        return SymptomSuggester(self.symptom_ids, np.diff(self.posting_indptr))
+
+    @cached_property
+    def normalizer(self):
+        """
+        Resolves symptom spellings, plurals, synonyms and typos to ids, with
+        symptom frequencies breaking ties between equally close names.
+        """
+        return SymptomNormalizer(self.symptom_ids, np.diff(self.posting_indptr))
+
+    @cached_property
+    def medical_matcher(self):
+        """
+        Compiles user allergy and condition text against this catalogue's
+        medications and disease names.
+        """
+        medications = {'Consult doctor'}
+        for field in ('Medicine_x', 'Medicine_y'):
+            if field in self.fields:
+                medications.update(self._distinct(field))
+        diseases = self._distinct('Disease') if 'Disease' in self.fields else ['Unknown condition']
+        return MedicalMatcher(medications, diseases)
+
+    def _distinct(self, field):
+        column = self.records[:, self.fields.index(field)]
+        return [self.strings[string_id] for string_id in np.unique(column).tolist()]
+
+    def symptom_name(self, symptom_id):
+        return self.strings[int(self.symptom_names[symptom_id])]
+
+    def disease(self, pos):
+        if self._disease_field is None:
+            return 'Unknown condition'
+        return self.strings[self.records[pos, self._disease_field]]
+
+    def best_per_disease(self, rankings, min_score):
+        """
+        Cuts each (rows, scores) ranking to its first row of every disease
+        (by name, ignoring case) that scores at least min_score, for a whole
+        batch at once. Returns the kept rows' disease names and scores as
+        flat lists, and bounds: ranking i's are [bounds[i], bounds[i + 1]).
+        """
+        empty = np.zeros(0, dtype=np.int64)
+        rows = np.concatenate([rows for rows, _ in rankings] or [empty])
+        scores = np.concatenate([scores for _, scores in rankings] or [empty])
+        item = np.repeat(np.arange(len(rankings)), [len(rows) for rows, _ in rankings])
+        disease = self._disease_keys[rows]
+        # Rankings are best first, so a disease's first row in one is its best
+        order = np.lexsort((np.arange(len(rows)), disease, item))
+        first = np.ones(len(rows), dtype=bool)
+        first[order[1:]] = (item[order[1:]] != item[order[:-1]]) | (disease[order[1:]] != disease[order[:-1]])
+        kept = np.flatnonzero(first & (scores >= min_score))
+        bounds = np.searchsorted(item[kept], np.arange(len(rankings) + 1))
+        if self._disease_field is None:
+            names = ['Unknown condition'] * len(kept)
+        else:
+            distinct, inverse = np.unique(self.records[rows[kept], self._disease_field], return_inverse=True)
+            decoded = self.strings.many(distinct)
+            names = [decoded[i] for i in inverse.tolist()]
+        return names, scores[kept].tolist(), bounds.tolist()
+
+    @cached_property
+    def _disease_keys(self):
+        # Per row, an id shared by the rows whose disease names match ignoring case
+        if self._disease_field is None:
+            return np.zeros(self.matrix.shape[0], dtype=np.int64)
+        distinct, inverse = np.unique(self.records[:, self._disease_field], return_inverse=True)
+        keys = {}
+        ids = np.array(
+            [keys.setdefault(name.strip().lower(), len(keys)) for name in self.strings.many(distinct)], dtype=np.int64
+        )
+        return ids[inverse]
+
+    @cached_property
+    def _disease_rows(self):
+        # (lowercased disease names, sorted; first row of each), built on first use
+        rows = {}
+        if self._disease_field is not None:
+            for pos, string_id in enumerate(self.records[:, self._disease_field].tolist()):
+                rows.setdefault(self.strings[string_id].strip().lower(), pos)
+        names = sorted(rows)
+        return names, [rows[name] for name in names]
+
+    def find_disease(self, name):
+        """
+        The first row of the disease called name, ignoring case, or else of
+        the alphabetically first disease whose name extends it ('Diabetes
+        Mellitus' finds 'Diabetes Mellitus Type 2'); None if there is neither.
+        """
+        names, rows = self._disease_rows
+        key = name.strip().lower()
+        i = bisect_left(names, key)
+        if i < len(names) and names[i] == key:
+            return rows[i]
+        i = bisect_left(names, key + ' ')
+        if i < len(names) and names[i].startswith(key + ' '):
+            return rows[i]
+        return None
+
+
+def preprocess(data):
+    """
+    Adds the 'Symptoms' list and 'Precautions' text the catalogue is built
+    from. Symptoms come from the numbered Symptom_1, Symptom_2, ... columns
+    of the shipped dataset, or from the merged dataset's 'Symptoms' text
+    (the schema merge_update.py writes), which lists them separated by ','
+    or ';'. Other columns starting with 'Symptom_', like Symptom_Keywords,
+    are not symptoms.
+    """
+    symptom_cols = [col for col in data.columns if SYMPTOM_COLUMN.fullmatch(col)]
+    if not symptom_cols and 'Symptoms' in data.columns:
+        symptom_cols = ['Symptoms']
+    if symptom_cols:
+        data['Symptoms'] = data[symptom_cols].astype(str).agg(','.join, axis=1)
+        data['Symptoms'] = data['Symptoms'].str.lower().str.split(r'[,;]', regex=True).apply(
+            lambda x: [s.strip() for s in x if s.strip() and s.strip() != 'nan']
+        )
+    else:
+        data['Symptoms'] = [[] for _ in range(len(data))]
+
+    # The merged dataset has a 'Precautions' column of its own and no numbered ones
+    precaution_cols = [col for col in data.columns if PRECAUTION_COLUMN.fullmatch(col)]
+    if precaution_cols:
+        data['Precautions'] = data[precaution_cols].astype(str).agg(', '.join, axis=1)
+    elif 'Precautions' not in data.columns:
+        data['Precautions'] = ''
+
+
+def read_dataset(path):
+    # Only needed to parse CSVs, so processes mapping an artifact never import it
+    import pandas as pd
+    data = pd.read_csv(path, on_bad_lines='skip')
+    # Object dtype first: newer pandas refuses to fill float columns with ''
+    data = data.astype(object).fillna('')
+    preprocess(data)
+    return data
+
+
+def disease_key(diseases):
+    """
+    Normalized disease names, the key delta rows replace rows by.
+    """
+    return diseases.fillna('').astype(str).str.strip().str.lower()
+
+
+def delta_path(source_path):
+    return f"{source_path}{DELTA_SUFFIX}"
+
+
+def build_index(symptom_lists):
+    """
+    Builds the symptom -> integer id vocabulary (ids in order of first
+    appearance) and the disease x symptom CSR matrix, with a 1 wherever a
+    disease lists a symptom.
+    """
+    symptom_ids = {}
+    indptr = [0]
+    indices = []
+    for symptoms in symptom_lists:
+        indices.extend(sorted({symptom_ids.setdefault(s, len(symptom_ids)) for s in symptoms}))
+        indptr.append(len(indices))
+    matrix = sparse.csr_matrix(
+        (np.ones(len(indices), dtype=np.int32), np.array(indices, dtype=np.int32), np.array(indptr, dtype=np.int32)),
+        shape=(len(indptr) - 1, len(symptom_ids))
+    )
+    return symptom_ids, matrix
+
+
+def _weight_key(symptom):
+    return symptom.strip().lower().replace('_', ' ')
+
+
+def parse_weights(value, symptoms):
+    """
+    One weight per symptom from a symptom-probability field, None where the
+    field gives none: a bare number applies to every symptom, otherwise
+    'symptom:weight' pairs are matched by name.
+    """
+    text = _as_text(value).strip()
+    if not text:
+        return [None] * len(symptoms)
+    try:
+        return [float(text)] * len(symptoms)
+    except ValueError:
+        pass
+    pairs = {}
+    for item in text.split(';'):
+        name, separator, weight = item.rpartition(':')
+        if separator:
+            try:
+                pairs[_weight_key(name)] = float(weight)
+            except ValueError:
+                continue
+    return [pairs.get(_weight_key(symptom)) for symptom in symptoms]
+
+
+def build_weights(data, columns, symptom_ids, matrix):
+    """
+    The weights of matrix's entries, in its CSR order, parsed from the first
+    of columns present in data. Symptoms without a weight get the average of
+    those with one, so unweighted diseases still rank on their overlap.
+    """
+    column = next((c for c in columns if c in data.columns), None)
+    weights = np.full(matrix.nnz, np.nan, dtype=np.float32)
+    if column is not None:
+        names = list(symptom_ids)
+        for row, value in enumerate(data[column].tolist()):
+            start, end = matrix.indptr[row], matrix.indptr[row + 1]
+            parsed = parse_weights(value, [names[i] for i in matrix.indices[start:end].tolist()])
+            weights[start:end] = [np.nan if weight is None else max(weight, 0.0) for weight in parsed]
+    known = ~np.isnan(weights)
+    weights[~known] = weights[known].mean() if known.any() else 1.0
+    return weights
+
+
+def _posting_order(matrix):
+    """
+    The permutation taking matrix's entries from CSR order into the CSC
+    (posting list) order of matrix.tocsc().
+    """
+    positions = sparse.csr_matrix(
+        (np.arange(matrix.nnz, dtype=np.int64), matrix.indices, matrix.indptr), shape=matrix.shape
+    )
+    return positions.tocsc().data
+
+
+def source_fingerprint(path):
+    stat = os.stat(path)
+    return {
+        'path': os.path.basename(path),
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'sha256': file_checksum(path),
+    }
+
+
+def file_checksum(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def is_fresh(source, path):
+    """
+    Whether the CSV at path is the one an artifact was compiled from. An
+    unchanged size and mtime is trusted; a touched file is checksummed.
+    """
+    stat = os.stat(path)
+    if stat.st_size != source['size']:
+        return False
+    if stat.st_mtime_ns == source['mtime_ns']:
+        return True
+    return file_checksum(path) == source['sha256']
+
+
+def write_artifact(path, arrays, header):
+    """
+    Writes arrays as one file: magic, header length, JSON header, then each
+    array at an aligned offset so it can be mapped in place. The file is
+    written next to path and renamed over it, so readers never see a
+    partial artifact.
+    """
+    header = dict(header, version=ARTIFACT_VERSION, arrays={})
+    offset = 0
+    layout = []
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        offset = _aligned(offset)
+        header['arrays'][name] = {'offset': offset, 'dtype': array.dtype.str, 'shape': list(array.shape)}
+        layout.append((offset, array))
+        offset += array.nbytes
+    size = _aligned(offset)
+    encoded = json.dumps(header).encode('utf-8')
+    data_start = _aligned(len(ARTIFACT_MAGIC) + _HEADER_LENGTH.size + len(encoded))
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(ARTIFACT_MAGIC)
+        f.write(_HEADER_LENGTH.pack(len(encoded)))
+        f.write(encoded)
+        for array_offset, array in layout:
+            f.seek(data_start + array_offset)
+            f.write(array.tobytes())
+        f.truncate(data_start + size)
+    os.replace(tmp_path, path)
+
+
+def read_artifact(path):
+    with open(path, 'rb') as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    prefix = len(ARTIFACT_MAGIC) + _HEADER_LENGTH.size
+    if buffer[:len(ARTIFACT_MAGIC)] != ARTIFACT_MAGIC:
+        raise ValueError("not a compiled catalogue")
+    (length,) = _HEADER_LENGTH.unpack(buffer[len(ARTIFACT_MAGIC):prefix])
+    header = json.loads(buffer[prefix:prefix + length].decode('utf-8'))
+    data_start = _aligned(prefix + length)
+
+    arrays = {}
+    for name, spec in header['arrays'].items():
+        dtype = np.dtype(spec['dtype'])
+        count = int(np.prod(spec['shape'], dtype=np.int64))
+        if count:
+            array = np.frombuffer(buffer, dtype=dtype, count=count, offset=data_start + spec['offset'])
+        else:
+            array = np.empty(0, dtype=dtype)
+        arrays[name] = array.reshape(spec['shape'])
+    return header, arrays
+
+
+def memory_usage():
+    """
+    This process's resident (rss), proportional (pss) and shared memory in
+    KiB, read from /proc; empty where that is unavailable. PSS splits shared
+    pages between the processes mapping them, so summing it over workers
+    gives their real footprint.
+    """
+    usage = {}
+    try:
+        with open('/proc/self/smaps_rollup') as f:
+            for line in f:
+                key, _, value = line.partition(':')
+                if key in ('Rss', 'Pss', 'Shared_Clean', 'Shared_Dirty'):
+                    usage[key] = int(value.split()[0])
+    except OSError:
+        return {}
+    return {
+        'rss': usage.get('Rss', 0),
+        'pss': usage.get('Pss', 0),
+        'shared': usage.get('Shared_Clean', 0) + usage.get('Shared_Dirty', 0),
+    }
+
+
+@contextmanager
+def _exclusive(lock_path):
+    if fcntl is None:
+        yield
+        return
+    with open(lock_path, 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _aligned(offset):
+    return -(-offset // _ALIGNMENT) * _ALIGNMENT
+
+
+def _as_text(value):
+    # pandas hands back whole-number floats for numeric columns with gaps
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value)
+
+
+def merge_top_k(parts, k):
+    """
+    Combines top-k (rows, scores) lists over disjoint sets of rows into the
+    top-k of them all, ordered like rank_index.
+    """
+    rows = np.concatenate([rows for rows, _ in parts])
+    scores = np.concatenate([scores for _, scores in parts])
+    return _top_k(rows, scores, k)
+
+
+def _top_k(rows, scores, k):
+    if len(scores) > k:
+        # argpartition finds the k-th best score; ties at that boundary are
+        # resolved towards earlier rows so the ranking is deterministic
+        threshold = scores[np.argpartition(-scores, k - 1)[k - 1]]
+        above = np.flatnonzero(scores > threshold)
+        tied = np.flatnonzero(scores == threshold)[:k - len(above)]
+        keep = np.concatenate([above, tied])
+        rows, scores = rows[keep], scores[keep]
+    order = np.lexsort((rows, -scores))
+    return rows[order], scores[order]
+
+
+def _score(matrix, indices, indptr):
+    """
+    The scores of queries (rows of symptom ids in CSR form) against matrix,
+    as a CSC matrix with a column per query listing its hits in row order.
+    """
+    queries = sparse.csr_matrix(
+        (np.ones(len(indices), dtype=matrix.dtype), indices, indptr),
+        shape=(len(indptr) - 1, matrix.shape[1])
+    )
+    return (matrix @ queries.T).tocsc()
+
+
+def _top_k_hits(scores, k):
+    """(query, row, score) for each column's top-k entries, unordered."""
+    query_of = np.repeat(np.arange(scores.shape[1]), np.diff(scores.indptr))
+    data = scores.data
+    if np.array_equal(data, np.round(data)) and (not len(data) or abs(data).max() < 1 << 16):
+        levels = data.astype(np.int64)
+    else:
+        _, levels = np.unique(data, return_inverse=True)
+    keep = _top_k_mask(query_of, levels, scores.indptr, k)
+    return query_of[keep], scores.indices[keep], data[keep]
+
+
+def _rank_order(query_of, scores, rows, n_queries, n_rows):
+    """
+    The order sorting hits by query, then score descending, then row: one
+    argsort of a combined integer key where overlap counts allow it.
+    """
+    if len(scores) and scores.dtype.kind in 'iu':
+        levels = int(scores.max()) + 1
+        if n_queries * levels * n_rows < 1 << 62:
+            key = (query_of.astype(np.int64) * levels + (levels - 1 - scores)) * n_rows + rows
+            return np.argsort(key)
+    return np.lexsort((rows, -scores, query_of))
+
+
+def _top_k_mask(query_of, levels, indptr, k, chunk_cells=1 << 22):
+    """
+    Which hits are in their query's top-k, given the hits of each query in
+    row order (query_of, ascending) and their scores as integer levels:
+    every hit above the query's k-th best level, and the earliest rows at it.
+    """
+    n_queries = len(indptr) - 1
+    n_levels = int(levels.max()) + 1 if len(levels) else 1
+    threshold = np.empty(n_queries, dtype=np.int64)
+    above = np.empty(n_queries, dtype=np.int64)
+    # Histograms of (query, level) counts, a bounded number of queries at a time
+    step = max(1, chunk_cells // n_levels)
+    for start in range(0, n_queries, step):
+        stop = min(n_queries, start + step)
+        span = slice(indptr[start], indptr[stop])
+        histogram = np.bincount(
+            (query_of[span] - start) * n_levels + levels[span], minlength=(stop - start) * n_levels
+        ).reshape(stop - start, n_levels)
+        # at_least[:, l]: hits scoring level l or better
+        at_least = np.cumsum(histogram[:, ::-1], axis=1)[:, ::-1]
+        level = (at_least >= k).sum(axis=1) - 1
+        threshold[start:stop] = level
+        padded = np.concatenate([at_least, np.zeros((stop - start, 1), dtype=at_least.dtype)], axis=1)
+        above[start:stop] = padded[np.arange(stop - start), level + 1]
+    # Queries with fewer than k hits have level -1 and keep them all
+    hit_threshold = threshold[query_of]
+    tied = levels == hit_threshold
+    tied_before = np.concatenate([[0], np.cumsum(tied)])
+    tie_rank = tied_before[1:] - 1 - tied_before[indptr[:-1]][query_of]
+    return (levels > hit_threshold) | (tied & (tie_rank < k - above[query_of]))
+
+
+def _frozen(array):
+    array.flags.writeable = False
+    return array
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile the disease CSV into a mappable catalogue artifact")
+    parser.add_argument('source', nargs='?', default='final_optimized_medical_dataset.csv')
+    parser.add_argument('-o', '--output', default=os.path.join('model', 'catalogue.bin'))
+    parser.add_argument('--if-stale', action='store_true',
+                        help="only compile when the output is missing or out of date, under the shared lock")
+    args = parser.parse_args()
+
+    if args.if_stale:
+        catalogue = Catalogue.load(args.source, args.output, compile_stale=True)
+    else:
+        catalogue = Catalogue.from_csv(args.source)
+        catalogue.save(args.output)
+    print(f"Compiled {catalogue.matrix.shape[0]} diseases, {catalogue.matrix.shape[1]} symptoms into {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""
+The shipped scikit-learn classifier and micro-batching for it.
+
+SymptomModel wraps model/enhanced_medical_model.pkl and the TF-IDF vectorizer
+it was trained with. predict_proba costs about the same for one row as for
+dozens, so MicroBatcher collects the queries of concurrent requests and
+scores them in one call: a batch runs as soon as it holds max_batch_size
+queries or max_wait seconds after its first query arrived, whichever comes
+first. Under light load a query waits at most max_wait; under heavy load
+batches fill up and throughput rises instead of requests queueing for the
+GIL one predict_proba at a time.
+"""
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class SymptomModel:
+    """
+    The classifier and vectorizer, loaded once. Arrays in uncompressed
+    pickles are memory-mapped read-only, so worker processes share them.
+    """
+
+    def __init__(self, model_path, vectorizer_path):
+        import joblib
+        self.model = joblib.load(model_path, mmap_mode='r')
+        self.vectorizer = joblib.load(vectorizer_path, mmap_mode='r')
+        self.classes = [str(name) for name in self.model.classes_]
+        logger.info(f"Loaded {type(self.model).__name__} over {len(self.classes)} diseases from {model_path}")
+
+    @staticmethod
+    def text(symptoms):
+        # The vectorizer was fitted on symptom lists with the commas removed
+        # (its vocabulary has terms like 'fevercoughfatiguebody'), so queries
+        # are joined the same way
+        return ''.join(symptoms)
+
+    def rank(self, texts, k):
+        """
+        For each text, its k most probable (class index, probability) pairs,
+        best first; None for texts sharing no terms with the vocabulary,
+        which the model would only answer with its prior.
+        """
+        features = self.vectorizer.transform(texts)
+        probabilities = self.model.predict_proba(features)
+        known = np.diff(features.indptr) > 0
+        order = np.argsort(-probabilities, axis=1, kind='stable')[:, :k]
+        return [
+            list(zip(row_order.tolist(), row[row_order].tolist())) if has_terms else None
+            for row_order, row, has_terms in zip(order, probabilities, known)
+        ]
+
+
+class MicroBatcher:
+    """
+    Runs function(items) on batches of items submitted from many threads.
+    function must return one result per item, in order.
+    """
+
+    def __init__(self, function, max_batch_size=64, max_wait=0.002, name='micro-batcher'):
+        self.function = function
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.batches = 0
+        self.items = 0
+        self._queue = queue.SimpleQueue()
+        threading.Thread(target=self._run, name=name, daemon=True).start()
+
+    def submit(self, item):
+        """
+        The result for item, once the batch it joins has run. Raises what
+        function raised for that batch.
+        """
+        future = Future()
+        self._queue.put((item, future))
+        return future.result()
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "mean_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000
+        }
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                # Past the deadline, still take what is already queued
+                remaining = deadline - time.monotonic()
+                try:
+                    batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self.batches += 1
+            self.items += len(batch)
+            try:
+                results = self.function([item for item, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+            else:
+                for (_, future), result in zip(batch, results):
+                    future.set_result(result)
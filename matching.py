@@ -0,0 +1,142 @@
+"""
+Compiled allergy and medical-history matching.
+
+The original checks were substring scans run on every prediction: a
+medication piece matched when it occurred anywhere in the user's allergy
+text, and a condition matched a disease when either contained the other.
+Both sides of those checks on the catalogue are finite (its medication
+pieces and disease names), so a user's free text is compiled once into the
+set of catalogue entries it matches, and each prediction only does set
+lookups on that.
+"""
+from bisect import bisect_right
+from collections import deque
+from functools import lru_cache
+
+# Compiled profiles kept per catalogue, keyed on the raw profile text
+PROFILE_CACHE_SIZE = 4096
+
+
+class AhoCorasick:
+    """
+    Multi-pattern substring matcher: findall() returns every pattern that
+    occurs in a text in one pass over it.
+    """
+
+    def __init__(self, patterns):
+        self.goto = [{}]
+        self.fail = [0]
+        self.outputs = [()]
+        for pattern in set(patterns):
+            if pattern:
+                self._add(pattern)
+        self._link()
+
+    def _add(self, pattern):
+        state = 0
+        for char in pattern:
+            following = self.goto[state].get(char)
+            if following is None:
+                following = len(self.goto)
+                self.goto[state][char] = following
+                self.goto.append({})
+                self.fail.append(0)
+                self.outputs.append(())
+            state = following
+        self.outputs[state] += (pattern,)
+
+    def _link(self):
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, following in self.goto[state].items():
+                queue.append(following)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[following] = self.goto[fallback].get(char, 0)
+                self.outputs[following] += self.outputs[self.fail[following]]
+
+    def findall(self, text):
+        found = set()
+        goto, fail, outputs = self.goto, self.fail, self.outputs
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if outputs[state]:
+                found.update(outputs[state])
+        return found
+
+
+def medication_pieces(medication):
+    """
+    The normalized pieces of a medication string that are checked against
+    a user's allergies.
+    """
+    return tuple(med.strip().lower() for med in medication.split(','))
+
+
+def condition_list(medical_conditions):
+    return [c.strip().lower() for c in medical_conditions.split(',') if c.strip()]
+
+
+class MedicalProfile:
+    """
+    A user's allergies and conditions compiled against one catalogue.
+    """
+    __slots__ = ('allergy_hits', 'history_hits')
+
+    def __init__(self, allergy_hits, history_hits):
+        self.allergy_hits = allergy_hits
+        self.history_hits = history_hits
+
+    def allergic_to(self, pieces):
+        return any(piece in self.allergy_hits for piece in pieces)
+
+    def history_match(self, disease):
+        return bool(disease) and disease.lower() in self.history_hits
+
+
+class MedicalMatcher:
+    """
+    Automata over a catalogue's medication pieces and disease names, used to
+    compile user profiles.
+    """
+
+    def __init__(self, medications, diseases):
+        self.medications = AhoCorasick(piece for medication in medications for piece in medication_pieces(medication))
+        names = sorted({disease.lower() for disease in diseases if disease})
+        self.diseases = AhoCorasick(names)
+        # Names joined with a separator users cannot type, for finding the
+        # diseases a condition is a substring of with str.find
+        self.names = names
+        self.names_text = '\x00'.join(names)
+        self.name_starts = []
+        start = 0
+        for name in names:
+            self.name_starts.append(start)
+            start += len(name) + 1
+        self.compile = lru_cache(maxsize=PROFILE_CACHE_SIZE)(self._compile)
+
+    def _compile(self, allergies, medical_conditions):
+        allergy_hits = frozenset()
+        if allergies:
+            # An empty medication piece is a substring of any allergy text
+            allergy_hits = frozenset(self.medications.findall(allergies.lower()) | {''})
+
+        history_hits = set()
+        for condition in condition_list(medical_conditions or ''):
+            history_hits |= self.diseases.findall(condition)
+            if '\x00' in condition:
+                continue
+            start = self.names_text.find(condition)
+            while start != -1:
+                index = bisect_right(self.name_starts, start) - 1
+                history_hits.add(self.names[index])
+                following = index + 1
+                if following == len(self.names):
+                    break
+                start = self.names_text.find(condition, self.name_starts[following])
+        return MedicalProfile(allergy_hits, frozenset(history_hits))
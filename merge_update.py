@@ -1,187 +1,467 @@
+"""
+Merges the symptom table into the medical dataset.
+
+Every symptom row is joined to the first dataset row with the same disease
+(case and surrounding whitespace ignored) and its symptoms are added to that
+row; symptom rows for diseases the dataset does not have become new rows at
+the end. Allergy contraindications and child dosage notes are then filled in
+on every row.
+
+Both files are read in chunks, so neither has to fit in memory:
+
+  1. the dataset's disease keys are collected,
+  2. the symptom table is grouped into per-disease symptom lists, and rows
+     for unknown diseases are built and spooled to a temporary file,
+  3. the dataset is streamed through the symptom merge and column
+     transforms into the output, followed by the spooled new rows.
+
+Values are read and written as text, so numbers pass through as written.
+
+With --incremental, each disease's input rows are fingerprinted and only
+diseases whose rows changed since the last run are merged again. Their rows
+go to a delta file next to the output (see catalogue.py for the format)
+instead of a rewrite of the whole output; a full run folds the delta back in.
+
+    python merge_update.py [medical_data.csv] [symtoms_df.csv] [-o output.csv] [--incremental]
+"""
+import argparse
+import json
+import os
+import shutil
+import tempfile
+from bisect import bisect_left
+
 import pandas as pd
 
-# Load the existing datasets
-df1 = pd.read_csv("medical_data.csv", on_bad_lines='skip')
-df2 = pd.read_csv("symtoms_df.csv", on_bad_lines='skip')
+from catalogue import DELETED_COLUMN, delta_path
+
+# Allergies noted on every disease (expand this as needed)
+COMMON_ALLERGIES = ["penicillin", "sulfa", "aspirin", "NSAIDs"]
+# Default symptom probabilities for adults and children
+ADULT_PROBABILITY = 4
+CHILD_PROBABILITY = 3
+SYMPTOM_COLUMNS = [f'Symptom_{i}' for i in range(1, 5)]
+CHUNK_SIZE = 100000
+# Bump when the merge logic changes, so the next incremental run is a full one
+MERGE_VERSION = 1
+STATE_SUFFIX = '.state.json'
+_FINGERPRINT_PRIME = 1000003
+
+# Columns of a disease only found in the symptom table, besides its symptoms
+NEW_ROW_DEFAULTS = {
+    'Medicine': "",
+    'Dosage': "",
+    'Severity': "Unknown",
+    'Contraindications': "",
+    'Diet': "",
+    'Precautions': "",
+    'References': "",
+    'Age_Group': "All",
+    'Recommended_Exercises': "",
+    'Alternative_Therapies': "",
+    'Recovery_Time': "",
+    'Emergency_Signs': "",
+    'Diagnostic_Tests': "",
+    'Comorbidities_Risks': "",
+    'Seasonal_Variation': ""
+}
+NEW_ROW_COLUMNS = [
+    'Disease', 'Symptoms', 'Symptom_Keywords', 'Adult_Symptom_Probability', 'Child_Symptom_Probability',
+    *NEW_ROW_DEFAULTS
+]
+
+
+def read_chunks(path, chunksize=CHUNK_SIZE, only=None):
+    """
+    Reads a CSV as text in chunks, keeping only the rows of the disease keys
+    in only when it is given.
+    """
+    with pd.read_csv(path, on_bad_lines='skip', dtype=str, chunksize=chunksize) as reader:
+        for chunk in reader:
+            if only is not None:
+                chunk = chunk[disease_keys(chunk['Disease']).fillna('').isin(only)]
+            yield chunk
 
-# Remove the unnecessary index column from df2
-df2 = df2.drop(columns=['Unnamed: 0'], errors='ignore')
 
-# List of common allergies (expand this as needed)
-common_allergies = ["penicillin", "sulfa", "aspirin", "NSAIDs"]
+def disease_keys(diseases):
+    return diseases.str.strip().str.lower()
 
-# Function to add a symptom and its probability for adults and children
-def add_symptom(row, symptom, adult_prob, child_prob):
+
+def conform(frame, columns):
     """
-    Adds a symptom to the Symptoms column and updates probability columns.
+    Reindexes a chunk to the output columns; columns it lacks are all missing.
     """
-    # Clean the symptom by stripping leading/trailing whitespace and converting to lowercase
-    symptom = symptom.strip().lower()
+    missing = [column for column in columns if column not in frame.columns]
+    frame = frame.reindex(columns=columns)
+    if missing:
+        frame[missing] = frame[missing].astype(object)
+    return frame
 
-    if pd.isna(row['Symptoms']) or not row['Symptoms']:
-        row['Symptoms'] = symptom
-        row['Symptom_Keywords'] = symptom.replace('_', ' ') #Replace underscores for keyword consistency
-    else:
-        # Prevent duplicate symptoms from being added.
-        symptoms = [s.strip().lower() for s in str(row['Symptoms']).split(',')] #Split by comma and clean
-        keywords = [k.strip().lower() for k in str(row['Symptom_Keywords']).split(';')] if pd.notna(row['Symptom_Keywords']) else []
-
-        if symptom not in symptoms:  # Check if the symptom is already present.
-            row['Symptoms'] += f", {symptom}"
-            row['Symptom_Keywords'] += f"; {symptom.replace('_', ' ')}"
-
-    # Function to update probability columns
-    def update_probability(prob_str, symptom, probability):
-        """
-        Updates the probability string with the new symptom and probability.
-        """
-        if pd.isna(prob_str) or not prob_str:
-            return f"{symptom}:{probability}"
-        else:
-            existing_probs = dict(item.split(":") for item in prob_str.split(";") if item)
-            if symptom not in existing_probs:
-                return f"{prob_str};{symptom}:{probability}"
-            else:
-                # If symptom exists, return the original string
-                return prob_str
 
-    # Update adult and child probabilities
-    row['Adult_Symptom_Probability'] = update_probability(row['Adult_Symptom_Probability'], symptom, adult_prob)
-    row['Child_Symptom_Probability'] = update_probability(row['Child_Symptom_Probability'], symptom, child_prob)
-    return row
+def _join(columns, sep):
+    """
+    Joins the non-missing values across columns row by row, like sep.join()
+    over each row.
+    """
+    joined = pd.Series('', index=columns[0].index, dtype=object)
+    for column in columns:
+        joined = joined + (sep + column).fillna('')
+    return joined.str[len(sep):]
 
-# List to hold new rows to be appended to df1
-new_rows = []
 
-# Process df2 symptoms and add to df1
-for index, row in df2.iterrows():
-    disease = row['Disease'].strip() #Clean disease name
+def _append(text, sep, addition):
+    return (text + sep + addition).where(text != '', addition)
 
-    # Find the matching disease in df1
-    match = df1[df1['Disease'].str.strip().str.lower() == disease.lower()] #Case-insensitive comparison
 
-    if not match.empty:
-        df1_index = match.index[0]  # Get the index of the matching row
-        df1_row = df1.loc[df1_index]  #Access row by .loc
+def clean_symptoms(frame):
+    """
+    The symptom columns of a symptom table chunk, stripped and lowercased,
+    with missing or empty cells as NaN.
+    """
+    cleaned = {}
+    for column in SYMPTOM_COLUMNS:
+        values = frame[column]
+        cleaned[column] = values.str.strip().str.lower().where(values.notna() & (values != ''))
+    return pd.DataFrame(cleaned, index=frame.index)
 
-        # Add the symptoms to the matching disease in df1 with probabilities
 
-        for i in range(1, 5): #Iterate through the symptom columns
-            symptom_col = f'Symptom_{i}'
-            symptom = row[symptom_col] if pd.notna(row[symptom_col]) else None # Handle potential NaN values
-            if symptom:
-                # Assign probabilities based on your knowledge or assumptions
-                adult_prob = 4  # Example adult probability (adjust as needed)
-                child_prob = 3  # Example child probability (adjust as needed)
+def symptom_pairs(keys, symptoms):
+    """
+    The (disease key, symptom) pairs of a symptom table chunk in table order.
+    """
+    long = pd.concat([
+        pd.DataFrame({'row': range(len(keys)), 'column': i, 'key': keys.to_numpy(), 'symptom': symptoms[column].to_numpy()})
+        for i, column in enumerate(SYMPTOM_COLUMNS)
+    ])
+    long = long[long['symptom'].notna()].sort_values(['row', 'column'], kind='stable')
+    return zip(long['key'].tolist(), long['symptom'].tolist())
 
-                df1.loc[df1_index] = add_symptom(df1_row.copy(), symptom, adult_prob, child_prob) #Use .loc and make copy
-                df1_row = df1.loc[df1_index] #Update df1_row to prevent SettingWithCopyWarning
-    else:
-        # Disease not found in df1, create a new row
-        new_row = {'Disease': disease}
-
-        # Add symptoms from df2 to the new row
-        symptoms = []
-        keywords = []
-        adult_probs = []
-        child_probs = []
-
-        for i in range(1, 5):
-            symptom_col = f'Symptom_{i}'
-            symptom = row[symptom_col] if pd.notna(row[symptom_col]) else None
-            if symptom:
-                symptom = symptom.strip().lower()
-                symptoms.append(symptom)
-                keywords.append(symptom.replace('_', ' '))
-                adult_probs.append(f"{symptom}:4")  # Default probability 4 for adults
-                child_probs.append(f"{symptom}:3")  # Default probability 3 for children
-
-        new_row['Symptoms'] = ', '.join(symptoms)
-        new_row['Symptom_Keywords'] = '; '.join(keywords)
-        new_row['Adult_Symptom_Probability'] = '; '.join(adult_probs)
-        new_row['Child_Symptom_Probability'] = '; '.join(child_probs)
-
-        # Fill other columns with default/empty values.  Adjust as needed
-        new_row['Medicine'] = ""
-        new_row['Dosage'] = ""
-        new_row['Severity'] = "Unknown"
-        new_row['Contraindications'] = ""
-        new_row['Diet'] = ""
-        new_row['Precautions'] = ""
-        new_row['References'] = ""
-        new_row['Age_Group'] = "All"
-        new_row['Recommended_Exercises'] = ""
-        new_row['Alternative_Therapies'] = ""
-        new_row['Recovery_Time'] = ""
-        new_row['Emergency_Signs'] = ""
-        new_row['Diagnostic_Tests'] = ""
-        new_row['Comorbidities_Risks'] = ""
-        new_row['Seasonal_Variation'] = ""
-
-        # Add the new row to the list
-        new_rows.append(new_row)
-
-# Append new rows to df1
-df1 = pd.concat([df1, pd.DataFrame(new_rows)], ignore_index=True)
-
-# *** ALLERGY HANDLING (AFTER MERGING) ***
-
-def add_allergy_info(row):
+
+def new_rows(diseases, symptoms):
+    """
+    Dataset rows for symptom table rows whose disease the dataset lacks.
+    """
+    columns = [symptoms[column] for column in SYMPTOM_COLUMNS]
+    rows = pd.DataFrame({
+        'Disease': diseases,
+        'Symptoms': _join(columns, ', '),
+        'Symptom_Keywords': _join([column.str.replace('_', ' ', regex=False) for column in columns], '; '),
+        'Adult_Symptom_Probability': _join([column + f":{ADULT_PROBABILITY}" for column in columns], '; '),
+        'Child_Symptom_Probability': _join([column + f":{CHILD_PROBABILITY}" for column in columns], '; ')
+    })
+    for column, default in NEW_ROW_DEFAULTS.items():
+        rows[column] = default
+    return rows
+
+
+def _text(value):
+    return value if isinstance(value, str) else ''
+
+
+def _probability_keys(probabilities):
+    return {item.split(':')[0] for item in probabilities.split(';') if item}
+
+
+def _add_probability(probabilities, keys, symptom, probability):
+    if symptom in keys:
+        return probabilities
+    keys.add(symptom)
+    if not probabilities:
+        return f"{symptom}:{probability}"
+    return f"{probabilities};{symptom}:{probability}"
+
+
+def add_symptoms(symptoms, keywords, adult, child, new_symptoms):
+    """
+    A dataset row's Symptoms, Symptom_Keywords and probability strings after
+    adding new_symptoms in order. Symptoms it already lists are not added
+    again, and neither are probabilities for symptoms it already has one for.
+    """
+    symptoms, keywords, adult, child = _text(symptoms), _text(keywords), _text(adult), _text(child)
+    listed = {s.strip().lower() for s in symptoms.split(',')}
+    adult_keys = _probability_keys(adult)
+    child_keys = _probability_keys(child)
+    for symptom in new_symptoms:
+        keyword = symptom.replace('_', ' ')
+        if not symptoms:
+            symptoms = symptom
+            keywords = keyword
+            listed = {s.strip() for s in symptom.split(',')}
+        elif symptom not in listed:
+            symptoms += f", {symptom}"
+            keywords += f"; {keyword}"
+            listed.update(s.strip() for s in symptom.split(','))
+        adult = _add_probability(adult, adult_keys, symptom, ADULT_PROBABILITY)
+        child = _add_probability(child, child_keys, symptom, CHILD_PROBABILITY)
+    return symptoms, keywords, adult, child
+
+
+def add_allergy_info(frame):
     """
     Adds allergy-related information to the Contraindications and Precautions.
     """
-    contraindications = str(row['Contraindications']) if pd.notna(row['Contraindications']) else ""
-    precautions = str(row['Precautions']) if pd.notna(row['Precautions']) else ""
+    contraindications = frame['Contraindications'].fillna('')
+    precautions = frame['Precautions'].fillna('')
+    for allergy in COMMON_ALLERGIES:
+        # Checked against lowercased text, so "NSAIDs" is always added
+        mentioned = (
+            contraindications.str.lower().str.contains(allergy, regex=False)
+            | precautions.str.lower().str.contains(allergy, regex=False)
+        )
+        contraindications = contraindications.where(mentioned, _append(contraindications, ', ', f"Allergy to {allergy}"))
+        precautions = precautions.where(mentioned, _append(precautions, ', ', f"Avoid products containing {allergy}"))
+    frame['Contraindications'] = contraindications.str.strip(', ')
+    frame['Precautions'] = precautions.str.strip(', ')
+    return frame
+
+
+def adjust_dosage_and_alternatives(frame):
+    """
+    Adds child dosage notes to diseases not limited to adults, and a default
+    to missing alternative therapies.
+    """
+    adult_only = frame['Age_Group'].str.lower().eq("adult+")
+    has_medicine = frame['Medicine'].fillna('') != ''
+    dosage = frame['Dosage'].fillna('')
+    child_dosage = dosage.where(
+        ~(has_medicine & dosage.str.contains("Adults:", regex=False)),
+        dosage.str.replace("Adults:", "Children: Consult a doctor for appropriate dosage. Adults:", regex=False)
+    )
+    child_dosage = child_dosage.where(
+        ~(has_medicine & (dosage == '')), "Consult a doctor for appropriate dosage for children."
+    )
+    frame['Dosage'] = frame['Dosage'].where(adult_only, child_dosage)
+
+    alternatives = frame['Alternative_Therapies'].fillna('')
+    frame['Alternative_Therapies'] = alternatives.where(
+        alternatives != '', "Consult a healthcare professional for alternative therapies."
+    )
+    return frame
+
+
+def transform(frame):
+    return adjust_dosage_and_alternatives(add_allergy_info(frame))
+
+
+def merge(dataset_path, symptoms_path, output_path=None, chunksize=CHUNK_SIZE, only=None):
+    """
+    Merges the symptom table at symptoms_path into the dataset at
+    dataset_path and writes the result to output_path (the dataset itself by
+    default), limited to the disease keys in only if given. Returns the
+    number of dataset rows updated and added.
+    """
+    output_path = output_path or dataset_path
+
+    if only is None:
+        dataset_chunks = lambda: read_chunks(dataset_path, chunksize)
+    else:
+        # Only a few diseases' rows: read them once and keep them for both passes
+        kept = list(read_chunks(dataset_path, chunksize, only))
+        dataset_chunks = lambda: iter(kept)
+
+    # The first dataset row of each disease is the one symptoms are added to
+    first_rows = {}
+    columns = None
+    offset = 0
+    for chunk in dataset_chunks():
+        columns = list(chunk.columns)
+        for position, key in enumerate(disease_keys(chunk['Disease'])):
+            if not pd.isna(key):
+                first_rows.setdefault(key, offset + position)
+        offset += len(chunk)
+    output_columns = columns + [column for column in NEW_ROW_COLUMNS if column not in columns]
+
+    updates = {}
+    added = 0
+    spool = tempfile.TemporaryFile('w+', newline='', encoding='utf-8')
+    try:
+        for chunk in read_chunks(symptoms_path, chunksize, only):
+            diseases = chunk['Disease'].str.strip()
+            keys = diseases.str.lower()
+            symptoms = clean_symptoms(chunk)
+            known = keys.isin(first_rows.keys()).to_numpy()
+
+            # Per disease, its symptoms in first-seen order; repeats change nothing
+            for key, symptom in symptom_pairs(keys[known], symptoms[known]):
+                updates.setdefault(key, {})[symptom] = None
+
+            if not known.all():
+                rows = transform(conform(new_rows(diseases[~known], symptoms[~known]), output_columns))
+                rows.to_csv(spool, index=False, header=False)
+                added += len(rows)
+
+        if not added:
+            output_columns = columns
+        targets = {first_rows[key]: list(symptoms) for key, symptoms in updates.items()}
+        positions = sorted(targets)
+        merged = [output_columns.index(column) for column in
+                  ('Symptoms', 'Symptom_Keywords', 'Adult_Symptom_Probability', 'Child_Symptom_Probability')]
+
+        directory = os.path.dirname(os.path.abspath(output_path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.merge-', suffix='.csv')
+        try:
+            with os.fdopen(fd, 'w', newline='', encoding='utf-8') as out:
+                offset = 0
+                header = True
+                for chunk in dataset_chunks():
+                    chunk = conform(chunk, output_columns)
+                    end = offset + len(chunk)
+                    here = positions[bisect_left(positions, offset):bisect_left(positions, end)]
+                    if here:
+                        rows = [position - offset for position in here]
+                        current = chunk.iloc[rows, merged].to_numpy()
+                        chunk.iloc[rows, merged] = [
+                            add_symptoms(*values, targets[position]) for values, position in zip(current, here)
+                        ]
+                    transform(chunk).to_csv(out, index=False, header=header)
+                    header = False
+                    offset = end
+                if header:
+                    pd.DataFrame(columns=output_columns).to_csv(out, index=False)
+                spool.seek(0)
+                shutil.copyfileobj(spool, out)
+            os.replace(tmp_path, output_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+    finally:
+        spool.close()
+    return len(targets), added
+
+
+def fingerprints(path, chunksize=CHUNK_SIZE):
+    """
+    A fingerprint per disease key of its rows in the CSV at path, in order.
+    A disease's merged rows depend on nothing but its rows in both inputs.
+    """
+    prints = {}
+    for chunk in read_chunks(path, chunksize):
+        # Row numbers shift whenever rows are inserted; the merge ignores them
+        chunk = chunk.drop(columns=['Unnamed: 0'], errors='ignore')
+        hashes = pd.util.hash_pandas_object(chunk, index=False).tolist()
+        for key, row_hash in zip(disease_keys(chunk['Disease']).fillna('').tolist(), hashes):
+            prints[key] = (prints.get(key, 0) * _FINGERPRINT_PRIME + row_hash) % (1 << 64)
+    return prints
 
-    for allergy in common_allergies:
-        if allergy in contraindications.lower() or allergy in precautions.lower():
-            continue  # Skip if already mentioned
 
-        contraindications += f", Allergy to {allergy}" if contraindications else f"Allergy to {allergy}"
-        precautions += f", Avoid products containing {allergy}" if precautions else f"Avoid products containing {allergy}"
+def _signature(path):
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
 
-    row['Contraindications'] = contraindications.strip(', ')
-    row['Precautions'] = precautions.strip(', ')
-    return row
 
-# Iterate through each row in df1 and apply the function to allergy handling
-df1 = df1.apply(add_allergy_info, axis=1)
+def _write_atomic(path, write):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix='.merge-')
+    try:
+        with os.fdopen(fd, 'w', newline='', encoding='utf-8') as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
 
 
-def adjust_dosage_and_alternatives(row):
+def merge_incremental(dataset_path, symptoms_path, output_path, chunksize=CHUNK_SIZE):
     """
-    Adjusts dosage and alternatives based on age group.
+    Brings the merge at output_path up to date, merging again only the
+    diseases whose input rows changed since the last run. Their rows, and
+    markers for diseases no longer in either input, replace earlier entries
+    for the same diseases in the delta file next to output_path; the output
+    itself is not rewritten. Without usable state from an earlier run this
+    is a full merge, which also clears the delta. Returns the number of
+    diseases merged again and removed.
     """
-    age_group = row['Age_Group']
+    state_path = f"{output_path}{STATE_SUFFIX}"
+    delta = delta_path(output_path)
+    inputs = {'dataset': dataset_path, 'symptoms': symptoms_path}
+    columns = list(pd.read_csv(dataset_path, nrows=0).columns)
+
+    state = None
+    if os.path.exists(state_path) and os.path.exists(output_path):
+        with open(state_path) as f:
+            state = json.load(f)
+    if (state is None or state['version'] != MERGE_VERSION or state['columns'] != columns
+            or state['output'] != _signature(output_path)):
+        state = None
+
+    # An input whose size and mtime are unchanged keeps its fingerprints
+    current = {}
+    for name, path in inputs.items():
+        if state is not None and state['inputs'][name] == _signature(path):
+            current[name] = state['fingerprints'][name]
+        else:
+            current[name] = fingerprints(path, chunksize)
 
-    # Correctly handle NaN values in 'Age_Group'
-    if pd.isna(age_group) or not isinstance(age_group, str) or age_group.lower() == "all":
-        # If 'Age_Group' is NaN, treat it as "All Ages"
-        is_adult = False  # Assume not adult-only
+    if state is None:
+        merge(dataset_path, symptoms_path, output_path, chunksize)
+        if os.path.exists(delta):
+            os.unlink(delta)
+        changed, removed = current['dataset'].keys() | current['symptoms'].keys(), set()
     else:
-        is_adult = age_group.lower() == "adult+"
-
-    # Adjust dosages for children
-    if not is_adult:
-        medicine = str(row['Medicine']) if pd.notna(row['Medicine']) else ""
-        dosage = str(row['Dosage']) if pd.notna(row['Dosage']) else ""
-        if medicine and "Adults:" in dosage:
-            dosage = dosage.replace("Adults:", "Children: Consult a doctor for appropriate dosage. Adults:")
-        elif medicine and not dosage:
-            dosage = "Consult a doctor for appropriate dosage for children."
-        row['Dosage'] = dosage
-
-    # Add alternative therapies for all age groups
-    alt_therapies = str(row['Alternative_Therapies']) if pd.notna(row['Alternative_Therapies']) else ""
-    if not alt_therapies:
-        alt_therapies = "Consult a healthcare professional for alternative therapies."
-    row['Alternative_Therapies'] = alt_therapies
-    return row
-
-# Iterate through each row in df1 and apply the function to adjust dosage and alternatives
-df1 = df1.apply(adjust_dosage_and_alternatives, axis=1)
-
-# Save the updated DataFrame to the original CSV file
-df1.to_csv("medical_data.csv", index=False)
-
-print("medical_data.csv has been updated.")
\ No newline at end of file
+        changed, seen, known = set(), set(), set()
+        for name, prints in current.items():
+            previous = state['fingerprints'][name]
+            changed.update(key for key, value in prints.items() if previous.get(key) != value)
+            changed.update(previous.keys() - prints.keys())
+            seen.update(prints)
+            known.update(previous)
+        removed = known - seen
+        changed -= removed
+        if changed or removed:
+            fd, rows_path = tempfile.mkstemp(suffix='.csv')
+            os.close(fd)
+            try:
+                merge(dataset_path, symptoms_path, rows_path, chunksize, only=changed)
+                rows = pd.read_csv(rows_path, dtype=str)
+            finally:
+                os.unlink(rows_path)
+            if os.path.exists(delta):
+                earlier = pd.read_csv(delta, dtype=str)
+                earlier = earlier[~disease_keys(earlier['Disease']).fillna('').isin(changed | removed)]
+            else:
+                earlier = pd.DataFrame(columns=[DELETED_COLUMN])
+            markers = pd.DataFrame({'Disease': sorted(removed), DELETED_COLUMN: '1'})
+
+            header = list(pd.read_csv(output_path, nrows=0).columns)
+            delta_columns = header + [column for column in rows.columns if column not in header] + [DELETED_COLUMN]
+            combined = pd.concat([earlier, rows, markers]).reindex(columns=delta_columns)
+            _write_atomic(delta, lambda f: combined.to_csv(f, index=False))
+
+    state = {
+        'version': MERGE_VERSION,
+        'columns': columns,
+        'output': _signature(output_path),
+        'inputs': {name: _signature(path) for name, path in inputs.items()},
+        'fingerprints': current
+    }
+    _write_atomic(state_path, lambda f: f.write(json.dumps(state)))
+    return len(changed), len(removed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge the symptom table into the medical dataset")
+    parser.add_argument('dataset', nargs='?', default="medical_data.csv")
+    parser.add_argument('symptoms', nargs='?', default="symtoms_df.csv")
+    parser.add_argument('-o', '--output', help="defaults to updating the dataset in place")
+    parser.add_argument('--chunksize', type=int, default=CHUNK_SIZE, help="rows read at a time")
+    parser.add_argument('--incremental', action='store_true',
+                        help="only merge diseases changed since the last run, into the output's delta file")
+    args = parser.parse_args()
+
+    if args.incremental:
+        if not args.output or os.path.abspath(args.output) == os.path.abspath(args.dataset):
+            parser.error("--incremental needs an --output separate from the dataset")
+        changed, removed = merge_incremental(args.dataset, args.symptoms, args.output, args.chunksize)
+        print(f"{args.output} is up to date ({changed} diseases merged, {removed} removed).")
+        return
+
+    updated, added = merge(args.dataset, args.symptoms, args.output, args.chunksize)
+    output = args.output or args.dataset
+    # The full output supersedes an incremental run's delta and state
+    for stale in (delta_path(output), f"{output}{STATE_SUFFIX}"):
+        if os.path.exists(stale):
+            os.unlink(stale)
+    print(f"{output} has been updated ({updated} diseases updated, {added} rows added).")
+
+
+if __name__ == '__main__':
+    main()
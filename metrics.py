@@ -0,0 +1,190 @@
+"""
+Request instrumentation: latency histograms in Prometheus text format and an
+opt-in sampling profiler for slow requests.
+
+Metrics.stage(name) times one stage of a request into a histogram; when
+metrics are disabled it returns a shared no-op context manager, so the
+instrumented code costs one method call per stage.
+
+SlowRequestProfiler samples the stacks of threads serving requests from a
+background thread and, for requests slower than a threshold, writes their
+samples as folded stacks ("frame;frame;frame count" lines), the input of
+flamegraph.pl, speedscope and similar tools.
+"""
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextlib import nullcontext
+
+# Upper bounds in seconds: 50 us to 10 s, roughly 2.5x apart
+DEFAULT_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                   0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+_DISABLED = nullcontext()
+
+
+class Histogram:
+    """
+    Cumulative-on-render bucket counts plus sum and count of observations.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def snapshot(self):
+        with self._lock:
+            return list(self.counts), self.sum
+
+
+class _StageTimer:
+    __slots__ = ('histogram', 'start')
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start)
+        return False
+
+
+class Metrics:
+    """
+    Named histogram families, each with one histogram per label set.
+    """
+
+    def __init__(self, enabled=True, buckets=DEFAULT_BUCKETS):
+        self.enabled = enabled
+        self.buckets = buckets
+        self._families = {}
+        self._stages = {}
+        self._lock = threading.Lock()
+
+    def describe(self, name, help_text):
+        with self._lock:
+            self._families.setdefault(name, (help_text, {}))
+
+    def histogram(self, name, **labels):
+        key = tuple(sorted(labels.items()))
+        help_text, histograms = self._families.get(name) or (None, None)
+        histogram = histograms.get(key) if histograms is not None else None
+        if histogram is None:
+            with self._lock:
+                help_text, histograms = self._families.setdefault(name, (name, {}))
+                histogram = histograms.setdefault(key, Histogram(self.buckets))
+        return histogram
+
+    def observe(self, name, seconds, **labels):
+        if self.enabled:
+            self.histogram(name, **labels).observe(seconds)
+
+    def stage(self, stage, name='predict_stage_seconds'):
+        """
+        A context manager timing the block into name{stage=...}.
+        """
+        if not self.enabled:
+            return _DISABLED
+        histogram = self._stages.get((name, stage))
+        if histogram is None:
+            histogram = self._stages[name, stage] = self.histogram(name, stage=stage)
+        return _StageTimer(histogram)
+
+    def render(self, extra=()):
+        """
+        Every histogram in Prometheus text exposition format, followed by
+        extra (name, type, help, value) samples.
+        """
+        lines = []
+        with self._lock:
+            families = [(name, help_text, list(histograms.items()))
+                        for name, (help_text, histograms) in sorted(self._families.items())]
+        for name, help_text, histograms in families:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for key, histogram in sorted(histograms):
+                counts, total = histogram.snapshot()
+                labels = ''.join(f'{label}="{_escape(value)}",' for label, value in key)
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{{labels}le="{bound:g}"}} {cumulative}')
+                cumulative += counts[-1]
+                lines.append(f'{name}_bucket{{{labels}le="+Inf"}} {cumulative}')
+                selector = f"{{{labels.rstrip(',')}}}" if labels else ''
+                lines.append(f"{name}_sum{selector} {total!r}")
+                lines.append(f"{name}_count{selector} {cumulative}")
+        for name, kind, help_text, value in extra:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.append(f"{name} {value}")
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class SlowRequestProfiler:
+    """
+    Samples the stacks of threads between begin() and end() every interval
+    seconds; end() writes the samples of requests that took at least
+    threshold seconds to a .folded file in directory.
+    """
+
+    def __init__(self, threshold, directory, interval=0.005):
+        self.threshold = threshold
+        self.directory = directory
+        self.interval = interval
+        self._active = {}
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        threading.Thread(target=self._sample, name='slow-request-profiler', daemon=True).start()
+
+    def begin(self):
+        with self._lock:
+            self._active[threading.get_ident()] = Counter()
+
+    def end(self, label, seconds):
+        with self._lock:
+            samples = self._active.pop(threading.get_ident(), None)
+        if samples and seconds >= self.threshold:
+            name = f"{time.strftime('%Y%m%d-%H%M%S')}-{label}-{int(seconds * 1000)}ms-{threading.get_ident()}.folded"
+            path = os.path.join(self.directory, name.replace('/', '_'))
+            with open(path, 'w') as f:
+                for stack, count in samples.most_common():
+                    f.write(f"{stack} {count}\n")
+            return path
+        return None
+
+    def _sample(self):
+        while True:
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            with self._lock:
+                for ident, samples in self._active.items():
+                    frame = frames.get(ident)
+                    if frame is not None:
+                        samples[_fold(frame)] += 1
+
+
+def _fold(frame):
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+        frame = frame.f_back
+    return ';'.join(reversed(stack))
@@ -0,0 +1,80 @@
+"""
+Password hashing on a bounded pool of threads.
+
+Hashing is deliberately expensive: werkzeug's default scrypt takes tens of
+milliseconds and 32 MiB per hash. Run inline, a login storm has every
+request thread hashing at once, competing with predictions for CPU and
+memory. PasswordHasher runs hashes on `workers` threads (hashlib releases the
+GIL while it hashes) and turns callers away with HasherBusy once
+`max_pending` hashes are queued or running, so the rest of the server stays
+responsive and clients get a quick 503 instead of a timeout.
+
+The method string is werkzeug's, e.g. 'scrypt:32768:8:1' or
+'pbkdf2:sha256:600000'. Hashes made with other parameters still verify, and
+needs_rehash() tells callers when to store a fresh one.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+class HasherBusy(Exception):
+    pass
+
+
+def _normalized_method(method, salt_length):
+    return generate_password_hash('', method, salt_length).split('$', 1)[0]
+
+
+class PasswordHasher:
+    """
+    Hashes and verifies passwords on its worker threads. hash() and verify()
+    block their caller until done, or raise HasherBusy when the pool is full.
+    """
+
+    def __init__(self, method='scrypt', salt_length=16, workers=2, max_pending=64):
+        self.salt_length = salt_length
+        self.workers = workers
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+        self._slots = threading.BoundedSemaphore(max_pending)
+        # Normalized to the prefix werkzeug writes, defaults filled in. That
+        # takes a full hash, so it runs on a worker rather than in the caller
+        self._method = self._executor.submit(_normalized_method, method, salt_length)
+
+    @property
+    def method(self):
+        return self._method.result()
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method, self.salt_length)
+
+    def verify(self, pwhash, password):
+        return self._run(check_password_hash, pwhash, password)
+
+    def hash_many(self, passwords):
+        """
+        Hashes of passwords, in order, spread over the workers. Waits for
+        free slots rather than raising HasherBusy; meant for bulk imports.
+        """
+        futures = []
+        for password in passwords:
+            self._slots.acquire()
+            future = self._executor.submit(generate_password_hash, password, self.method, self.salt_length)
+            future.add_done_callback(lambda _: self._slots.release())
+            futures.append(future)
+        return [future.result() for future in futures]
+
+    def needs_rehash(self, pwhash):
+        return pwhash.split('$', 1)[0] != self.method
+
+    def _run(self, function, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HasherBusy()
+        try:
+            future = self._executor.submit(function, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future.result()
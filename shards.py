@@ -0,0 +1,140 @@
+"""
+Sharded scoring in a pool of worker processes.
+
+Ranking one query runs on one core whatever the thread count, because it
+holds the GIL. A ShardPool splits the catalogue's rows into contiguous
+ranges, ranks each range in a worker process and merges the per-range top-k
+lists. Every row is in exactly one range, so the merged ranking equals
+ranking the whole catalogue in process.
+
+Workers are forked when the pool is created, which must happen before the
+server starts threads. They inherit the parent's catalogue, whose arrays
+are a shared mapping of the compiled artifact. After a reload, or when the
+pool was started before the catalogue was loaded, each worker loads the
+catalogue itself the first time a request carries its version (or when
+warm() asks it to).
+"""
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from catalogue import Catalogue, merge_top_k
+
+logger = logging.getLogger(__name__)
+
+# Ranges smaller than this cost more to send to a worker than to rank here
+MIN_SHARD_ROWS = 20000
+
+# Worker-side state: the catalogues being ranked, by version, and where to
+# reload from. A reload warms workers before the parent swaps snapshots, so
+# each keeps the one it replaces for the requests still ranking against it
+_catalogues = {}
+_paths = None
+KEPT_VERSIONS = 2
+
+
+class StaleShard(Exception):
+    pass
+
+
+def _init_worker(source_path, artifact_path):
+    global _paths
+    _paths = (source_path, artifact_path)
+
+
+def _ping():
+    return True
+
+
+def _load(version):
+    catalogue = _catalogues.get(version)
+    if catalogue is None:
+        catalogue = Catalogue.load(*_paths)
+        _catalogues[catalogue.version] = catalogue
+        while len(_catalogues) > KEPT_VERSIONS:
+            del _catalogues[next(iter(_catalogues))]
+        if catalogue.version != version:
+            raise StaleShard(f"worker loaded catalogue {catalogue.version}, expected {version}")
+    return catalogue
+
+
+def _warm(version):
+    _load(version)
+    return os.getpid()
+
+
+def _rank(version, method, args, rows):
+    return getattr(_load(version), method)(*args, rows=rows)
+
+
+class ShardPool:
+    """
+    Ranks queries against row ranges of a catalogue in `shards` processes.
+    catalogue may be None when it is not loaded yet.
+    """
+
+    def __init__(self, catalogue, shards, source_path, artifact_path=None):
+        self.shards = shards
+        # Forked workers start out with the current catalogue. The executor
+        # forks all of them on the first submit, so they are started here
+        if catalogue is not None:
+            _catalogues[catalogue.version] = catalogue
+        try:
+            self.executor = ProcessPoolExecutor(
+                max_workers=shards, mp_context=multiprocessing.get_context('fork'),
+                initializer=_init_worker, initargs=(source_path, artifact_path)
+            )
+            for future in [self.executor.submit(_ping) for _ in range(shards)]:
+                future.result()
+        finally:
+            _catalogues.clear()
+
+    def warm(self, catalogue):
+        """
+        Has the workers load catalogue now rather than on their first query.
+        Each load keeps its worker busy, so the tasks spread over the pool.
+        """
+        if len(self.ranges(catalogue)) == 1:
+            return
+        futures = [self.executor.submit(_warm, catalogue.version) for _ in range(self.shards)]
+        pids = {future.result() for future in futures}
+        logger.info(f"{len(pids)} of {self.shards} shard processes loaded catalogue {catalogue.version}")
+
+    def ranges(self, catalogue):
+        """
+        The (start, stop) row ranges to rank separately; one range when the
+        catalogue is too small for sharding to pay off.
+        """
+        n_rows = catalogue.matrix.shape[0]
+        count = max(1, min(self.shards, n_rows // MIN_SHARD_ROWS))
+        bounds = np.linspace(0, n_rows, count + 1).astype(np.int64).tolist()
+        return list(zip(bounds[:-1], bounds[1:]))
+
+    def rank(self, catalogue, method, symptom_ids, k, weights=None):
+        """
+        catalogue.<method>(symptom_ids, k, weights) for rank_index or
+        rank_sparse, computed one row range per worker.
+        """
+        parts = self._map(catalogue, method, (symptom_ids, k, weights))
+        return merge_top_k(parts, k)
+
+    def rank_batch(self, catalogue, symptom_id_sets, k, weights=None):
+        """
+        catalogue.rank_batch(symptom_id_sets, k, weights), computed one row
+        range per worker.
+        """
+        parts = self._map(catalogue, 'rank_batch', (symptom_id_sets, k, weights))
+        return [merge_top_k(ranked, k) for ranked in zip(*parts)]
+
+    def _map(self, catalogue, method, args):
+        ranges = self.ranges(catalogue)
+        if len(ranges) == 1:
+            return [getattr(catalogue, method)(*args)]
+        futures = [self.executor.submit(_rank, catalogue.version, method, args, rows) for rows in ranges]
+        return [future.result() for future in futures]
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,429 @@
+// Toggle sidebar
+function toggleSidebar() {
+    const sidebar = document.getElementById('sidebar');
+    const mainContent = document.getElementById('main-content');
+    const toggleButton = document.querySelector('.toggle-sidebar');
+
+    sidebar.classList.toggle('open');
+    mainContent.classList.toggle('sidebar-open');
+    toggleButton.classList.toggle('sidebar-open');
+}
+
+// Toggle dark mode
+function toggleDarkMode() {
+    document.body.classList.toggle('dark-mode');
+    localStorage.setItem('darkMode', document.body.classList.contains('dark-mode'));
+    updateChartColors();
+}
+
+// Check for saved dark mode preference
+if (localStorage.getItem('darkMode') === 'true') {
+    document.body.classList.add('dark-mode');
+}
+
+// Update chart colors when mode changes
+function updateChartColors() {
+    if (window.predictionChart) {
+        const isDark = document.body.classList.contains('dark-mode');
+        window.predictionChart.options.plugins.legend.labels.color = isDark ? '#f8f9fa' : '#333';
+        window.predictionChart.update();
+    }
+}
+
+// Show selected section and highlight active link
+function showSection(sectionId) {
+    const sections = document.querySelectorAll('.section');
+    sections.forEach(section => {
+        section.classList.remove('active');
+    });
+    document.getElementById(sectionId).classList.add('active');
+
+    const links = document.querySelectorAll('.sidebar ul li a');
+    links.forEach(link => {
+        link.classList.remove('active');
+        if (link.getAttribute('href') === `#${sectionId}`) {
+            link.classList.add('active');
+        }
+    });
+
+    const toggleButton = document.querySelector('.toggle-sidebar');
+    const sidebar = document.getElementById('sidebar');
+    if (sidebar.classList.contains('open')) {
+        toggleButton.style.left = 'calc(var(--sidebar-width) + 20px)';
+    } else {
+        toggleButton.style.left = '20px';
+    }
+}
+
+// Star Rating
+let currentRating = 0;
+const stars = document.querySelectorAll('.star-rating .star');
+
+function rate(rating) {
+    currentRating = rating;
+    stars.forEach((star, index) => {
+        if (index < rating) {
+            star.style.color = '#ffc107';
+            star.classList.add('active');
+        } else {
+            star.style.color = '#ccc';
+            star.classList.remove('active');
+        }
+    });
+}
+
+// Submit Feedback
+document.getElementById('feedbackForm').addEventListener('submit', function (e) {
+    e.preventDefault();
+    const feedbackMessage = document.getElementById('feedbackMessage').value;
+    alert(`Thank you for your feedback!\nRating: ${currentRating}\nMessage: ${feedbackMessage}`);
+});
+
+// Handle symptom form submission
+document.getElementById('symptomForm').addEventListener('submit', async function (e) {
+    e.preventDefault();
+    const form = this;
+    const symptomsInput = form.querySelector('input[name="symptoms"]');
+    const submitBtn = form.querySelector('button[type="submit"]');
+    const loadingSpinner = document.getElementById('loadingSpinner');
+    const resultSection = document.getElementById('predictionResult');
+
+    // Clear previous results and errors
+    resultSection.style.display = 'none';
+    document.getElementById('symptomSuggestions').replaceChildren();
+    document.getElementById('medicalHistoryAlert').style.display = 'none';
+
+    // Validate input
+    const symptoms = symptomsInput.value.trim();
+    if (!symptoms) {
+        showFlashMessage('Please enter symptoms', 'warning');
+        symptomsInput.focus();
+        return;
+    }
+
+    // Disable button and show loading
+    submitBtn.disabled = true;
+    loadingSpinner.style.display = 'block';
+
+    try {
+        const response = await fetch(form.action, {
+            method: 'POST',
+            body: new FormData(form),
+            headers: {
+                'X-CSRFToken': document.querySelector('input[name="csrf_token"]').value
+            }
+        });
+
+        const data = await response.json();
+
+        if (data.status === "error") {
+            showFlashMessage(data.message, 'danger');
+            return;
+        }
+
+        if (data.status === "info") {
+            showFlashMessage(data.message, 'info');
+            return;
+        }
+
+        // Populate results
+        populateResults(data.data);
+
+    } catch (error) {
+        console.error("Error:", error);
+        showFlashMessage("Our system is busy. Please try again in a moment.", 'warning');
+    } finally {
+        submitBtn.disabled = false;
+        loadingSpinner.style.display = 'none';
+    }
+});
+
+function populateResults(data) {
+    if (!data) return;
+
+    // Set basic information with probability
+    document.getElementById('disease').textContent = `${data.disease} (${data.probability}% match)`;
+    document.getElementById('description').textContent = data.description;
+    document.getElementById('medicine').textContent = data.medicine;
+    document.getElementById('dosage').textContent = data.dosage;
+    document.getElementById('precautions').textContent = data.precautions;
+
+    // Show how each entered symptom was read when it was not taken verbatim
+    const matchedDiv = document.getElementById('matchedSymptoms');
+    const matchedList = document.getElementById('matchedSymptomsList');
+    matchedList.innerHTML = '';
+    const reinterpreted = (data.matched_symptoms || []).filter(item => item.symptom !== item.input);
+    if (reinterpreted.length > 0) {
+        const ul = document.createElement('ul');
+        reinterpreted.forEach(item => {
+            const li = document.createElement('li');
+            li.textContent = item.symptom
+                ? `${item.input} → ${item.symptom}`
+                : `${item.input} (not recognised, ignored)`;
+            ul.appendChild(li);
+        });
+        matchedList.appendChild(ul);
+        matchedDiv.style.display = 'block';
+    } else {
+        matchedDiv.style.display = 'none';
+    }
+
+    // Handle workout recommendations
+    const workoutList = document.getElementById('workoutList');
+    workoutList.innerHTML = '';
+    if (data.workout && data.workout.length > 0) {
+        const ul = document.createElement('ul');
+        data.workout.forEach(item => {
+            const li = document.createElement('li');
+            li.textContent = item;
+            ul.appendChild(li);
+        });
+        workoutList.appendChild(ul);
+    } else {
+        workoutList.textContent = 'General physical activity recommended';
+    }
+
+    // Handle recommendations
+    const recommendationsDiv = document.getElementById('recommendations');
+    const recommendationsList = document.getElementById('recommendationsList');
+    recommendationsList.innerHTML = '';
+
+    if (data.recommendations && data.recommendations.length > 0) {
+        data.recommendations.forEach(rec => {
+            const p = document.createElement('p');
+            p.className = 'recommendation-item';
+            p.innerHTML = rec;
+            recommendationsList.appendChild(p);
+        });
+        recommendationsDiv.style.display = 'block';
+    } else {
+        recommendationsDiv.style.display = 'none';
+    }
+
+    // Handle differential diagnoses (the first entry is the main result)
+    const differentialDiv = document.getElementById('differential');
+    const differentialList = document.getElementById('differentialList');
+    differentialList.innerHTML = '';
+    const others = (data.differential || []).slice(1);
+    if (others.length > 0) {
+        const ul = document.createElement('ul');
+        others.forEach(item => {
+            const li = document.createElement('li');
+            li.textContent = `${item.disease} (${item.probability}% match)`;
+            ul.appendChild(li);
+        });
+        differentialList.appendChild(ul);
+        differentialDiv.style.display = 'block';
+    } else {
+        differentialDiv.style.display = 'none';
+    }
+
+    // Show medical history alert if needed
+    if (data.medical_history_match) {
+        document.getElementById('medicalHistoryAlert').style.display = 'block';
+    }
+
+    // Show the prediction result section
+    document.getElementById('predictionResult').style.display = 'block';
+
+    // Render chart
+    renderChart(data.probability, data.severity);
+}
+
+function renderChart(probability, severity) {
+    const ctx = document.getElementById('predictionChart').getContext('2d');
+
+    if (window.predictionChart) {
+        window.predictionChart.destroy();
+    }
+
+    const isDark = document.body.classList.contains('dark-mode');
+    const textColor = isDark ? '#f8f9fa' : '#333';
+
+    window.predictionChart = new Chart(ctx, {
+        type: 'doughnut',
+        data: {
+            labels: [`Match Probability (${probability}%)`, `Severity (${severity}/10)`],
+            datasets: [{
+                data: [probability, severity],
+                backgroundColor: [
+                    'rgba(75, 192, 192, 0.7)',
+                    'rgba(255, 99, 132, 0.7)'
+                ],
+                borderColor: [
+                    'rgba(75, 192, 192, 1)',
+                    'rgba(255, 99, 132, 1)'
+                ],
+                borderWidth: 2
+            }]
+        },
+        options: {
+            responsive: true,
+            maintainAspectRatio: false,
+            cutout: '70%',
+            plugins: {
+                legend: {
+                    position: 'bottom',
+                    labels: {
+                        color: textColor,
+                        font: {
+                            size: 14,
+                            weight: 'bold'
+                        }
+                    }
+                },
+                tooltip: {
+                    callbacks: {
+                        label: function(context) {
+                            return `${context.label}: ${context.raw}`;
+                        }
+                    },
+                    bodyFont: {
+                        size: 14
+                    }
+                }
+            }
+        }
+    });
+}
+
+// Suggest catalogue symptoms for the one being typed (after the last comma)
+(function () {
+    const input = document.querySelector('#symptomForm input[name="symptoms"]');
+    const list = document.getElementById('symptomSuggestions');
+    let timer = null;
+    let latest = 0;
+
+    function clearSuggestions() {
+        list.replaceChildren();
+    }
+
+    function choose(symptom) {
+        const parts = input.value.split(',');
+        parts[parts.length - 1] = (parts.length > 1 ? ' ' : '') + symptom;
+        input.value = parts.join(',') + ', ';
+        clearSuggestions();
+        input.focus();
+    }
+
+    async function suggest() {
+        const query = input.value.split(',').pop().trim();
+        const request = ++latest;
+        if (!query) {
+            clearSuggestions();
+            return;
+        }
+        try {
+            const response = await fetch(`${input.dataset.suggestUrl}?q=${encodeURIComponent(query)}`);
+            const data = await response.json();
+            if (request !== latest) return;
+            clearSuggestions();
+            data.suggestions.forEach(symptom => {
+                const item = document.createElement('button');
+                item.type = 'button';
+                item.className = 'list-group-item list-group-item-action';
+                item.textContent = symptom;
+                item.addEventListener('mousedown', e => {
+                    e.preventDefault();
+                    choose(symptom);
+                });
+                list.appendChild(item);
+            });
+        } catch (error) {
+            clearSuggestions();
+        }
+    }
+
+    input.addEventListener('input', () => {
+        clearTimeout(timer);
+        timer = setTimeout(suggest, 100);
+    });
+    input.addEventListener('blur', clearSuggestions);
+    input.addEventListener('keydown', e => {
+        if (e.key === 'Escape') clearSuggestions();
+    });
+})();
+
+function showFlashMessage(message, category) {
+    const flashContainer = document.querySelector('.flash-messages');
+    const flashMsg = document.createElement('div');
+    flashMsg.className = `flash-message alert alert-${category} animate__animated animate__fadeIn`;
+    flashMsg.textContent = message;
+    flashContainer.appendChild(flashMsg);
+
+    // Auto-remove after 5 seconds
+    setTimeout(() => {
+        flashMsg.classList.add('animate__fadeOut');
+        setTimeout(() => flashMsg.remove(), 500);
+    }, 5000);
+}
+
+// Handle profile form submission
+document.getElementById('profileForm').addEventListener('submit', async function(e) {
+    e.preventDefault();
+    const form = this;
+    const submitBtn = form.querySelector('button[type="submit"]');
+
+    try {
+        submitBtn.disabled = true;
+        submitBtn.innerHTML = '<span class="spinner-border spinner-border-sm" role="status" aria-hidden="true"></span> Saving...';
+
+        const response = await fetch(form.action, {
+            method: 'POST',
+            body: new FormData(form),
+            headers: {
+                'X-CSRFToken': document.querySelector('input[name="csrf_token"]').value
+            }
+        });
+
+        const data = await response.json();
+
+        if (data.status === "success") {
+            showFlashMessage(data.message, 'success');
+            // Reload the page to reflect changes
+            setTimeout(() => location.reload(), 1000);
+        } else {
+            showFlashMessage(data.message || 'Update failed', 'danger');
+        }
+    } catch (error) {
+        showFlashMessage('Network error. Please try again.', 'danger');
+    } finally {
+        submitBtn.disabled = false;
+        submitBtn.textContent = 'Save Changes';
+    }
+});
+
+// Handle medical info form submission
+document.getElementById('medicalForm').addEventListener('submit', async function(e) {
+    e.preventDefault();
+    const form = this;
+    const submitBtn = form.querySelector('button[type="submit"]');
+
+    try {
+        submitBtn.disabled = true;
+        submitBtn.innerHTML = '<span class="spinner-border spinner-border-sm" role="status" aria-hidden="true"></span> Saving...';
+
+        const response = await fetch(form.action, {
+            method: 'POST',
+            body: new FormData(form),
+            headers: {
+                'X-CSRFToken': document.querySelector('input[name="csrf_token"]').value
+            }
+        });
+
+        const data = await response.json();
+
+        if (data.status === "success") {
+            showFlashMessage(data.message, 'success');
+            // Reload the page to reflect changes
+            setTimeout(() => location.reload(), 1000);
+        } else {
+            showFlashMessage(data.message || 'Update failed', 'danger');
+        }
+    } catch (error) {
+        showFlashMessage('Network error. Please try again.', 'danger');
+    } finally {
+        submitBtn.disabled = false;
+        submitBtn.textContent = 'Save Changes';
+    }
+});
@@ -0,0 +1,117 @@
+// Handle form submissions with loading spinners
+function setupForm(formId, endpoint) {
+    const form = document.getElementById(formId);
+    const submitBtn = form.querySelector('button[type="submit"]');
+    const submitText = submitBtn.querySelector('.submit-text');
+    const spinner = submitBtn.querySelector('.loading-spinner');
+
+    form.addEventListener('submit', async function(e) {
+        e.preventDefault();
+
+        // Clear previous errors
+        document.querySelectorAll('.error-message').forEach(el => el.textContent = '');
+
+        // Show loading state
+        submitText.style.display = 'none';
+        spinner.style.display = 'inline-block';
+        submitBtn.disabled = true;
+
+        try {
+            const formData = new FormData(form);
+            const response = await fetch(endpoint, {
+                method: 'POST',
+                body: formData,
+                headers: {
+                    'X-CSRFToken': document.querySelector('input[name="csrf_token"]').value
+                }
+            });
+
+            const result = await response.json();
+
+            if (result.status === "error") {
+                // Display field-specific errors
+                if (result.errors) {
+                    for (const [field, message] of Object.entries(result.errors)) {
+                        const errorElement = document.getElementById(`${formId}${field.charAt(0).toUpperCase() + field.slice(1)}Error`);
+                        if (errorElement) {
+                            errorElement.textContent = message;
+                        }
+                    }
+                } else {
+                    // Display general error message
+                    const flashContainer = document.getElementById('flashMessages');
+                    if (flashContainer) {
+                        flashContainer.innerHTML = `
+                            <div class="alert alert-danger alert-dismissible fade show">
+                                ${result.message}
+                                <button type="button" class="btn-close" data-bs-dismiss="alert" aria-label="Close"></button>
+                            </div>
+                        `;
+                    }
+                }
+                return;
+            }
+
+            if (result.redirect) {
+                window.location.href = result.redirect;
+                return;
+            }
+
+            if (result.message) {
+                const flashContainer = document.getElementById('flashMessages');
+                if (flashContainer) {
+                    flashContainer.innerHTML = `
+                        <div class="alert alert-success alert-dismissible fade show">
+                            ${result.message}
+                            <button type="button" class="btn-close" data-bs-dismiss="alert" aria-label="Close"></button>
+                        </div>
+                    `;
+                }
+
+                if (formId === 'registerForm') {
+                    // Switch to login tab after successful registration
+                    const loginTab = new bootstrap.Tab(document.getElementById('login-tab'));
+                    loginTab.show();
+                }
+
+                if (formId === 'forgotPasswordForm') {
+                    // Close the modal
+                    const modal = bootstrap.Modal.getInstance(document.getElementById('forgotPasswordModal'));
+                    modal.hide();
+                }
+            }
+        } catch (error) {
+            console.error('Error:', error);
+            const flashContainer = document.getElementById('flashMessages');
+            if (flashContainer) {
+                flashContainer.innerHTML = `
+                    <div class="alert alert-danger alert-dismissible fade show">
+                        An error occurred. Please try again.
+                        <button type="button" class="btn-close" data-bs-dismiss="alert" aria-label="Close"></button>
+                    </div>
+                `;
+            }
+        } finally {
+            // Reset button state
+            submitText.style.display = 'inline';
+            spinner.style.display = 'none';
+            submitBtn.disabled = false;
+        }
+    });
+}
+
+// Setup all forms
+setupForm('loginForm', '/login');
+setupForm('registerForm', '/register');
+setupForm('forgotPasswordForm', '/forgot_password');
+
+// Auto-dismiss alerts after 5 seconds
+document.addEventListener('DOMContentLoaded', function() {
+    const alerts = document.querySelectorAll('.alert');
+    alerts.forEach(alert => {
+        setTimeout(() => {
+            const bsAlert = new bootstrap.Alert(alert);
+            bsAlert.close();
+        }, 5000);
+    });
+});
@@ -0,0 +1,304 @@
+"""
+Symptom normalization: mapping what users type onto catalogue symptom ids.
+
+Catalogue symptoms only matched when equal after strip().lower(), so
+"skin_rash", "Skin rashes" or "fevr" all missed "skin rash" and "fever".
+A SymptomNormalizer built once per catalogue resolves, in order:
+
+  1. the exact symptom name,
+  2. its canonical form (case, underscores/hyphens/spacing and plurals
+     folded) or that of a known synonym, from one precomputed table,
+  3. the closest canonical catalogue name within one edit, found through a
+     trigram index so only a handful of candidates are compared. Synonyms
+     are never fuzzy-matched, and one edit is the budget: two turn "heart
+     pain" into "head pain" or "cheek" into "chest".
+
+A SymptomSuggester completes partly typed symptoms from a sorted array of
+every word-start suffix of the names, most common symptoms first.
+"""
+import re
+from bisect import bisect_left
+from functools import lru_cache
+
+import numpy as np
+
+# Resolved inputs kept per catalogue, keyed on the raw symptom text
+RESOLVE_CACHE_SIZE = 65536
+# Below this length a one-letter edit changes the meaning too often
+MIN_FUZZY_LENGTH = 4
+# Edits a typo may be away from the catalogue name it resolves to
+MAX_FUZZY_EDITS = 1
+# Candidates compared by edit distance, best trigram overlap first
+MAX_FUZZY_CANDIDATES = 16
+# Completed prefixes kept per catalogue, keyed on (raw prefix, limit)
+SUGGEST_CACHE_SIZE = 16384
+
+# Common lay terms and spellings, mapped to names used in the dataset. Entries
+# whose target the catalogue does not have are ignored.
+SYNONYMS = {
+    'high temperature': 'fever',
+    'temperature': 'fever',
+    'pyrexia': 'fever',
+    'high fever': 'fever',
+    'mild fever': 'fever',
+    'throwing up': 'vomiting',
+    'puking': 'vomiting',
+    'being sick': 'vomiting',
+    'tiredness': 'fatigue',
+    'tired': 'fatigue',
+    'exhaustion': 'fatigue',
+    'lethargy': 'fatigue',
+    'head ache': 'headache',
+    'head pain': 'headache',
+    'stomach ache': 'stomach pain',
+    'stomachache': 'stomach pain',
+    'belly ache': 'abdominal pain',
+    'belly pain': 'abdominal pain',
+    'tummy ache': 'abdominal pain',
+    'breathlessness': 'shortness of breath',
+    'short of breath': 'shortness of breath',
+    'difficulty breathing': 'shortness of breath',
+    'itchiness': 'itching',
+    'itchy skin': 'itching',
+    'rash': 'skin rash',
+    'diarrhoea': 'diarrhea',
+    'loose stools': 'diarrhea',
+    'muscle pain': 'myalgia',
+    'muscle ache': 'myalgia',
+    'sore muscles': 'myalgia',
+    'aching joints': 'joint pain',
+    'arthralgia': 'joint pain',
+    'blocked nose': 'nasal congestion',
+    'stuffy nose': 'nasal congestion',
+    'congestion': 'nasal congestion',
+    'continuous sneezing': 'sneezing',
+    'throat pain': 'sore throat',
+    'dizzy': 'dizziness',
+    'lightheadedness': 'dizziness',
+    'vertigo': 'spinning sensation',
+    'sensitivity to light': 'photophobia',
+    'light sensitivity': 'photophobia',
+    'heart burn': 'heartburn',
+    'acid reflux': 'heartburn',
+    'peeing a lot': 'frequent urination',
+    'polyuria': 'frequent urination',
+    'burning urination': 'painful urination',
+    'dysuria': 'painful urination',
+    'excessive thirst': 'increased thirst',
+    'polydipsia': 'increased thirst',
+    'jaundice': 'yellowish skin',
+    'yellow skin': 'yellowish skin',
+    'nauseous': 'nausea',
+    'feeling sick': 'nausea',
+    'sweats': 'sweating',
+    'night sweats': 'sweating',
+    'can\'t sleep': 'sleep disturbances',
+    'insomnia': 'sleep disturbances',
+    'low mood': 'sadness',
+    'acne': 'pimples',
+    'spots': 'pimples',
+    'swollen glands': 'swollen lymph nodes',
+    'blurry vision': 'blurred vision',
+    'blurred and distorted vision': 'blurred vision',
+    'stiff': 'stiffness',
+    'movement stiffness': 'stiffness',
+    'shivering': 'shakiness',
+    'spinning movements': 'spinning sensation',
+    'lack of concentration': 'difficulty concentrating',
+    'irritation in anus': 'itching in anus',
+    'continuous feel of urine': 'frequent urination',
+    'skin peeling': 'scaling',
+    'red sore around nose': 'red sores',
+    'yellow crust ooze': 'yellow crust',
+    'weight gaining': 'weight gain',
+    'losing weight': 'weight loss',
+}
+
+_SEPARATORS = re.compile(r"[\s_\-]+")
+
+
+def singular(word):
+    """
+    A rough English singular, only ever compared with other singular() output.
+    """
+    if len(word) > 4 and word.endswith('ies'):
+        return word[:-3] + 'y'
+    if len(word) > 4 and word.endswith(('ches', 'shes', 'sses', 'xes', 'zes')):
+        return word[:-2]
+    if len(word) > 3 and word.endswith('s') and not word.endswith(('ss', 'us', 'is')):
+        return word[:-1]
+    return word
+
+
+def fold(text):
+    """
+    Lowercased, with underscores, hyphens and runs of whitespace as single
+    spaces.
+    """
+    return _SEPARATORS.sub(' ', text.lower()).strip()
+
+
+def canonical(text):
+    """
+    fold() with every word singular.
+    """
+    return ' '.join(singular(word) for word in fold(text).split(' '))
+
+
+def trigrams(key):
+    padded = f" {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a, b, limit):
+    """
+    Optimal string alignment distance (insertions, deletions, substitutions
+    and adjacent transpositions), or limit + 1 once it must exceed limit.
+    Only cells within limit of the diagonal are filled.
+    """
+    over = limit + 1
+    if abs(len(a) - len(b)) > limit:
+        return over
+    previous2 = None
+    previous = [j if j <= limit else over for j in range(len(b) + 1)]
+    for i in range(1, len(a) + 1):
+        low, high = max(1, i - limit), min(len(b), i + limit)
+        current = [over] * (len(b) + 1)
+        if i <= limit:
+            current[0] = i
+        char = a[i - 1]
+        for j in range(low, high + 1):
+            other = b[j - 1]
+            value = previous[j - 1] + (char != other)
+            if previous[j] + 1 < value:
+                value = previous[j] + 1
+            if current[j - 1] + 1 < value:
+                value = current[j - 1] + 1
+            if i > 1 and j > 1 and char == b[j - 2] and a[i - 2] == other and previous2[j - 2] + 1 < value:
+                value = previous2[j - 2] + 1
+            current[j] = value
+        if min(current[low - 1:high + 1]) > limit:
+            return over
+        previous2, previous = previous, current
+    return min(previous[-1], over)
+
+
+class SymptomNormalizer:
+    """
+    Resolves free-text symptoms to the ids of one catalogue's vocabulary.
+    frequencies (diseases listing each symptom id) break ties between
+    equally close typo candidates.
+    """
+
+    def __init__(self, symptom_ids, frequencies=None, synonyms=SYNONYMS):
+        self.exact = dict(symptom_ids)
+        self.frequencies = frequencies if frequencies is not None else np.zeros(len(self.exact), dtype=np.int64)
+        self.table = {}
+        for name, symptom_id in self.exact.items():
+            self.table.setdefault(canonical(name), symptom_id)
+        names = dict(self.table)
+        for term, target in synonyms.items():
+            symptom_id = self.exact.get(target, self.table.get(canonical(target)))
+            if symptom_id is not None:
+                self.table.setdefault(canonical(term), symptom_id)
+
+        # Trigram posting lists over the canonical catalogue names, without
+        # synonyms. Keys are ordered by length, so each list can be cut to the
+        # lengths a typo could have
+        self.keys = sorted(names, key=len)
+        self.key_ids = np.array([names[key] for key in self.keys], dtype=np.int64)
+        self.key_lengths = np.array([len(key) for key in self.keys], dtype=np.int64)
+        postings = {}
+        for position, key in enumerate(self.keys):
+            for gram in trigrams(key):
+                postings.setdefault(gram, []).append(position)
+        self.postings = {gram: np.array(positions, dtype=np.int64) for gram, positions in postings.items()}
+        self.resolve = lru_cache(maxsize=RESOLVE_CACHE_SIZE)(self._resolve)
+
+    def lookup(self, symptoms):
+        """
+        The ids of the symptoms that resolve, like Catalogue.lookup.
+        """
+        return {symptom_id for symptom_id in map(self.resolve, symptoms) if symptom_id is not None}
+
+    def _resolve(self, symptom):
+        symptom_id = self.exact.get(symptom)
+        if symptom_id is None:
+            key = canonical(symptom)
+            symptom_id = self.table.get(key)
+            if symptom_id is None and len(key) >= MIN_FUZZY_LENGTH:
+                symptom_id = self._closest(key)
+        return symptom_id
+
+    def _closest(self, key):
+        limit = MAX_FUZZY_EDITS
+        low = np.searchsorted(self.key_lengths, len(key) - limit, 'left')
+        high = np.searchsorted(self.key_lengths, len(key) + limit, 'right')
+        grams = trigrams(key)
+        lists = []
+        for gram in grams:
+            positions = self.postings.get(gram)
+            if positions is not None:
+                start, stop = positions.searchsorted((low, high)).tolist()
+                lists.append(positions[start:stop])
+        if not lists:
+            return None
+        # An edit changes at most 4 trigrams (3, or 4 for a transposition),
+        # so a key within limit edits shares all but 4 * limit of the query's
+        shared = np.bincount(np.concatenate(lists) - low, minlength=high - low)
+        candidates = np.flatnonzero(shared >= max(1, len(grams) - 4 * limit))
+        if len(candidates) > MAX_FUZZY_CANDIDATES:
+            best = np.argpartition(-shared[candidates], MAX_FUZZY_CANDIDATES - 1)[:MAX_FUZZY_CANDIDATES]
+            candidates = candidates[best]
+        order = np.argsort(-shared[candidates], kind='stable')
+
+        # Best overlap first: once a match is found at some distance, keys
+        # sharing too few trigrams to be as close are not compared
+        match = None
+        needed = 0
+        for position, overlap in zip((candidates[order] + low).tolist(), shared[candidates[order]].tolist()):
+            if overlap < needed:
+                break
+            distance = edit_distance(key, self.keys[position], limit)
+            if distance <= limit:
+                symptom_id = int(self.key_ids[position])
+                rank = (distance, -int(self.frequencies[symptom_id]), symptom_id)
+                if match is None or rank < match:
+                    match = rank
+                    needed = len(grams) - 4 * distance
+        return None if match is None else match[2]
+
+
+class SymptomSuggester:
+    """
+    Prefix completion over one catalogue's symptom names. Every word start
+    is indexed, so "pain" completes to "chest pain" as well as "pain";
+    suggestions are ordered by how many diseases list the symptom.
+    """
+
+    def __init__(self, symptom_ids, frequencies):
+        # Symptom ids by rank: most frequent first, then alphabetical
+        self.names = sorted(symptom_ids, key=lambda name: (-int(frequencies[symptom_ids[name]]), name))
+        entries = []
+        for rank, name in enumerate(self.names):
+            words = fold(name).split(' ')
+            entries.extend((' '.join(words[i:]), rank) for i in range(len(words)))
+        entries.sort()
+        self.keys = [key for key, _ in entries]
+        self.ranks = np.array([rank for _, rank in entries], dtype=np.int64)
+        self.max_words = max((len(fold(name).split(' ')) for name in self.names), default=1)
+        self.suggest = lru_cache(maxsize=SUGGEST_CACHE_SIZE)(self._suggest)
+
+    def _suggest(self, prefix, limit):
+        prefix = fold(prefix)
+        if not prefix or limit < 1:
+            return ()
+        low = bisect_left(self.keys, prefix)
+        high = bisect_left(self.keys, prefix + '\U0010ffff', low)
+        ranks = self.ranks[low:high]
+        # A name appears at most max_words times, so the limit * max_words
+        # best entries hold the limit best distinct names
+        keep = limit * self.max_words
+        if len(ranks) > keep:
+            ranks = np.partition(ranks, keep - 1)[:keep]
+        return tuple(self.names[rank] for rank in np.unique(ranks)[:limit].tolist())
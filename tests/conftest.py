@@ -0,0 +1,16 @@
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+# Set before app is imported: tests never touch instance/users.db, and
+# hashing stays cheap
+_scratch = tempfile.mkdtemp(prefix='tests-')
+atexit.register(shutil.rmtree, _scratch, ignore_errors=True)
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(_scratch, 'users.db')
+os.environ['PASSWORD_HASH_METHOD'] = 'pbkdf2:sha256:1000'
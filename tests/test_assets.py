@@ -0,0 +1,30 @@
+import os
+import time
+
+from assets import AssetBundle
+from passwords import PasswordHasher
+
+
+def test_missing_assets_build_in_the_background_on_first_use(tmp_path):
+    (tmp_path / 'css').mkdir()
+    (tmp_path / 'css' / 'site.css').write_text('body { color: red; }')
+    output = tmp_path / 'dist'
+    bundle = AssetBundle(str(tmp_path), str(output), names=('css/site.css',), autobuild=True)
+    assert not output.exists()
+
+    # Plain files are linked until the build is done
+    assert bundle.built_name('css/site.css') is None
+    deadline = time.monotonic() + 5
+    while bundle.built_name('css/site.css') is None and time.monotonic() < deadline:
+        time.sleep(0.01)
+    built = bundle.built_name('css/site.css')
+    assert built is not None and os.path.exists(output / built)
+    assert not bundle.missing()
+
+
+def test_hasher_normalizes_its_method_off_the_constructing_thread():
+    hasher = PasswordHasher('pbkdf2:sha256:1000', workers=1)
+    assert hasher.method == 'pbkdf2:sha256:1000'
+    pwhash = hasher.hash('secret')
+    assert hasher.verify(pwhash, 'secret')
+    assert not hasher.needs_rehash(pwhash)
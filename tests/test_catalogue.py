@@ -0,0 +1,113 @@
+import numpy as np
+import pandas as pd
+
+from catalogue import WEIGHT_FIELDS, Catalogue, delta_path
+from merge_update import merge, merge_incremental
+
+DATASET = 'final_optimized_medical_dataset.csv'
+
+
+def weighted_rows(catalogue, disease, group):
+    # Each of the disease's rows as {symptom: weight}, in row order
+    weights = catalogue.weight_matrices[group]
+    rows = []
+    for row in range(catalogue.matrix.shape[0]):
+        if catalogue.disease(row) == disease:
+            start, end = weights.indptr[row], weights.indptr[row + 1]
+            rows.append({
+                catalogue.strings[int(catalogue.symptom_names[i])]: weight
+                for i, weight in zip(weights.indices[start:end].tolist(), weights.data[start:end].tolist())
+            })
+    return rows
+
+
+def test_delta_rows_keep_their_weights(tmp_path):
+    data = pd.read_csv(DATASET)
+    changed = data['Disease'].isin(data['Disease'].iloc[-3:])
+    base_path, delta_path = tmp_path / 'base.csv', tmp_path / 'delta.csv'
+    data[~changed].to_csv(base_path, index=False)
+    data[changed].to_csv(delta_path, index=False)
+
+    full = Catalogue.from_csv(DATASET)
+    patched = Catalogue.from_csv(str(base_path)).with_delta(str(delta_path))
+    for disease in data['Disease'][changed].unique():
+        for group in WEIGHT_FIELDS:
+            expected = weighted_rows(full, disease, group)
+            assert expected
+            assert weighted_rows(patched, disease, group) == expected
+
+
+def catalogue_rows(catalogue):
+    # Every row as its result fields plus {symptom: (adult, child)}, in a fixed order
+    rows = []
+    for pos in range(catalogue.matrix.shape[0]):
+        record = catalogue.row(pos)
+        symptoms = record.pop('Symptoms')
+        weights = [weighted_rows_at(catalogue, pos, group) for group in WEIGHT_FIELDS]
+        rows.append((sorted(record.items()), sorted((s, tuple(w[s] for w in weights)) for s in symptoms)))
+    return sorted(rows)
+
+
+def weighted_rows_at(catalogue, pos, group):
+    weights = catalogue.weight_matrices[group]
+    start, end = weights.indptr[pos], weights.indptr[pos + 1]
+    return {
+        catalogue.strings[int(catalogue.symptom_names[i])]: weight
+        for i, weight in zip(weights.indices[start:end].tolist(), weights.data[start:end].tolist())
+    }
+
+
+def listed_symptoms(catalogue):
+    counts = np.diff(catalogue.posting_indptr)
+    return sorted(name for name, i in catalogue.symptom_ids.items() if counts[i])
+
+
+def test_incremental_merge_loads_like_a_full_one(tmp_path):
+    dataset = pd.DataFrame({
+        'Disease': ['Migraine', 'Flu', 'Gastritis', 'Asthma'],
+        'Symptoms': ['headache, nausea', 'fever; cough', 'stomach_pain', 'wheezing, cough'],
+        'Symptom_Keywords': ['headache; nausea', 'fever; cough', 'stomach pain', 'wheezing; cough'],
+        'Adult_Symptom_Probability': ['headache:5; nausea:2', 'fever:4; cough:3', 'stomach_pain:5', 'wheezing:5; cough:2'],
+        'Child_Symptom_Probability': ['headache:3; nausea:1', 'fever:5; cough:4', 'stomach_pain:2', 'wheezing:4; cough:1'],
+        'Medicine': ['Sumatriptan', 'Paracetamol', '', 'Salbutamol'],
+        'Dosage': ['Adults: 50mg', '', '', 'Adults: 2 puffs'],
+        'Severity': ['Moderate', 'Mild', 'Mild', 'Severe'],
+        'Contraindications': ['', '', '', ''],
+        'Diet': ['', '', '', ''],
+        'Precautions': ['Rest', '', 'Avoid NSAIDs', ''],
+        'References': ['', '', '', ''],
+        'Age_Group': ['All', 'All', 'Adult+', 'All'],
+        'Alternative_Therapies': ['', 'Rest', '', ''],
+    })
+    symptoms = pd.DataFrame({
+        'Disease': ['migraine', ' FLU', 'Cholera'],
+        'Symptom_1': ['blurred_vision', 'chills', 'diarrhoea'],
+        'Symptom_2': ['nausea', '', 'vomiting'],
+        'Symptom_3': ['', '', ''],
+        'Symptom_4': ['', '', ''],
+    })
+    dataset_path, symptoms_path = tmp_path / 'medical_data.csv', tmp_path / 'symptoms.csv'
+    output_path, full_path = str(tmp_path / 'merged.csv'), str(tmp_path / 'full.csv')
+    dataset.to_csv(dataset_path, index=False)
+    symptoms.to_csv(symptoms_path)
+    merge_incremental(str(dataset_path), str(symptoms_path), output_path)
+
+    # One disease edited, one removed, and one new disease in the symptom table
+    dataset.loc[dataset['Disease'] == 'Asthma', 'Symptoms'] = 'wheezing, chest_tightness'
+    dataset.loc[dataset['Disease'] == 'Asthma', 'Adult_Symptom_Probability'] = 'wheezing:5; chest_tightness:4'
+    dataset.loc[dataset['Disease'] == 'Asthma', 'Child_Symptom_Probability'] = 'wheezing:4; chest_tightness:2'
+    dataset = dataset[dataset['Disease'] != 'Gastritis']
+    symptoms.loc[len(symptoms)] = ['Measles', 'rash', 'fever', '', '']
+    dataset.to_csv(dataset_path, index=False)
+    symptoms.to_csv(symptoms_path)
+    changed, removed = merge_incremental(str(dataset_path), str(symptoms_path), output_path)
+    assert (changed, removed) == (2, 1)
+    merge(str(dataset_path), str(symptoms_path), full_path)
+
+    patched = Catalogue.from_csv(output_path).with_delta(delta_path(output_path))
+    full = Catalogue.from_csv(full_path)
+    # A removed disease's symptoms keep their ids in the patched catalogue, unlisted
+    assert listed_symptoms(patched) == listed_symptoms(full)
+    assert 'chest_tightness' in listed_symptoms(full)
+    assert not any(';' in name or ' ' in name for name in full.symptom_ids)
+    assert catalogue_rows(patched) == catalogue_rows(full)
@@ -0,0 +1,108 @@
+import random
+
+import pytest
+
+from app import predictor
+from matching import MedicalMatcher, medication_pieces
+
+MEDICATIONS = ['Amoxicillin, Ibuprofen', 'Metformin', 'Insulin, ', 'Consult doctor']
+DISEASES = ['Diabetes Mellitus', 'Diabetes', 'Peptic Ulcer Disease', 'Common Cold']
+
+
+# The substring checks the compiled matcher replaced, kept as the reference
+def legacy_allergy(medication, allergies):
+    if not medication or not allergies:
+        return False
+    return any(
+        med.strip().lower() in allergies.lower()
+        for med in medication.split(',')
+    )
+
+
+def legacy_history(disease, medical_conditions):
+    if not medical_conditions or not disease:
+        return False
+    user_conditions = [c.strip().lower() for c in medical_conditions.split(',')]
+    disease_lower = disease.lower()
+    return any(
+        condition in disease_lower or disease_lower in condition
+        for condition in user_conditions
+        if condition
+    )
+
+
+@pytest.fixture(scope='module')
+def matcher():
+    return MedicalMatcher(MEDICATIONS, DISEASES)
+
+
+@pytest.mark.parametrize('allergies', [
+    'amoxicillin',
+    # A medication name inside longer allergy text
+    'allergic to amoxicillin-clavulanate and shellfish',
+    # Part of a medication name is not an allergy to it
+    'amox',
+    'penicillin',
+    'IBUPROFEN',
+    'MetFormin, dust',
+    # Any text matches 'Insulin, ', whose second piece is empty
+    ' ',
+    '',
+])
+def test_allergies_match_the_substring_check(matcher, allergies):
+    profile = matcher.compile(allergies, '')
+    for medication in MEDICATIONS:
+        assert profile.allergic_to(medication_pieces(medication)) == legacy_allergy(medication, allergies)
+
+
+@pytest.mark.parametrize('conditions', [
+    # Condition inside a disease name, and a disease name inside a condition
+    'diabetes',
+    'type 2 diabetes mellitus with complications',
+    'ulcer',
+    'PEPTIC ULCER DISEASE',
+    'Common cold, asthma',
+    # Empty and whitespace-only pieces match nothing
+    ', ,  ',
+    '   ',
+    '',
+    'flu',
+])
+def test_conditions_match_the_containment_check(matcher, conditions):
+    profile = matcher.compile('', conditions)
+    for disease in DISEASES:
+        assert profile.history_match(disease) == legacy_history(disease, conditions)
+
+
+def fragment(rng, text):
+    start = rng.randrange(len(text))
+    piece = text[start:start + rng.randint(1, 12)]
+    return rng.choice([piece, piece.upper(), f" {piece} ", text, text.title()])
+
+
+def random_text(rng, words):
+    parts = [fragment(rng, rng.choice(words)) for _ in range(rng.randint(0, 4))]
+    return rng.choice([', ', ',', ' and ', '\n']).join(parts + rng.choice([[], [''], ['  ']]))
+
+
+def test_compiled_profiles_agree_with_substring_checks_on_the_catalogue():
+    assert predictor.wait_until_ready(60)
+    catalogue = predictor.catalogue
+    records = []
+    for pos in range(catalogue.matrix.shape[0]):
+        for child in (False, True):
+            try:
+                records.append(catalogue.result(pos, child))
+            except ValueError:
+                # Some rows of the shipped dataset have malformed result fields
+                pass
+    medicines = sorted({record.medicine for record in records if record.medicine})
+    diseases = sorted({record.disease for record in records if record.disease})
+
+    rng = random.Random(0)
+    for _ in range(300):
+        allergies, conditions = random_text(rng, medicines), random_text(rng, diseases)
+        compiled = predictor.compile_medical_profile({'allergies': allergies, 'medical_conditions': conditions})
+        for record in records:
+            assert compiled.allergic_to(record.medication_pieces) == legacy_allergy(record.medicine, allergies)
+            assert compiled.history_match(record.disease) == legacy_history(record.disease, conditions)
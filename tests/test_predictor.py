@@ -0,0 +1,62 @@
+import gc
+import random
+
+import pytest
+
+from app import predictor
+
+PROFILE = {'age': 40, 'allergies': '', 'medical_conditions': '', 'past_medications': ''}
+
+
+@pytest.fixture(scope='module')
+def catalogue():
+    assert predictor.wait_until_ready(60)
+    return predictor.catalogue
+
+
+def test_differential_lists_each_disease_once(catalogue):
+    names = [catalogue.disease(row) for row in range(catalogue.matrix.shape[0])]
+    duplicated = {name for name in names if names.count(name) > 1}
+    assert duplicated, "the shipped dataset should repeat some diseases"
+
+    queries = [', '.join(catalogue.row(row)['Symptoms']) for row, name in enumerate(names) if name in duplicated]
+    single = [predictor.predict(query, PROFILE) for query in queries]
+    batched = predictor.predict_batch(queries, [PROFILE] * len(queries))
+    assert any(success for _, success in single)
+    for (result, success), batch_result in zip(single, batched):
+        assert batch_result == (result, success)
+        if not success:
+            # Some rows of the shipped dataset have malformed result fields
+            continue
+        listed = [entry['disease'] for entry in result['differential']]
+        assert len(listed) == len(set(listed))
+        assert listed[0] == result['disease']
+
+
+def test_spellings_of_one_symptom_share_a_result_cache_entry(catalogue):
+    name = next(name for name in catalogue.symptom_ids if ' ' in name)
+    spellings = [name, name.replace(' ', '_').title(), name + 's', f" {name.upper()} "]
+    predictor.result_cache.clear()
+    results = [predictor.predict(spelling, PROFILE) for spelling in spellings]
+    assert len(predictor.result_cache) == 1
+    # Unknown terms do not add entries of their own, only change the term count
+    predictor.predict(f"{name}, made up one", PROFILE)
+    predictor.predict(f"{name}, made up two", PROFILE)
+    assert len(predictor.result_cache) == 2
+    for result, success in results[1:]:
+        result.pop('matched_symptoms', None)
+        first = dict(results[0][0])
+        first.pop('matched_symptoms', None)
+        assert (result, success) == (first, results[0][1])
+
+
+def test_batch_matches_single_predictions_and_resumes_gc(catalogue):
+    rng = random.Random(3)
+    vocabulary = sorted(catalogue.symptom_ids)
+    queries = [', '.join(rng.sample(vocabulary, rng.randint(1, 5))) + rng.choice(['', ', made up']) for _ in range(200)]
+    profiles = [dict(PROFILE, age=rng.choice([8, 40])) for _ in queries]
+    predictor.result_cache.clear()
+    single = [predictor.predict(query, profile) for query, profile in zip(queries, profiles)]
+    assert gc.isenabled()
+    assert predictor.predict_batch(queries, profiles) == single
+    assert gc.isenabled()
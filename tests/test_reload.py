@@ -0,0 +1,39 @@
+import threading
+
+import app
+from app import predictor
+
+
+def test_watch_waits_for_a_settled_file_and_retries_failed_reloads(monkeypatch):
+    # What each poll sees: the file written in two steps, then left alone
+    polls = iter([('v1',), ('v2-partial',), ('v2',)])
+    seen = []
+
+    def signature():
+        seen.append(next(polls, ('v2',)))
+        return seen[-1]
+
+    monkeypatch.setattr(app, '_source_signature', signature)
+    reloaded = []
+    done = threading.Event()
+
+    def reload():
+        reloaded.append(seen[-1])
+        if len(reloaded) == 2:
+            done.set()
+        # The first attempt fails, so the same change is tried again
+        return len(reloaded) > 1
+
+    monkeypatch.setattr(predictor, 'reload', reload)
+    stop = threading.Event()
+    thread = predictor.watch(0.001, stop)
+    try:
+        assert done.wait(5)
+        # Loaded: nothing more to do however often it polls
+        polled = len(seen)
+        while len(seen) < polled + 5:
+            stop.wait(0.001)
+    finally:
+        stop.set()
+        thread.join(5)
+    assert reloaded == [('v2',), ('v2',)]
@@ -0,0 +1,49 @@
+import pytest
+
+from app import predictor
+from symptoms import SymptomNormalizer
+
+VOCABULARY = ['headache', 'chest pain', 'skin rash', 'fever', 'joint pain', 'back pain']
+PROFILE = {'age': 40, 'allergies': '', 'medical_conditions': '', 'past_medications': ''}
+
+
+@pytest.fixture(scope='module')
+def normalizer():
+    return SymptomNormalizer({name: i for i, name in enumerate(VOCABULARY)})
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('Skin_Rash', 'skin rash'),
+    ('skin rashes', 'skin rash'),
+    ('chest pian', 'chest pain'),
+    ('fevr', 'fever'),
+    ('head pain', 'headache'),
+])
+def test_variants_synonyms_and_one_edit_typos_resolve(normalizer, text, expected):
+    assert normalizer.resolve(text) == VOCABULARY.index(expected)
+
+
+@pytest.mark.parametrize('text', [
+    # Two edits from the synonym 'head pain', which maps to headache
+    'heart pain',
+    # Two edits from 'chest pain'
+    'cheek pain',
+    'Heart_Pains',
+    'cheek pains',
+])
+def test_near_miss_body_parts_do_not_resolve(normalizer, text):
+    assert normalizer.resolve(text) is None
+
+
+def test_prediction_shows_how_symptoms_were_read():
+    assert predictor.wait_until_ready(60)
+    catalogue = predictor.catalogue
+    assert catalogue.normalizer.resolve('heart pain') != catalogue.symptom_ids.get('headache')
+
+    result, success = predictor.predict('Headaches, heart pain', PROFILE)
+    assert success
+    assert result['matched_symptoms'] == [
+        {'input': 'headaches', 'symptom': 'headache'},
+        {'input': 'heart pain', 'symptom': None},
+    ]
+    assert predictor.predict_batch(['Headaches, heart pain'], [PROFILE]) == [(result, success)]
@@ -0,0 +1,40 @@
+import app as app_module
+from app import User, app, db, import_users, load_user_profile, update_medical_info_response
+
+
+def test_import_skips_rows_with_bad_numbers():
+    rows = [
+        {'username': 'import-ok', 'password': 'secret', 'age': '30', 'height': '', 'weight': '70'},
+        {'username': 'import-age', 'password': 'secret', 'age': 'thirty'},
+        {'username': 'import-height', 'password': 'secret', 'age': '30', 'height': '1.80'},
+        {'username': 'import-weight', 'password': 'secret', 'age': '30', 'weight': 'n/a'},
+        {'username': 'import-ok', 'password': 'again', 'age': '31'},
+    ]
+    with app.app_context():
+        db.create_all()
+        assert import_users(rows) == (1, 4)
+        user = User.query.filter_by(username='import-ok').one()
+        assert (user.age, user.height, user.weight) == (30, 0, 70)
+        assert User.query.filter(User.username.like('import-%')).count() == 1
+
+
+def test_profile_read_racing_an_update_is_not_cached(monkeypatch):
+    with app.app_context():
+        db.create_all()
+        import_users([{'username': 'race', 'password': 'secret', 'age': '30', 'allergies': 'aspirin'}])
+        user_id = User.query.filter_by(username='race').one().id
+        app_module.profile_cache.invalidate(user_id)
+
+        read_profile = app_module.user_profile_of
+
+        def profile_then_update(user):
+            # The row was read before the update below committed
+            profile = read_profile(user)
+            monkeypatch.setattr(app_module, 'user_profile_of', read_profile)
+            body, status = update_medical_info_response(user_id, {'allergies': 'penicillin'})
+            assert status == 200, body
+            return profile
+
+        monkeypatch.setattr(app_module, 'user_profile_of', profile_then_update)
+        assert load_user_profile(user_id)['allergies'] == 'aspirin'
+        assert load_user_profile(user_id)['allergies'] == 'penicillin'